@@ -0,0 +1,21 @@
+import secrets
+from http import HTTPStatus
+
+from fastapi import HTTPException, Request
+
+from core.config import settings as config
+
+
+async def verify_admin_token(request: Request) -> None:
+    """
+    Зависимость служебных ручек (метрики, сброс кэша, горячие ключи): запрос
+    должен нести общий секрет CACHE_ADMIN_TOKEN в заголовке CACHE_ADMIN_HEADER.
+    Пока секрет не задан, ручки недоступны.
+    """
+    token = request.headers.get(config.cache_admin_header, "")
+    if not config.cache_admin_token or not secrets.compare_digest(
+        token.encode(), config.cache_admin_token.encode()
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.FORBIDDEN, detail="invalid admin token"
+        )
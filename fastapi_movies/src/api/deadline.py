@@ -0,0 +1,30 @@
+import math
+
+from fastapi import Request
+
+from core.config import settings as config
+from core.deadline import start_budget
+
+
+class RequestBudget:
+    """
+    Зависимость, задающая бюджет времени запроса.
+    Бюджет берется из заголовка (его обычно проставляет gateway),
+    а если заголовка нет - из значения по умолчанию для ручки.
+    """
+
+    def __init__(self, default: float | None = None):
+        self.default = default or config.request_timeout_default
+
+    async def __call__(self, request: Request) -> None:
+        seconds = self.default
+        header = request.headers.get(config.request_timeout_header)
+        if header:
+            try:
+                value = float(header)
+            except ValueError:
+                value = math.nan
+            # nan и inf не годятся для дедлайна: берем значение по умолчанию
+            if math.isfinite(value):
+                seconds = value
+        start_budget(min(max(seconds, 0.0), config.request_timeout_max))
@@ -0,0 +1,76 @@
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from models.partial import partial_model
+
+
+def _public_name(name: str, info) -> str:
+    """Имя поля в ответе API"""
+    return info.serialization_alias or name
+
+
+def _source_name(name: str, info) -> str:
+    """Имя поля в документе эластика"""
+    return info.validation_alias or name
+
+
+class FieldSet:
+    """
+    Зависимость для параметра fields: список полей ответа через запятую.
+    Поля проверяются по модели ответа и возвращаются именами полей документа
+    в эластике, отсортированными, чтобы одинаковые наборы давали один ключ кэша.
+    Идентификатор возвращается всегда.
+    """
+
+    def __init__(self, model: type[BaseModel]):
+        self.model = model
+        self.source_names = {
+            _public_name(name, info): _source_name(name, info)
+            for name, info in model.model_fields.items()
+        }
+
+    async def __call__(self, fields: str | None = None) -> list[str] | None:
+        if not fields:
+            return None
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested - set(self.source_names)
+        if unknown:
+            raise HTTPException(
+                status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                detail=f"unknown fields: {', '.join(sorted(unknown))}",
+            )
+        return sorted({"id"} | {self.source_names[field] for field in requested})
+
+
+def sparse_model(model: type[BaseModel], fields: list[str]) -> type[BaseModel]:
+    """Модель ответа, содержащая только запрошенные поля документа"""
+    return partial_model(
+        model,
+        frozenset(
+            name
+            for name, info in model.model_fields.items()
+            if _source_name(name, info) in fields
+        ),
+    )
+
+
+def sparse_response(
+    model: type[BaseModel], item: BaseModel, fields: list[str]
+) -> ORJSONResponse:
+    data = sparse_model(model, fields)(**item.model_dump())
+    return ORJSONResponse(data.model_dump(mode="json", by_alias=True))
+
+
+def sparse_list_response(
+    model: type[BaseModel], items: list[BaseModel], fields: list[str]
+) -> ORJSONResponse:
+    partial = sparse_model(model, fields)
+    return ORJSONResponse(
+        [
+            partial(**item.model_dump()).model_dump(mode="json", by_alias=True)
+            for item in items
+        ]
+    )
@@ -0,0 +1,47 @@
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, Query
+
+from services.film_filter import (DEFAULT_SORT, FilmFilter, InvalidFilmFilter,
+                                  parse_sort)
+
+SORT_DESCRIPTION = (
+    "Ключи сортировки через запятую: imdb_rating, title.raw, id; "
+    "минус перед ключом - по убыванию"
+)
+
+
+async def get_film_sort(
+    sort: Annotated[str, Query(description=SORT_DESCRIPTION)] = DEFAULT_SORT,
+) -> tuple[str, ...]:
+    """Зависимость для параметра sort в каноническом виде"""
+    try:
+        return parse_sort(sort)
+    except InvalidFilmFilter as exc:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail=str(exc)
+        )
+
+
+async def get_film_filter(
+    sort: Annotated[tuple[str, ...], Depends(get_film_sort)],
+    genre: Annotated[
+        list[str] | None,
+        Query(description="id жанра; параметр можно повторить, жанры по ИЛИ"),
+    ] = None,
+    rating_min: Annotated[float | None, Query(ge=0, le=10)] = None,
+    rating_max: Annotated[float | None, Query(ge=0, le=10)] = None,
+) -> FilmFilter:
+    """Зависимость для сортировки и фильтров списка фильмов"""
+    try:
+        return FilmFilter.parse(
+            sort=",".join(sort),
+            genres=genre,
+            rating_min=rating_min,
+            rating_max=rating_max,
+        )
+    except InvalidFilmFilter as exc:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail=str(exc)
+        )
@@ -0,0 +1,13 @@
+from fastapi import Request
+
+from core.config import settings as config
+from core.preference import set_session
+
+
+async def get_session_preference(request: Request) -> None:
+    """
+    Зависимость, задающая preference запросов к эластику по идентификатору
+    сессии из заголовка. Запросы без сессии распределяются эластиком по
+    копиям шардов адаптивным выбором реплик (adaptive replica selection)
+    """
+    set_session(request.headers.get(config.elastic_preference_header))
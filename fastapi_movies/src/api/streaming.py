@@ -0,0 +1,86 @@
+import logging
+from typing import AsyncIterator
+
+import orjson
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+# размер порции ответа: мелкие элементы склеиваются, чтобы не писать в сокет
+# по одному объекту
+STREAM_BUFFER_BYTES = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def _dump(item: BaseModel) -> bytes:
+    return orjson.dumps(item.model_dump(mode="json", by_alias=True))
+
+
+async def _json_array(items: AsyncIterator[BaseModel]) -> AsyncIterator[bytes]:
+    buffer = bytearray(b"[")
+    separator = b""
+    async for item in items:
+        buffer += separator
+        buffer += _dump(item)
+        separator = b","
+        if len(buffer) >= STREAM_BUFFER_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b"]"
+    yield bytes(buffer)
+
+
+async def _continue(first: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    yield first
+    try:
+        async for chunk in chunks:
+            yield chunk
+    except Exception:
+        # заголовки уже отправлены: соединение обрывается без завершающего
+        # чанка, и клиент видит неполный ответ, а не 200 с обрезанным JSON
+        logger.exception("Потоковый ответ прерван")
+        raise
+
+
+async def stream_json_array(
+    items: AsyncIterator[BaseModel],
+) -> StreamingResponse | None:
+    """
+    Сериализует элементы в JSON-массив по мере их получения.
+    Первая порция тела собирается до отправки заголовков, поэтому ошибка
+    хранилища в ней дает обычный ответ с кодом ошибки, а страница, которая
+    в нее поместилась, не может оборваться. Возвращает None, если элементов
+    нет, чтобы ручка могла ответить 404.
+    """
+    chunks = _json_array(items)
+    first = await anext(chunks)
+    if first == b"[]":
+        return None
+    return StreamingResponse(_continue(first, chunks), media_type="application/json")
+
+
+async def _ndjson(items: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    try:
+        async for item in items:
+            buffer += orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE)
+            if len(buffer) >= STREAM_BUFFER_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+    except Exception:
+        logger.exception("Выгрузка прервана")
+        buffer += orjson.dumps(
+            {"error": "export interrupted"}, option=orjson.OPT_APPEND_NEWLINE
+        )
+    if buffer:
+        yield bytes(buffer)
+
+
+def stream_ndjson(items: AsyncIterator[dict]) -> StreamingResponse:
+    """
+    Отдает документы в формате NDJSON. Следующая порция читается только
+    после отправки предыдущей, поэтому медленный клиент тормозит выгрузку,
+    а не накапливает ее в памяти. Если выгрузка прервалась ошибкой, последней
+    строкой идет {"error": ...}: без нее обрыв не отличить от конца данных
+    """
+    return StreamingResponse(_ndjson(items), media_type="application/x-ndjson")
@@ -1,6 +1,9 @@
+from typing import Annotated, Literal
 from uuid import UUID, uuid4
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+from services.film_filter import FilmFilter
 
 
 class IdMixIn(BaseModel):
@@ -22,6 +25,7 @@ class PersonFilm(IdMixIn):
 class PersonDetail(IdMixIn):
     full_name: str
     films: list[PersonFilm] | None = None
+    films_count: int | None = None
 
 
 class Film(IdMixIn):
@@ -44,3 +48,57 @@ class GenreDetail(IdMixIn):
     description: str | None = None
     created: str
     modified: str
+
+
+class FilmsQuery(BaseModel):
+    type: Literal["films"]
+    sort: str = "-imdb_rating"
+    genre: str | list[str] | None = None
+    rating_min: float | None = Field(None, ge=0, le=10)
+    rating_max: float | None = Field(None, ge=0, le=10)
+    page_number: int = Field(1, gt=0)
+    page_size: int = Field(10, gt=0, le=100)
+
+    @model_validator(mode="after")
+    def check_filter(self) -> "FilmsQuery":
+        self.film_filter()
+        return self
+
+    def film_filter(self) -> FilmFilter:
+        return FilmFilter.parse(
+            sort=self.sort,
+            genres=[self.genre] if isinstance(self.genre, str) else self.genre,
+            rating_min=self.rating_min,
+            rating_max=self.rating_max,
+        )
+
+
+class GenresQuery(BaseModel):
+    type: Literal["genres"]
+    page_number: int = Field(1, gt=0)
+    page_size: int = Field(50, gt=0, le=100)
+
+
+class HomepageRequest(BaseModel):
+    queries: dict[
+        str, Annotated[FilmsQuery | GenresQuery, Field(discriminator="type")]
+    ] = Field(min_length=1, max_length=20)
+
+
+class SearchResult(BaseModel):
+    films: list[Film]
+    persons: list[PersonDetail]
+
+
+class InvalidateRequest(BaseModel):
+    tags: list[str] = Field(min_length=1, max_length=1000)
+
+
+class InvalidateResult(BaseModel):
+    keys: int
+
+
+class HotKey(BaseModel):
+    key: str
+    estimate: int
+    pinned: bool
@@ -0,0 +1,51 @@
+from http import HTTPStatus
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from db.hot_keys import HotKeys, get_hot_keys
+from services.cache import CacheService, get_cache_service
+
+from .api_models import HotKey, InvalidateRequest, InvalidateResult
+
+router = APIRouter()
+
+
+@router.post(
+    "/invalidate",
+    response_model=InvalidateResult,
+    summary="Сброс кэша по тегам",
+    description=(
+        "Удаляет из кэша записи, зависящие от перечисленных сущностей. "
+        "Теги: film:<uuid>, genre:<uuid>, person:<uuid> - записи, в которые "
+        "входят данные сущности; films:genre:<uuid> - страницы списка "
+        "фильмов с фильтром по жанру. Страницы, в которые входят удаленные "
+        "записи, собираются заново при следующем запросе."
+    ),
+    response_description="Количество удаленных записей",
+)
+async def invalidate(
+    request: InvalidateRequest,
+    cache_service: CacheService = Depends(get_cache_service),
+) -> InvalidateResult:
+    return InvalidateResult(keys=await cache_service.invalidate(request.tags))
+
+
+@router.get(
+    "/hot-keys",
+    response_model=list[HotKey],
+    summary="Горячие ключи кэша",
+    description=(
+        "Самые запрашиваемые ключи кэша в обработавшем запрос воркере по "
+        "оценке count-min sketch. Горячие ключи хранятся в памяти воркера. "
+        "Если поиск горячих ключей выключен, возвращается ошибка 404."
+    ),
+    response_description="Ключи по убыванию оценки числа обращений",
+)
+async def hot_keys_list(
+    hot_keys: HotKeys | None = Depends(get_hot_keys),
+) -> list[HotKey]:
+    if not hot_keys:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail="hot key tracking is disabled"
+        )
+    return [HotKey(**item) for item in hot_keys.hottest()]
@@ -0,0 +1,49 @@
+from datetime import datetime
+from http import HTTPStatus
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from api.streaming import stream_ndjson
+from core.config import settings as config
+from services.export import (ExportService, UnknownFieldsError,
+                             get_export_service)
+
+router = APIRouter()
+
+# название ресурса API -> индекс эластика
+INDEXES = {"films": "movies", "genres": "genres", "persons": "persons"}
+
+
+@router.get(
+    "/{resource}",
+    response_class=StreamingResponse,
+    summary="Выгрузка каталога",
+    description=(
+        "Потоковая выгрузка всех документов индекса в формате NDJSON. "
+        "fields - список полей через запятую, modified_since - выгрузить только "
+        "документы, измененные начиная с указанного момента."
+    ),
+    response_description="Документы индекса, по одному JSON-объекту на строку",
+)
+async def export_catalog(
+    resource: Literal["films", "genres", "persons"],
+    fields: str | None = None,
+    modified_since: datetime | None = None,
+    export_service: ExportService = Depends(get_export_service),
+) -> StreamingResponse:
+    try:
+        documents = export_service.export(
+            index=INDEXES[resource],
+            fields=fields.split(",") if fields else None,
+            modified_since=modified_since,
+            chunk_size=config.export_chunk_size,
+        )
+    except UnknownFieldsError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail=f"unknown fields: {e}",
+        )
+
+    return stream_ndjson(documents)
@@ -2,8 +2,15 @@ from http import HTTPStatus
 
 from fastapi import APIRouter, Depends, HTTPException
 
+from api.deadline import RequestBudget
+from api.fields import (FieldSet, sparse_list_response, sparse_model,
+                        sparse_response)
+from api.film_filter import get_film_filter, get_film_sort
 from api.paginator import Paginator
+from api.streaming import stream_json_array
+from core.config import settings as config
 from services.film import FilmService, get_film_service
+from services.film_filter import FilmFilter
 
 from .api_models import Film, FilmDetail
 
@@ -12,6 +19,7 @@ router = APIRouter()
 
 @router.get(
     "/search",
+    dependencies=[Depends(RequestBudget(config.request_timeout_search))],
     response_model=list[Film],
     summary="Поиск фильмов по названию",
     description=(
@@ -22,21 +30,43 @@ router = APIRouter()
 )
 async def film_search(
     query: str,
-    sort: str = "-imdb_rating",
+    sort: tuple[str, ...] = Depends(get_film_sort),
     paginator: Paginator = Depends(Paginator),
+    fields: list[str] | None = Depends(FieldSet(Film)),
     film_service: FilmService = Depends(get_film_service),
 ) -> list[Film]:
+    if paginator.page_size > config.stream_page_threshold:
+        model = sparse_model(Film, fields) if fields else Film
+        response = await stream_json_array(
+            model(**film.model_dump())
+            async for film in film_service.iter_search(
+                query=query,
+                sorting=sort,
+                page_num=paginator.page_number,
+                page_size=paginator.page_size,
+                fields=fields,
+            )
+        )
+        if not response:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND, detail="films not found"
+            )
+        return response
 
     searched_films = await film_service.search(
         query=query,
         sorting=sort,
         page_num=paginator.page_number,
         page_size=paginator.page_size,
+        fields=fields,
     )
 
     if not searched_films:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="films not found")
 
+    if fields:
+        return sparse_list_response(Film, searched_films, fields)
+
     return [Film(**film.dict()) for film in searched_films]
 
 
@@ -45,31 +75,54 @@ async def film_search(
     response_model=list[Film],
     summary="Список фильмов",
     description=(
-        "Список фильмов с пагинацией, фильтрацией по жанру и рейтингу. "
+        "Список фильмов с пагинацией, сортировкой по нескольким ключам "
+        "и фильтрацией по жанрам и диапазону рейтинга. "
         "Размер страницы задается пользователем."
     ),
     response_description="Название и рейтинг фильма",
 )
 async def films(
-    sort: str | None = "-imdb_rating",
-    genre: str | None = None,
+    film_filter: FilmFilter = Depends(get_film_filter),
     paginator: Paginator = Depends(Paginator),
+    fields: list[str] | None = Depends(FieldSet(Film)),
     film_service: FilmService = Depends(get_film_service),
 ) -> list[Film]:
     """
     Для сортировки используется default="-imdb_rating" по бизнес логике,
-    чтобы всегда выводились только популярные фильмы
+    чтобы всегда выводились только популярные фильмы. Последним ключом
+    сортировки всегда идет id, чтобы страницы не пересекались.
+    Страницы больше порога отдаются потоком, без сборки всего списка в памяти
     """
+    if paginator.page_size > config.stream_page_threshold:
+        model = sparse_model(Film, fields) if fields else Film
+        response = await stream_json_array(
+            model(**film.model_dump())
+            async for film in film_service.iter_all(
+                film_filter=film_filter,
+                page_num=paginator.page_number,
+                page_size=paginator.page_size,
+                fields=fields,
+            )
+        )
+        if not response:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND, detail="films not found"
+            )
+        return response
+
     all_films = await film_service.get_all(
-        sorting=sort,
-        genre_filter=genre,
+        film_filter=film_filter,
         page_num=paginator.page_number,
         page_size=paginator.page_size,
+        fields=fields,
     )
 
     if not all_films:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="films not found")
 
+    if fields:
+        return sparse_list_response(Film, all_films, fields)
+
     return [Film(**film.dict()) for film in all_films]
 
 
@@ -84,11 +137,16 @@ async def films(
     response_description="Название, рейтинг, описание, жанры и участники фильма",
 )
 async def film_details(
-    film_id: str, film_service: FilmService = Depends(get_film_service)
+    film_id: str,
+    fields: list[str] | None = Depends(FieldSet(FilmDetail)),
+    film_service: FilmService = Depends(get_film_service),
 ) -> FilmDetail:
-    film = await film_service.get_by_id(film_id)
+    film = await film_service.get_by_id(film_id, fields=fields)
 
     if not film:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="film not found")
 
+    if fields:
+        return sparse_response(FilmDetail, film, fields)
+
     return FilmDetail(**film.dict())
@@ -2,6 +2,7 @@ from http import HTTPStatus
 
 from fastapi import APIRouter, Depends, HTTPException
 
+from api.fields import FieldSet, sparse_list_response, sparse_response
 from api.paginator import Paginator
 from services.genre import GenreService, get_genre_service
 
@@ -19,15 +20,20 @@ router = APIRouter()
 )
 async def genres(
     paginator: Paginator = Depends(Paginator),
+    fields: list[str] | None = Depends(FieldSet(GenreDetail)),
     genre_service: GenreService = Depends(get_genre_service),
 ) -> list[GenreDetail]:
     all_genres = await genre_service.get_all(
         page_num=paginator.page_number,
         page_size=paginator.page_size,
+        fields=fields,
     )
     if not all_genres:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="genres not found")
 
+    if fields:
+        return sparse_list_response(GenreDetail, all_genres, fields)
+
     return [GenreDetail(**genre.model_dump()) for genre in all_genres]
 
 
@@ -42,11 +48,16 @@ async def genres(
     response_description="Название, описание жанра",
 )
 async def genre_details(
-    genre_id: str, genre_service: GenreService = Depends(get_genre_service)
+    genre_id: str,
+    fields: list[str] | None = Depends(FieldSet(GenreDetail)),
+    genre_service: GenreService = Depends(get_genre_service),
 ) -> GenreDetail:
-    genre = await genre_service.get_by_id(genre_id)
+    genre = await genre_service.get_by_id(genre_id, fields=fields)
 
     if not genre:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="genre not found")
 
+    if fields:
+        return sparse_response(GenreDetail, genre, fields)
+
     return GenreDetail(**genre.model_dump())
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends
+
+from services.composite import CompositeService, get_composite_service
+
+from .api_models import Film, FilmsQuery, GenreDetail, HomepageRequest
+
+router = APIRouter()
+
+
+@router.post(
+    "/",
+    response_model=dict[str, list[Film] | list[GenreDetail]],
+    summary="Данные главной страницы",
+    description=(
+        "Выполняет набор именованных запросов списков фильмов и жанров "
+        "за одно обращение к кэшу и одно обращение к эластику. "
+        "Пустые выборки возвращаются пустыми списками."
+    ),
+    response_description="Результаты запросов по их именам",
+)
+async def homepage(
+    request: HomepageRequest,
+    composite_service: CompositeService = Depends(get_composite_service),
+) -> dict[str, list[Film] | list[GenreDetail]]:
+    parts = {
+        name: (
+            composite_service.films_part(
+                film_filter=query.film_filter(),
+                page_num=query.page_number,
+                page_size=query.page_size,
+            )
+            if isinstance(query, FilmsQuery)
+            else composite_service.genres_part(
+                page_num=query.page_number, page_size=query.page_size
+            )
+        )
+        for name, query in request.queries.items()
+    }
+
+    results = await composite_service.run(parts)
+
+    response = {}
+    for name, items in results.items():
+        model = Film if isinstance(request.queries[name], FilmsQuery) else GenreDetail
+        response[name] = [model(**item.model_dump()) for item in items]
+
+    return response
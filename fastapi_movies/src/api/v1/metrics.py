@@ -0,0 +1,39 @@
+from elasticsearch import AsyncElasticsearch
+from fastapi import APIRouter, Depends
+
+from db.cache_writer import CacheWriter, get_cache_writer
+from db.elastic import get_elastic
+from db.es_nodes import nodes_health
+from db.hedging import Hedger, get_hedger
+from db.hot_keys import HotKeys, get_hot_keys
+from services.normalizer import QueryNormalizer, get_query_normalizer
+from services.prefetch import Prefetcher, get_prefetcher
+
+router = APIRouter()
+
+
+@router.get(
+    "/",
+    summary="Метрики воркера",
+    description=(
+        "Счетчики фоновых механизмов текущего процесса. "
+        "Для выключенных механизмов возвращается null."
+    ),
+    response_description="Метрики по компонентам",
+)
+async def worker_metrics(
+    prefetcher: Prefetcher | None = Depends(get_prefetcher),
+    cache_writer: CacheWriter | None = Depends(get_cache_writer),
+    hedger: Hedger | None = Depends(get_hedger),
+    hot_keys: HotKeys | None = Depends(get_hot_keys),
+    elastic: AsyncElasticsearch = Depends(get_elastic),
+    query_normalizer: QueryNormalizer | None = Depends(get_query_normalizer),
+) -> dict:
+    return {
+        "prefetch": prefetcher.stats() if prefetcher else None,
+        "cache_writer": cache_writer.stats() if cache_writer else None,
+        "elastic_hedging": hedger.stats() if hedger else None,
+        "hot_keys": hot_keys.stats() if hot_keys else None,
+        "elastic_nodes": nodes_health(elastic) if elastic else None,
+        "query_normalizer": query_normalizer.stats() if query_normalizer else None,
+    }
@@ -1,8 +1,16 @@
 from http import HTTPStatus
+from typing import Literal
 
 from fastapi import APIRouter, Depends, HTTPException
 
+from api.deadline import RequestBudget
+from api.fields import (FieldSet, sparse_list_response, sparse_model,
+                        sparse_response)
+from api.film_filter import get_film_sort
 from api.paginator import Paginator
+from api.streaming import stream_json_array
+from core.config import settings as config
+from services.film import FilmService, get_film_service
 from services.person import PersonService, get_person_service
 
 from .api_models import Film, PersonDetail
@@ -12,6 +20,7 @@ router = APIRouter()
 
 @router.get(
     "/search",
+    dependencies=[Depends(RequestBudget(config.request_timeout_search))],
     response_model=list[PersonDetail],
     summary="Поиск персоны по имени",
     description="Поиск персон с пагинацией. Если персоны не найдены, возвращается ошибка 404.",
@@ -20,13 +29,31 @@ router = APIRouter()
 async def person_search(
     query: str,
     paginator: Paginator = Depends(Paginator),
+    fields: list[str] | None = Depends(FieldSet(PersonDetail)),
     person_service: PersonService = Depends(get_person_service),
 ) -> list[PersonDetail]:
+    if paginator.page_size > config.stream_page_threshold:
+        model = sparse_model(PersonDetail, fields) if fields else PersonDetail
+        response = await stream_json_array(
+            model(**person.model_dump())
+            async for person in person_service.iter_search(
+                query=query,
+                page_num=paginator.page_number,
+                page_size=paginator.page_size,
+                fields=fields,
+            )
+        )
+        if not response:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND, detail="persons not found"
+            )
+        return response
 
     searched_persons = await person_service.search(
         query=query,
         page_num=paginator.page_number,
         page_size=paginator.page_size,
+        fields=fields,
     )
 
     if not searched_persons:
@@ -34,6 +61,9 @@ async def person_search(
             status_code=HTTPStatus.NOT_FOUND, detail="persons not found"
         )
 
+    if fields:
+        return sparse_list_response(PersonDetail, searched_persons, fields)
+
     return [PersonDetail(**person.dict()) for person in searched_persons]
 
 
@@ -48,13 +78,18 @@ async def person_search(
     response_description="Полное имя и список фильмов с ролями персоны.",
 )
 async def person_details(
-    person_id: str, person_service: PersonService = Depends(get_person_service)
+    person_id: str,
+    fields: list[str] | None = Depends(FieldSet(PersonDetail)),
+    person_service: PersonService = Depends(get_person_service),
 ) -> PersonDetail:
-    person = await person_service.get_by_id(person_id)
+    person = await person_service.get_by_id(person_id, fields=fields)
 
     if not person:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="person not found")
 
+    if fields:
+        return sparse_response(PersonDetail, person, fields)
+
     return PersonDetail(**person.dict())
 
 
@@ -63,21 +98,34 @@ async def person_details(
     response_model=list[Film],
     summary="Фильмы персоны",
     description=(
-        "Список фильмов с участием персоны по её UUID. "
+        "Фильмография персоны по её UUID с пагинацией и сортировкой, "
+        "по умолчанию по убыванию рейтинга. Параметр role оставляет фильмы, "
+        "где персона была актером, режиссером или сценаристом. "
         "Если персона или фильмы не найдены, возвращается ошибка 404."
     ),
     response_description="Название фильма и рейтинг",
 )
 async def person_films(
-    person_id: str, person_service: PersonService = Depends(get_person_service)
+    person_id: str,
+    role: Literal["actor", "director", "writer"] | None = None,
+    sort: tuple[str, ...] = Depends(get_film_sort),
+    paginator: Paginator = Depends(Paginator),
+    film_service: FilmService = Depends(get_film_service),
+    person_service: PersonService = Depends(get_person_service),
 ) -> list[Film]:
-    person = await person_service.get_by_id(person_id)
+    films = await film_service.get_by_person(
+        person_id=person_id,
+        role=role,
+        sorting=sort,
+        page_num=paginator.page_number,
+        page_size=paginator.page_size,
+    )
+    if films:
+        return [Film(**film.dict()) for film in films]
 
-    if not person:
+    # персону проверяем только для пустой страницы, чтобы различить ошибки
+    if not await person_service.get_by_id(person_id, fields=["id"]):
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="person not found")
-    if not person.films:
-        raise HTTPException(
-            status_code=HTTPStatus.NOT_FOUND, detail="films for person not found"
-        )
-
-    return [Film(**film.dict()) for film in person.films]
+    raise HTTPException(
+        status_code=HTTPStatus.NOT_FOUND, detail="films for person not found"
+    )
@@ -0,0 +1,42 @@
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from api.deadline import RequestBudget
+from core.config import settings as config
+from services.search import SearchService, get_search_service
+
+from .api_models import Film, PersonDetail, SearchResult
+
+router = APIRouter()
+
+
+@router.get(
+    "/",
+    dependencies=[Depends(RequestBudget(config.request_timeout_search))],
+    response_model=SearchResult,
+    summary="Общий поиск по фильмам и персонам",
+    description=(
+        "Ищет строку одновременно в названиях фильмов и именах персон. "
+        "Если ничего не найдено, возвращается ошибка 404."
+    ),
+    response_description="Найденные фильмы и персоны",
+)
+async def global_search(
+    query: str,
+    films_limit: Annotated[int, Query(gt=0, le=50)] = 10,
+    persons_limit: Annotated[int, Query(gt=0, le=50)] = 10,
+    search_service: SearchService = Depends(get_search_service),
+) -> SearchResult:
+    result = await search_service.search(
+        query=query, films_limit=films_limit, persons_limit=persons_limit
+    )
+
+    if not result:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="nothing found")
+
+    return SearchResult(
+        films=[Film(**film.model_dump()) for film in result.films],
+        persons=[PersonDetail(**person.model_dump()) for person in result.persons],
+    )
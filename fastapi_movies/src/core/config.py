@@ -1,12 +1,45 @@
 import os
 from logging import config as logging_config
+from typing import Literal
 
-from pydantic import Field
+from pydantic import BaseModel, Field, PrivateAttr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from core.logger import LOGGING
 
 
+class CachePolicy(BaseModel):
+    """Политика кэширования ответов ручки"""
+
+    # базовое время жизни записи в секундах
+    ttl: int = Field(300, gt=0)
+    # случайный разброс времени жизни, в процентах
+    jitter_percent: float = Field(10.0, ge=0, lt=100)
+    # значения больше этого размера в байтах не кэшируются
+    max_size: int = Field(1_000_000, gt=0)
+    # множитель времени жизни для ключа, запрошенного один раз
+    min_ttl_factor: float = Field(0.5, gt=0)
+    # множитель для ключа, запрошенного не меньше hot_hits раз
+    max_ttl_factor: float = Field(2.0, gt=0)
+    hot_hits: int = Field(10, gt=1)
+
+
+# политики по умолчанию: записи сущностей (film, genre, person) и страницы
+# списков и поиска. Времена жизни близки к прежним 5 минутам, чтобы данные
+# data_sync не ждали обновления дольше; больший срок задается в CACHE_POLICIES
+DEFAULT_CACHE_POLICIES = {
+    "film": CachePolicy(ttl=600),
+    "genre": CachePolicy(ttl=600),
+    "person": CachePolicy(ttl=600),
+    "films": CachePolicy(ttl=300),
+    "films_search": CachePolicy(ttl=120),
+    "person_films": CachePolicy(ttl=300),
+    "genres": CachePolicy(ttl=600),
+    "persons_search": CachePolicy(ttl=120),
+    "search": CachePolicy(ttl=120),
+}
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file="/fastapi_movies/.env",
@@ -16,7 +49,141 @@ class Settings(BaseSettings):
     project_name: str = Field("movies", alias="PROJECT_NAME")
     redis_host: str = Field("127.0.0.1", alias="REDIS_HOST")
     redis_port: int = Field(6379, alias="REDIS_PORT")
+    # узлы для записей кэша в JSON: ["redis-1:6379", "redis-2:6379"]. Ключи
+    # распределяются по ним консистентным хэшированием, служебные ключи
+    # остаются на REDIS_HOST. Пустой список - весь кэш на REDIS_HOST
+    redis_cache_nodes: list[str] = Field([], alias="REDIS_CACHE_NODES")
+    redis_ring_vnodes: int = Field(160, alias="REDIS_RING_VNODES")
+    # хранилище документов: эластик или локальная база SQLite, которую строит
+    # data_sync (sqlite_export.py), для небольших реплик только на чтение
+    storage_backend: Literal["elastic", "sqlite"] = Field(
+        "elastic", alias="STORAGE_BACKEND"
+    )
+    sqlite_path: str = Field("/fastapi_movies/data/movies.sqlite", alias="SQLITE_PATH")
+    # страничный кэш каждого соединения и отображение файла в память
+    sqlite_cache_size_kib: int = Field(8192, alias="SQLITE_CACHE_SIZE_KIB")
+    sqlite_mmap_size: int = Field(268_435_456, alias="SQLITE_MMAP_SIZE")
+    # как часто соединение проверяет, не подменен ли файл новой выгрузкой
+    sqlite_reopen_interval: float = Field(1.0, alias="SQLITE_REOPEN_INTERVAL")
+    # адрес эластика или несколько адресов узлов через запятую
     elastic_host: str = Field("127.0.0.1:9200", alias="ELASTIC_HOST")
+    # выбор узла для запроса: round_robin, random или least_in_flight
+    elastic_node_selector: Literal["round_robin", "random", "least_in_flight"] = Field(
+        "round_robin", alias="ELASTIC_NODE_SELECTOR"
+    )
+    # сниффинг: список узлов запрашивается у кластера при старте, после
+    # отказа узла и не чаще раза в elastic_sniff_interval секунд
+    elastic_sniff_enabled: bool = Field(False, alias="ELASTIC_SNIFF_ENABLED")
+    elastic_sniff_interval: float = Field(60.0, alias="ELASTIC_SNIFF_INTERVAL")
+    elastic_sniff_timeout: float = Field(1.0, alias="ELASTIC_SNIFF_TIMEOUT")
+    # заголовок с идентификатором сессии пользователя для preference поисков
+    elastic_preference_header: str = Field(
+        "X-Session-Id", alias="ELASTIC_PREFERENCE_HEADER"
+    )
+    # фильтры Блума по id документов, которые строит data_sync
+    bloom_filter_enabled: bool = Field(True, alias="BLOOM_FILTER_ENABLED")
+    bloom_refresh_seconds: float = Field(30.0, alias="BLOOM_REFRESH_SECONDS")
+    # как часто сверять метку записи в фильтр с копией воркера
+    bloom_sync_check_seconds: float = Field(1.0, alias="BLOOM_SYNC_CHECK_SECONDS")
+    # бюджет времени запроса в секундах: из заголовка или по умолчанию для ручки
+    request_timeout_header: str = Field(
+        "X-Request-Timeout", alias="REQUEST_TIMEOUT_HEADER"
+    )
+    request_timeout_default: float = Field(5.0, alias="REQUEST_TIMEOUT_DEFAULT")
+    request_timeout_search: float = Field(10.0, alias="REQUEST_TIMEOUT_SEARCH")
+    request_timeout_max: float = Field(30.0, alias="REQUEST_TIMEOUT_MAX")
+    # сжатие ответов (br, при отсутствии поддержки у клиента - gzip)
+    compression_minimum_size: int = Field(1024, alias="COMPRESSION_MINIMUM_SIZE")
+    compression_quality: int = Field(4, alias="COMPRESSION_QUALITY")
+    # страницы больше порога отдаются потоком, документы читаются частями
+    stream_page_threshold: int = Field(200, alias="STREAM_PAGE_THRESHOLD")
+    stream_chunk_size: int = Field(200, alias="STREAM_CHUNK_SIZE")
+    # размер порции документов при выгрузке каталога
+    export_chunk_size: int = Field(1000, alias="EXPORT_CHUNK_SIZE")
+    # фоновая загрузка в кэш следующей страницы списков и поиска
+    prefetch_enabled: bool = Field(False, alias="PREFETCH_ENABLED")
+    prefetch_max_concurrency: int = Field(4, alias="PREFETCH_MAX_CONCURRENCY")
+    prefetch_timeout: float = Field(5.0, alias="PREFETCH_TIMEOUT")
+    # индекс фильмов по рейтингу в Redis, который строит data_sync
+    rating_index_enabled: bool = Field(True, alias="RATING_INDEX_ENABLED")
+    # запись в кэш фоновой очередью, пачками через пайплайн Redis
+    cache_writer_enabled: bool = Field(True, alias="CACHE_WRITER_ENABLED")
+    cache_writer_max_pending: int = Field(10000, alias="CACHE_WRITER_MAX_PENDING")
+    cache_writer_batch_size: int = Field(100, alias="CACHE_WRITER_BATCH_SIZE")
+    cache_writer_flush_interval: float = Field(
+        0.05, alias="CACHE_WRITER_FLUSH_INTERVAL"
+    )
+    # дублирование get и search к эластику, не ответивших за перцентиль
+    # задержки; доля дублей не превышает max_ratio от числа запросов
+    elastic_hedge_enabled: bool = Field(False, alias="ELASTIC_HEDGE_ENABLED")
+    elastic_hedge_percentile: float = Field(95.0, alias="ELASTIC_HEDGE_PERCENTILE")
+    elastic_hedge_min_delay: float = Field(0.01, alias="ELASTIC_HEDGE_MIN_DELAY")
+    elastic_hedge_max_ratio: float = Field(0.05, alias="ELASTIC_HEDGE_MAX_RATIO")
+    elastic_hedge_burst: float = Field(10.0, alias="ELASTIC_HEDGE_BURST")
+    # нормализация поисковых запросов для ключей кэша
+    # (services.normalizer.QueryNormalizer): basic - регистр, пробелы и
+    # Unicode, stopwords - еще и без стоп-слов анализатора ru_en, analyzer -
+    # токены анализатора индекса через _analyze
+    query_normalizer_mode: Literal["basic", "stopwords", "analyzer"] = Field(
+        "stopwords", alias="QUERY_NORMALIZER_MODE"
+    )
+    query_normalizer_tracked: int = Field(10_000, alias="QUERY_NORMALIZER_TRACKED")
+    # политики кэширования, переопределяющие DEFAULT_CACHE_POLICIES, в JSON:
+    # {"films_search": {"ttl": 60, "jitter_percent": 20}}
+    cache_policies: dict[str, CachePolicy] = Field({}, alias="CACHE_POLICIES")
+    _cache_policies: dict[str, CachePolicy] = PrivateAttr(default_factory=dict)
+    # сколько ключей кэша помнить для подсчета обращений
+    cache_access_tracked_keys: int = Field(100_000, alias="CACHE_ACCESS_TRACKED_KEYS")
+    # поиск горячих ключей кэша: ключ, запрошенный не меньше hot_threshold
+    # раз за окно, хранится в памяти воркера local_ttl секунд
+    hot_keys_enabled: bool = Field(False, alias="HOT_KEYS_ENABLED")
+    hot_keys_top_k: int = Field(50, alias="HOT_KEYS_TOP_K")
+    hot_keys_threshold: int = Field(100, alias="HOT_KEYS_THRESHOLD")
+    hot_keys_sample_rate: float = Field(0.1, alias="HOT_KEYS_SAMPLE_RATE")
+    hot_keys_window_seconds: float = Field(10.0, alias="HOT_KEYS_WINDOW_SECONDS")
+    hot_keys_local_ttl: float = Field(1.0, alias="HOT_KEYS_LOCAL_TTL")
+    # общий секрет служебных ручек /api/v1/cache в заголовке cache_admin_header;
+    # пока он не задан, ручки отвечают 403
+    cache_admin_token: str | None = Field(None, alias="CACHE_ADMIN_TOKEN")
+    cache_admin_header: str = Field("X-Admin-Token", alias="CACHE_ADMIN_HEADER")
+    # попадания и промахи кэша по префиксам ключей для python -m db.keyspace
+    cache_stats_enabled: bool = Field(True, alias="CACHE_STATS_ENABLED")
+    cache_stats_flush_seconds: float = Field(10.0, alias="CACHE_STATS_FLUSH_SECONDS")
+
+    # Продакшен-сервер (gunicorn_conf.py): несколько процессов с uvloop и httptools.
+    # Каждый воркер создает свои пулы соединений в lifespan.
+    # количество воркеров, 0 - по числу ядер
+    server_workers: int = Field(0, alias="SERVER_WORKERS")
+    server_bind: str = Field("0.0.0.0:80", alias="SERVER_BIND")
+    # пауза между запусками воркеров, чтобы они не прогревали пулы и кэши
+    # одновременно
+    server_worker_stagger_seconds: float = Field(
+        0.5, alias="SERVER_WORKER_STAGGER_SECONDS"
+    )
+    # перезапуск воркера после N запросов (0 - не перезапускать), чтобы
+    # возвращать накопленную память; разброс не дает воркерам
+    # перезапускаться одновременно
+    server_max_requests: int = Field(10000, alias="SERVER_MAX_REQUESTS")
+    server_max_requests_jitter: int = Field(1000, alias="SERVER_MAX_REQUESTS_JITTER")
+    server_timeout: int = Field(60, alias="SERVER_TIMEOUT")
+    server_graceful_timeout: int = Field(30, alias="SERVER_GRACEFUL_TIMEOUT")
+    server_keepalive: int = Field(5, alias="SERVER_KEEPALIVE")
+
+    @property
+    def elastic_hosts(self) -> list[str]:
+        return [host.strip() for host in self.elastic_host.split(",") if host.strip()]
+
+    def cache_policy(self, name: str) -> CachePolicy:
+        """Политика по умолчанию с полями, заданными в CACHE_POLICIES"""
+        if name not in self._cache_policies:
+            policy = DEFAULT_CACHE_POLICIES[name]
+            override = self.cache_policies.get(name)
+            if override:
+                policy = policy.model_copy(
+                    update=override.model_dump(include=override.model_fields_set)
+                )
+            self._cache_policies[name] = policy
+        return self._cache_policies[name]
 
 
 settings = Settings()
@@ -0,0 +1,40 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Бюджет времени запроса исчерпан"""
+
+
+def start_budget(seconds: float) -> None:
+    """Задает бюджет времени для текущего запроса"""
+    _deadline.set(time.monotonic() + seconds)
+
+
+def remaining_budget() -> float | None:
+    """
+    Оставшееся время запроса в секундах.
+    Возвращает None, если бюджет не задан, и бросает DeadlineExceeded,
+    если время уже вышло, чтобы не начинать заведомо лишнюю работу.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded
+    return left
+
+
+@asynccontextmanager
+async def budget_timeout():
+    """Отменяет вложенную операцию, если она не успевает в бюджет запроса"""
+    try:
+        async with asyncio.timeout(remaining_budget()):
+            yield
+    except TimeoutError:
+        raise DeadlineExceeded
@@ -0,0 +1,22 @@
+import hashlib
+from contextvars import ContextVar
+
+_preference: ContextVar[str | None] = ContextVar("search_preference", default=None)
+
+
+def set_session(session_id: str | None) -> None:
+    """
+    Привязывает поиски текущего запроса к сессии пользователя: запросы с
+    одинаковым preference эластик направляет на одни и те же копии шардов,
+    поэтому повторные запросы сессии попадают в их request cache
+    """
+    if not session_id:
+        _preference.set(None)
+        return
+    digest = hashlib.blake2b(session_id.encode(), digest_size=8).hexdigest()
+    _preference.set(f"session-{digest}")
+
+
+def session_preference() -> str | None:
+    """preference для запросов к эластику или None, если сессии нет"""
+    return _preference.get()
@@ -0,0 +1,7 @@
+from uvicorn.workers import UvicornWorker
+
+
+class ProductionWorker(UvicornWorker):
+    """Воркер gunicorn с явным выбором uvloop и httptools"""
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
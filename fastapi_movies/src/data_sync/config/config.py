@@ -27,3 +27,45 @@ class ElasticSettings(BaseSettings):
     )
 
     host: str = os.getenv("ELASTIC_HOST", "http://localhost:9200")
+
+
+class RedisSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="REDIS_",
+        env_file="/fastapi_movies/.env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    host: str = "127.0.0.1"
+    port: int = 6379
+    # узлы с записями кэша API (REDIS_CACHE_NODES), если их несколько
+    cache_nodes: list[str] = []
+    ring_vnodes: int = 160
+
+
+class BloomSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="BLOOM_",
+        env_file="/fastapi_movies/.env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    # вероятность ложноположительного ответа фильтра
+    fp_rate: float = 0.01
+    # запас емкости относительно числа документов при перестроении фильтра
+    growth_factor: float = 2.0
+    min_capacity: int = 10_000
+
+
+class SqliteSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="SQLITE_",
+        env_file="/fastapi_movies/.env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    # файл базы для API без эластика (STORAGE_BACKEND=sqlite)
+    export_path: str = "/fastapi_movies/data/movies.sqlite"
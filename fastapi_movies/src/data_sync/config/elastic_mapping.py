@@ -1,6 +1,17 @@
+# Версия маппинга хранится в _meta индекса. Статические настройки (например,
+# index.sort) нельзя поменять у существующего индекса, поэтому при росте
+# версии data_sync загружает заново новый индекс (movies_v4) и переключает
+# на него алиас movies, через который читает API
 FILMS_MAPPING = {
     "settings": {
         "refresh_interval": "1s",
+        # сегменты упорядочены так же, как список фильмов по умолчанию
+        # (services.film_filter.parse_sort): выборка лучших фильмов без
+        # фильтра останавливается на первых документах каждого сегмента
+        "index": {
+            "sort.field": ["imdb_rating", "id"],
+            "sort.order": ["desc", "desc"],
+        },
         "analysis": {
             "filter": {
                 "english_stop": {"type": "stop", "stopwords": "_english_"},
@@ -29,9 +40,19 @@ FILMS_MAPPING = {
     },
     "mappings": {
         "dynamic": "strict",
+        "_meta": {"version": 4},
         "properties": {
             "id": {"type": "keyword"},
             "imdb_rating": {"type": "float"},
+            "modified": {"type": "date", "format": "date_optional_time"},
+            # плоские id для фильтров: term по keyword вместо nested-запроса,
+            # глобальные ординалы строятся при refresh, а не первым запросом
+            "genre_ids": {"type": "keyword", "eager_global_ordinals": True},
+            "actor_ids": {"type": "keyword", "eager_global_ordinals": True},
+            "director_ids": {"type": "keyword", "eager_global_ordinals": True},
+            "writer_ids": {"type": "keyword", "eager_global_ordinals": True},
+            # все персоны фильма в любой роли: фильмография персоны одним term
+            "person_ids": {"type": "keyword", "eager_global_ordinals": True},
             "genres": {
                 "type": "nested",
                 "dynamic": "strict",
@@ -149,18 +170,16 @@ PERSONS_MAPPING = {
     },
     "mappings": {
         "dynamic": "strict",
+        "_meta": {"version": 2},
         "properties": {
             "id": {"type": "keyword"},
             "full_name": {"type": "text", "analyzer": "ru_en"},
-            "films": {
-                "type": "nested",
-                "properties": {
-                    "id": {"type": "text"},
-                    "roles": {"type": "text"},
-                    "title": {"type": "text"},
-                    "imdb_rating": {"type": "float"},
-                },
-            },
+            "modified": {"type": "date", "format": "date_optional_time"},
+            # краткая сводка лучших фильмов персоны только для выдачи: по ней
+            # не ищут, поэтому она не индексируется и не порождает nested
+            # документов. Вся фильмография - запрос к movies по person_ids
+            "films": {"type": "object", "enabled": False},
+            "films_count": {"type": "integer"},
         },
     },
 }
@@ -0,0 +1,104 @@
+import time
+
+from config.config import BloomSettings
+from dto.loaders import LoadHook
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import scan
+from pydantic import BaseModel
+from redis import Redis
+from utils.bloom import BloomFilter, bloom_keys
+from utils.logger import logger
+
+
+class BloomFilterHook(LoadHook):
+    def __init__(self, redis: Redis, elastic: Elasticsearch, settings: BloomSettings):
+        """
+        Поддерживает в Redis фильтр Блума по id всех документов индекса,
+        чтобы API могло отвечать 404 на заведомо несуществующие id
+        без обращения к кэшу и эластику
+        :param redis: клиент Redis, в котором хранится фильтр
+        :param elastic: клиент эластика для полного перестроения фильтра
+        :param settings: параметры точности и емкости фильтра
+        """
+        self.redis = redis
+        self.elastic = elastic
+        self.settings = settings
+        # индексы, фильтр которых будет перестроен по завершении задачи
+        self.stale: set[str] = set()
+
+    def before_batch(self, index: str, objects: list[BaseModel]) -> None:
+        """
+        Биты id пачки ставятся до ее записи в эластик, поэтому документ не
+        может появиться в индексе раньше, чем в фильтре. Если запись не
+        удастся, лишние биты дадут только ложноположительные ответы.
+        Переполненный фильтр (index в stale) тоже пополняется до перестроения:
+        переполнение только повышает долю ложноположительных ответов, а без
+        битов новые документы считались бы заведомо отсутствующими
+        """
+        bits_key, meta_key = bloom_keys(index)
+        meta = self.redis.hgetall(meta_key)
+        if not meta or not self.redis.exists(bits_key):
+            self.stale.add(index)
+            return
+
+        ids = [str(_object.id) for _object in objects]
+        bloom = BloomFilter(int(meta[b"size"]), int(meta[b"hash_count"]))
+        pipe = self.redis.pipeline(transaction=True)
+        for _id in ids:
+            for position in bloom.positions(_id):
+                pipe.setbit(bits_key, position, 1)
+        # метка записи: копии фильтра в API, сделанные раньше, устарели
+        pipe.hset(meta_key, "synced", time.time_ns())
+        previous = pipe.execute()[:-1]
+
+        # id новый, если до него был пуст хотя бы один из его битов;
+        # обновленные документы емкость фильтра не расходуют
+        added = sum(
+            not all(previous[i : i + bloom.hash_count])
+            for i in range(0, len(previous), bloom.hash_count)
+        )
+        count = self.redis.hincrby(meta_key, "count", added)
+        if count > int(meta[b"capacity"]):
+            self.stale.add(index)
+
+    def after_task(self, index: str) -> None:
+        bits_key, meta_key = bloom_keys(index)
+        if index in self.stale or self.redis.exists(bits_key, meta_key) < 2:
+            self.stale.discard(index)
+            self.rebuild(index)
+
+    def rebuild(self, index: str) -> None:
+        """Строит фильтр заново по всем id индекса и атомарно подменяет старый."""
+        ids = [
+            hit["_id"]
+            for hit in scan(
+                self.elastic,
+                index=index,
+                query={"_source": False, "query": {"match_all": {}}},
+            )
+        ]
+        capacity = max(
+            int(len(ids) * self.settings.growth_factor), self.settings.min_capacity
+        )
+        bloom = BloomFilter.for_capacity(capacity, self.settings.fp_rate)
+        for _id in ids:
+            bloom.add(_id)
+
+        bits_key, meta_key = bloom_keys(index)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.set(bits_key, bytes(bloom.bits))
+        pipe.delete(meta_key)
+        pipe.hset(
+            meta_key,
+            mapping={
+                "size": bloom.size,
+                "hash_count": bloom.hash_count,
+                "capacity": capacity,
+                "count": len(ids),
+                "synced": time.time_ns(),
+            },
+        )
+        pipe.execute()
+        logger.info(
+            f"Bloom filter for {index} rebuilt: {len(ids)} ids, {bloom.size} bits"
+        )
@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+from dto.loaders import LoadHook
+from pydantic import BaseModel
+from redis import Redis
+from utils.cache_tags import (INVALIDATION_CHANNEL, film_tag, genre_films_tag,
+                              genre_tag, person_films_tag, person_tag, tag_key)
+from utils.constants import GENRES_INDEX, MOVIES_INDEX, PERSONS_INDEX
+from utils.hash_ring import HashRing
+from utils.logger import logger
+
+
+class CacheInvalidationHook(LoadHook):
+    def __init__(
+        self,
+        redis: Redis,
+        cache_nodes: dict[str, Redis] | None = None,
+        vnodes: int = 160,
+    ):
+        """
+        Удаляет из кэша API записи, зависящие от загруженных документов:
+        сами документы, фильмы с измененными жанрами и персонами,
+        страницы фильмов по жанрам и фильмографии персон, состав которых
+        мог измениться
+        :param redis: клиент Redis, в котором хранятся теги кэша API
+        :param cache_nodes: узлы с записями кэша по адресам host:port, если
+            API распределяет кэш по нескольким узлам (REDIS_CACHE_NODES)
+        :param vnodes: число точек узла на кольце, как REDIS_RING_VNODES в API
+        """
+        self.redis = redis
+        self.cache_nodes = cache_nodes or {}
+        self.ring = HashRing(self.cache_nodes, vnodes)
+
+    def after_batch(self, index: str, objects: list[BaseModel]) -> None:
+        tags = set()
+        for obj in objects:
+            if index == MOVIES_INDEX:
+                tags.add(film_tag(obj.id))
+                tags.update(genre_films_tag(genre["id"]) for genre in obj.genres or [])
+                tags.update(
+                    person_films_tag(person_id) for person_id in obj.person_ids or []
+                )
+            elif index == GENRES_INDEX:
+                tags.add(genre_tag(obj.id))
+            elif index == PERSONS_INDEX:
+                tags.add(person_tag(obj.id))
+        if tags:
+            removed = self.invalidate(tags)
+            logger.info(f"Cache invalidated: {len(tags)} tags, {removed} keys")
+
+    def invalidate(self, tags: set[str]) -> int:
+        # чтение и удаление множеств тегов в одной транзакции, как в
+        # db.cache_tags.invalidate_tags API
+        tag_keys = [tag_key(tag) for tag in tags]
+        pipe = self.redis.pipeline(transaction=True)
+        for key in tag_keys:
+            pipe.smembers(key)
+        pipe.delete(*tag_keys)
+        *members, _ = pipe.execute()
+        keys = set().union(*members)
+        removed = self.delete(keys) if keys else 0
+        # воркеры API сбрасывают значения, закрепленные в памяти
+        self.redis.publish(INVALIDATION_CHANNEL, removed)
+        return removed
+
+    def delete(self, keys: set[bytes]) -> int:
+        if not self.cache_nodes:
+            return self.redis.delete(*keys)
+        groups = defaultdict(list)
+        for key in keys:
+            groups[self.ring.node_for(key.decode())].append(key)
+        return sum(
+            self.cache_nodes[node].delete(*node_keys)
+            for node, node_keys in groups.items()
+        )
@@ -76,6 +76,7 @@ class ElasticTask(Task):
         extractor: DataExtractor,
         transformer: Transformer,
         sql_path: str,
+        write_index: str | None = None,
     ):
         """
         Представляет собой задачу на загрузку данных из постгреса в эластик
@@ -88,12 +89,16 @@ class ElasticTask(Task):
         формату данных для эластика
         :param sql_path: путь к sql файлу, по которому получаем данные из
         постгреса
+        :param write_index: новый индекс, в который данные загружаются заново
+        при смене версии маппинга. После загрузки на него переключается
+        алиас elastic_index
         """
         self.state_key = state_key
         self.elastic_index = elastic_index
         self.extractor = extractor
         self.transformer = transformer
         self.sql_path = sql_path
+        self.write_index = write_index
 
     @property
     def extractor(self) -> DataExtractor:
@@ -112,6 +117,25 @@ class ElasticTask(Task):
         self._transformer = value
 
 
+class LoadHook(ABC):
+    """
+    Дополнительная обработка загруженных в эластик данных
+    (например, обновление производных структур в Redis)
+    """
+
+    def before_batch(self, index: str, objects: list[BaseModel]) -> None:
+        """Вызывается перед загрузкой пачки объектов в индекс."""
+        pass
+
+    def after_batch(self, index: str, objects: list[BaseModel]) -> None:
+        """Вызывается после успешной загрузки пачки объектов в индекс."""
+        pass
+
+    def after_task(self, index: str) -> None:
+        """Вызывается после завершения задачи по индексу."""
+        pass
+
+
 class LoadManager(ABC):
     """
     Класс, отвечающий за загрузку данных в какую-либо систему
@@ -137,6 +161,7 @@ class ElasticLoadManager(LoadManager):
         self.state = state
         self.last_modified_obj = None
         self.tasks = []
+        self.hooks: list[LoadHook] = []
 
     def _create_el_objects(
         self, task: ElasticTask, db_data: list[dict]
@@ -153,19 +178,61 @@ class ElasticLoadManager(LoadManager):
     def add_task(self, task: ElasticTask):
         self.tasks.append(task)
 
+    def add_hook(self, hook: LoadHook):
+        self.hooks.append(hook)
+
+    def _switch_alias(self, task: ElasticTask) -> None:
+        """
+        Атомарно переводит алиас задачи на загруженный заново индекс и только
+        после этого удаляет старые индексы
+        """
+        alias = task.elastic_index
+        if self.elastic.indices.exists_alias(name=alias):
+            old_indexes = [
+                name
+                for name in self.elastic.indices.get_alias(name=alias)
+                if name != task.write_index
+            ]
+            actions = [
+                {"remove": {"index": name, "alias": alias}} for name in old_indexes
+            ]
+        else:
+            # индекс, созданный до перехода на алиасы, удаляется вместе с
+            # добавлением алиаса с тем же именем
+            old_indexes = []
+            actions = [{"remove_index": {"index": alias}}]
+        actions.append({"add": {"index": task.write_index, "alias": alias}})
+        self.elastic.indices.update_aliases(actions=actions)
+        logger.info(f"Alias {alias} switched to {task.write_index}")
+        for name in old_indexes:
+            self.elastic.indices.delete(index=name)
+
     def load(self):
         for task in self.tasks:
             self.last_modified_obj = self.state.get_state(task.state_key, dt.min)
             query = self.db.get_query(task.sql_path)
+            index = task.write_index or task.elastic_index
+            failed = False
             while db_data := self.db.execute(
                 query=query, params={"dttm": self.last_modified_obj}
             ):
                 el_objects, tmp_last_obj_modified = self._create_el_objects(
                     task, db_data
                 )
-                res = ElasticLoader.load(self.elastic, task.elastic_index, el_objects)
+                for hook in self.hooks:
+                    hook.before_batch(task.elastic_index, el_objects)
+                res = ElasticLoader.load(self.elastic, index, el_objects)
                 if res.get("errors", True):
                     logger.error("Elastic loader have a error!")
+                    failed = True
                     break
+                for hook in self.hooks:
+                    hook.after_batch(task.elastic_index, el_objects)
                 self.last_modified_obj = tmp_last_obj_modified
                 self.state.save_state(task.state_key, str(self.last_modified_obj))
+            if task.write_index and not failed:
+                # хуки after_task перестраивают структуры по алиасу, поэтому
+                # он должен уже указывать на новый индекс
+                self._switch_alias(task)
+            for hook in self.hooks:
+                hook.after_task(task.elastic_index)
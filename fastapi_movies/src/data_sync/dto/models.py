@@ -36,6 +36,12 @@ class ElasticFilmWork(BaseModel):
     directors: list[dict[str, Any]] | None = None
     actors: list[dict[str, Any]] | None = None
     writers: list[dict[str, Any]] | None = None
+    genre_ids: list[str] | None = None
+    actor_ids: list[str] | None = None
+    director_ids: list[str] | None = None
+    writer_ids: list[str] | None = None
+    person_ids: list[str] | None = None
+    modified: str | None = None
 
 
 class PostgresGenre(BaseModel):
@@ -72,3 +78,5 @@ class ElasticPerson(BaseModel):
     id: str
     full_name: str
     films: list[dict[str, Any]] | None = None
+    films_count: int | None = None
+    modified: str | None = None
@@ -0,0 +1,124 @@
+from dto.loaders import LoadHook
+from dto.models import ElasticFilmWork
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import scan
+from redis import Redis
+from utils.constants import MOVIES_INDEX
+from utils.logger import logger
+from utils.rating_index import (MISSING_RATING, RATING_KEY, film_card_key,
+                                genre_rating_key)
+
+# временные ключи, в которых индекс строится заново
+REBUILD_KEY = f"{RATING_KEY}:rebuild"
+# фильмов на один pipeline при перестроении
+REBUILD_BATCH_SIZE = 1000
+
+
+class RatingIndexHook(LoadHook):
+    def __init__(self, redis: Redis, elastic: Elasticsearch):
+        """
+        Поддерживает в Redis отсортированные множества id фильмов по рейтингу
+        (общее и по каждому жанру) и краткие карточки фильмов, чтобы API
+        отдавало популярные фильмы без запроса в эластик
+        :param redis: клиент Redis, в котором хранится индекс
+        :param elastic: клиент эластика для полного перестроения индекса
+        """
+        self.redis = redis
+        self.elastic = elastic
+
+    def after_batch(self, index: str, objects: list[ElasticFilmWork]) -> None:
+        # пока индекса нет, его целиком построит after_task
+        if index != MOVIES_INDEX or not self.redis.exists(RATING_KEY):
+            return
+
+        pipe = self.redis.pipeline(transaction=False)
+        for film in objects:
+            pipe.hget(film_card_key(film.id), "genres")
+        old_genres = pipe.execute()
+
+        pipe = self.redis.pipeline(transaction=True)
+        for film, genres in zip(objects, old_genres):
+            new_genres = {genre["id"] for genre in film.genres or []}
+            for genre_id in set((genres or b"").decode().split(",")) - new_genres:
+                if genre_id:
+                    pipe.zrem(genre_rating_key(genre_id), film.id)
+            self._add(pipe, film.id, film.title, film.imdb_rating, new_genres)
+        pipe.execute()
+
+    def after_task(self, index: str) -> None:
+        if index == MOVIES_INDEX and not self.redis.exists(RATING_KEY):
+            self.rebuild()
+
+    def rebuild(self) -> None:
+        """
+        Строит индекс заново по всем фильмам эластика во временных ключах и
+        подменяет ими старые через RENAME. Запись идет пачками без MULTI, а
+        API до подмены читает прежний индекс целиком
+        """
+        for key in self.redis.scan_iter(match=f"{REBUILD_KEY}*"):
+            self.redis.delete(key)
+
+        genres_seen: set[str] = set()
+        pipe = self.redis.pipeline(transaction=False)
+        count = 0
+        for hit in scan(
+            self.elastic,
+            index=MOVIES_INDEX,
+            query={
+                "_source": ["id", "title", "imdb_rating", "genres.id"],
+                "query": {"match_all": {}},
+            },
+        ):
+            film = hit["_source"]
+            genres = {genre["id"] for genre in film.get("genres") or []}
+            genres_seen |= genres
+            self._add(
+                pipe,
+                film["id"],
+                film["title"],
+                film["imdb_rating"],
+                genres,
+                rating_key=REBUILD_KEY,
+            )
+            count += 1
+            if count % REBUILD_BATCH_SIZE == 0:
+                pipe.execute()
+        pipe.execute()
+
+        pipe = self.redis.pipeline(transaction=True)
+        for key in self.redis.scan_iter(match=f"{RATING_KEY}:genre:*"):
+            if key.decode().rsplit(":", 1)[-1] not in genres_seen:
+                pipe.delete(key)
+        for genre_id in genres_seen:
+            pipe.rename(
+                genre_rating_key(genre_id, REBUILD_KEY), genre_rating_key(genre_id)
+            )
+        if count:
+            pipe.rename(REBUILD_KEY, RATING_KEY)
+        else:
+            pipe.delete(RATING_KEY)
+        pipe.execute()
+        logger.info(f"Rating index rebuilt: {count} films")
+
+    @staticmethod
+    def _add(
+        pipe,
+        film_id: str,
+        title: str,
+        rating: float | None,
+        genres: set[str],
+        rating_key: str = RATING_KEY,
+    ) -> None:
+        score = rating if rating is not None else MISSING_RATING
+        pipe.zadd(rating_key, {film_id: score})
+        for genre_id in genres:
+            pipe.zadd(genre_rating_key(genre_id, rating_key), {film_id: score})
+        pipe.hset(
+            film_card_key(film_id),
+            mapping={
+                "id": film_id,
+                "title": title,
+                "imdb_rating": "" if rating is None else rating,
+                "genres": ",".join(sorted(genres)),
+            },
+        )
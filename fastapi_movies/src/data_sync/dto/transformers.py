@@ -3,6 +3,8 @@ from typing import Any
 
 from dto.models import (ElasticFilmWork, ElasticGenre, ElasticPerson,
                         PostgresFilmWork, PostgresGenre, PostgresPerson)
+from utils.constants import PERSON_FILMS_SUMMARY
+from utils.rating_index import MISSING_RATING
 from utils.utils import create_elastic_objects_list
 
 
@@ -40,6 +42,14 @@ class FilmsElasticTransformer(Transformer):
             actors=[person.model_dump() for person in el_actors],
             directors=[person.model_dump() for person in el_directors],
             writers=[person.model_dump() for person in el_writers],
+            genre_ids=[genre.id for genre in genres],
+            actor_ids=[person.id for person in el_actors],
+            director_ids=[person.id for person in el_directors],
+            writer_ids=[person.id for person in el_writers],
+            person_ids=sorted(
+                {person.id for person in el_actors + el_directors + el_writers}
+            ),
+            modified=data.modified.isoformat(),
         )
 
         return film_work
@@ -59,9 +69,21 @@ class GenresElasticTransformer(Transformer):
 
 class PersonsElasticTransformer(Transformer):
     def transform(self, data: PostgresPerson) -> ElasticPerson:
+        films = data.films or []
+        summary = sorted(
+            films,
+            key=lambda film: (
+                MISSING_RATING
+                if film.get("imdb_rating") is None
+                else film["imdb_rating"]
+            ),
+            reverse=True,
+        )[:PERSON_FILMS_SUMMARY]
         person = ElasticPerson(
             id=str(data.id),
             full_name=data.full_name,
-            films=data.films,
+            films=summary,
+            films_count=len(films),
+            modified=data.modified.isoformat(),
         )
         return person
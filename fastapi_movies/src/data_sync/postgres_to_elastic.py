@@ -1,34 +1,91 @@
 import psycopg
-from config.config import ElasticSettings, PostgresSettings
+from config.config import (BloomSettings, ElasticSettings, PostgresSettings,
+                           RedisSettings)
 from config.elastic_mapping import (FILMS_MAPPING, GENRES_MAPPING,
                                     PERSONS_MAPPING)
+from dto.bloom import BloomFilterHook
+from dto.cache_invalidation import CacheInvalidationHook
 from dto.extractors import (FilmsPostgresExtractor, GenresPostgresExtractor,
                             PersonsPostgresExtractor)
 from dto.loaders import ElasticLoadManager, ElasticTask, PostgresDb
+from dto.rating_index import RatingIndexHook
 from dto.transformers import (FilmsElasticTransformer,
                               GenresElasticTransformer,
                               PersonsElasticTransformer)
-from elasticsearch import Elasticsearch, NotFoundError
+from elasticsearch import Elasticsearch
 from psycopg import ClientCursor
 from psycopg.rows import dict_row
 from pydantic import BaseModel
+from redis import Redis
 from state.json_storage import JsonStorage
 from state.state import State
 from utils.constants import (FILM_WORK_STATE_KEY, GENRE_STATE_KEY,
                              GENRES_INDEX, MOVIES_INDEX, PERSON_STATE_KEY,
                              PERSONS_INDEX)
 from utils.decorators import backoff
+from utils.hash_ring import parse_node
+from utils.logger import logger
 
 
 class Index(BaseModel):
     index: str
     mapping: dict
+    state_key: str
+
+
+def mapping_version(mapping: dict) -> int:
+    return mapping.get("_meta", {}).get("version", 1)
+
+
+def versioned_name(index: Index) -> str:
+    return f"{index.index}_v{mapping_version(index.mapping['mappings'])}"
+
+
+def prepare_index(elastic: Elasticsearch, state: State, index: Index) -> str | None:
+    """
+    Готовит индекс к загрузке. API читает индекс через алиас index.index,
+    за которым стоит индекс с версией маппинга в имени (movies_v4).
+    Возвращает имя нового индекса, если маппинг вырос и документы нужно
+    загрузить в него заново, иначе None
+    """
+    target = versioned_name(index)
+    if elastic.indices.exists_alias(name=index.index):
+        current = list(elastic.indices.get_alias(name=index.index))
+    elif elastic.indices.exists(index=index.index):
+        # индекс, созданный до перехода на алиасы
+        current = [index.index]
+    else:
+        elastic.indices.create(
+            index=target, body={**index.mapping, "aliases": {index.index: {}}}
+        )
+        return None
+
+    mappings = elastic.indices.get_mapping(index=current)
+    current_version = max(
+        mapping_version(mappings[name]["mappings"]) for name in current
+    )
+    if target in current or current_version >= mapping_version(
+        index.mapping["mappings"]
+    ):
+        # новые поля маппинга добавляются в уже существующий индекс
+        elastic.indices.put_mapping(index=index.index, body=index.mapping["mappings"])
+        return None
+
+    # статические настройки меняются только новым индексом. Старый индекс
+    # обслуживает запросы, пока новый загружается с начала; если прошлая
+    # загрузка прервалась, она продолжается с сохраненного состояния
+    if not elastic.indices.exists(index=target):
+        logger.info(f"Creating index {target} for a new mapping version")
+        elastic.indices.create(index=target, body=index.mapping)
+        state.save_state(index.state_key, None)
+    return target
 
 
 @backoff()
 def main():
     postgres_settings = PostgresSettings()
     elastic_settings = ElasticSettings()
+    redis_settings = RedisSettings()
 
     dsl = {
         "dbname": postgres_settings.db,
@@ -39,18 +96,16 @@ def main():
     }
 
     elastic = Elasticsearch(hosts=elastic_settings.host)
+    redis = Redis(host=redis_settings.host, port=redis_settings.port)
     indexes = [
-        Index(index=MOVIES_INDEX, mapping=FILMS_MAPPING),
-        Index(index=GENRES_INDEX, mapping=GENRES_MAPPING),
-        Index(index=PERSONS_INDEX, mapping=PERSONS_MAPPING),
+        Index(index=MOVIES_INDEX, mapping=FILMS_MAPPING, state_key=FILM_WORK_STATE_KEY),
+        Index(index=GENRES_INDEX, mapping=GENRES_MAPPING, state_key=GENRE_STATE_KEY),
+        Index(index=PERSONS_INDEX, mapping=PERSONS_MAPPING, state_key=PERSON_STATE_KEY),
     ]
-    for index in indexes:
-        try:
-            elastic.indices.get(index=index.index)
-        except NotFoundError:
-            elastic.indices.create(index=index.index, body=index.mapping)
-
     state = State(storage=JsonStorage())
+    write_indexes = {
+        index.index: prepare_index(elastic, state, index) for index in indexes
+    }
 
     with psycopg.connect(
         **dsl, row_factory=dict_row, cursor_factory=ClientCursor
@@ -60,6 +115,7 @@ def main():
         film_work_task = ElasticTask(
             state_key=FILM_WORK_STATE_KEY,
             elastic_index=MOVIES_INDEX,
+            write_index=write_indexes[MOVIES_INDEX],
             extractor=FilmsPostgresExtractor(),
             transformer=FilmsElasticTransformer(),
             sql_path="storage/postgresql/queries/load_films.sql",
@@ -67,6 +123,7 @@ def main():
         genre_task = ElasticTask(
             state_key=GENRE_STATE_KEY,
             elastic_index=GENRES_INDEX,
+            write_index=write_indexes[GENRES_INDEX],
             extractor=GenresPostgresExtractor(),
             transformer=GenresElasticTransformer(),
             sql_path="storage/postgresql/queries/load_genres.sql",
@@ -74,6 +131,7 @@ def main():
         person_task = ElasticTask(
             state_key=PERSON_STATE_KEY,
             elastic_index=PERSONS_INDEX,
+            write_index=write_indexes[PERSONS_INDEX],
             extractor=PersonsPostgresExtractor(),
             transformer=PersonsElasticTransformer(),
             sql_path="storage/postgresql/queries/load_persons.sql",
@@ -81,6 +139,20 @@ def main():
         manager.add_task(film_work_task)
         manager.add_task(genre_task)
         manager.add_task(person_task)
+        manager.add_hook(
+            BloomFilterHook(redis=redis, elastic=elastic, settings=BloomSettings())
+        )
+        manager.add_hook(RatingIndexHook(redis=redis, elastic=elastic))
+        manager.add_hook(
+            CacheInvalidationHook(
+                redis=redis,
+                cache_nodes={
+                    node: Redis(*parse_node(node))
+                    for node in redis_settings.cache_nodes
+                },
+                vnodes=redis_settings.ring_vnodes,
+            )
+        )
         manager.load()
 
 
@@ -0,0 +1,76 @@
+"""
+Выгрузка индексов эластика в файл SQLite с таблицами FTS5 для API без
+эластика (STORAGE_BACKEND=sqlite, SQLITE_PATH).
+
+База строится во временном файле рядом с целевым и подменяет его
+атомарно, поэтому API, читающий старый файл, не видит недостроенную базу.
+
+Запуск из каталога data_sync:
+    python sqlite_export.py [--output /fastapi_movies/data/movies.sqlite]
+"""
+
+import argparse
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+from config.config import ElasticSettings, SqliteSettings
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import scan
+from utils.decorators import backoff
+from utils.logger import logger
+from utils.sqlite_schema import TABLES, create_tables, insert_documents
+
+
+def export(elastic: Elasticsearch, path: str) -> dict[str, int]:
+    """Строит базу в path; возвращает число документов по индексам"""
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    counts = {}
+    conn = sqlite3.connect(tmp_path)
+    try:
+        # файл временный: при сбое он строится заново, журнал не нужен
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        create_tables(conn)
+        for name in TABLES:
+            documents = (
+                hit["_source"]
+                for hit in scan(elastic, index=name, query={"query": {"match_all": {}}})
+            )
+            counts[name] = insert_documents(conn, name, documents)
+            conn.execute(f"INSERT INTO {name}_fts ({name}_fts) VALUES ('optimize')")
+            logger.info(f"SQLite export: {counts[name]} documents from {name}")
+        conn.execute(
+            "INSERT INTO meta VALUES ('built_at', ?)",
+            (datetime.now(timezone.utc).isoformat(),),
+        )
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+    return counts
+
+
+@backoff()
+def main():
+    parser = argparse.ArgumentParser(description="Выгрузка индексов в SQLite")
+    parser.add_argument(
+        "--output",
+        default=SqliteSettings().export_path,
+        help="путь к файлу базы",
+    )
+    args = parser.parse_args()
+
+    elastic = Elasticsearch(hosts=ElasticSettings().host)
+    counts = export(elastic, args.output)
+    logger.info(f"SQLite export written to {args.output}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
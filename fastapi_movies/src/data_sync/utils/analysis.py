@@ -0,0 +1,36 @@
+# Разбиение текста на слова и стоп-слова анализатора ru_en
+# (config.elastic_mapping) для мест, где эластика нет: нормализации поисковых
+# запросов и полнотекстового поиска в SQLite.
+# Модуль используется и в data_sync, и в API.
+import re
+import unicodedata
+
+# стоп-слова _english_ и _russian_ эластика: их удаляет анализатор ru_en,
+# поэтому на результат поиска они не влияют
+ENGLISH_STOPWORDS = frozenset(
+    "a an and are as at be but by for if in into is it no not of on or such "
+    "that the their then there these they this to was will with".split()
+)
+RUSSIAN_STOPWORDS = frozenset(
+    "и в во не что он на я с со как а то все она так его но да ты к у же вы "
+    "за бы по только ее мне было вот от меня еще нет о из ему теперь когда "
+    "даже ну вдруг ли если уже или ни быть был него до вас нибудь опять уж "
+    "вам ведь там потом себя ничего ей может они тут где есть надо ней для "
+    "мы тебя их чем была сам чтоб без будто чего раз тоже себе под будет ж "
+    "тогда кто этот того потому этого какой совсем ним здесь этом один почти "
+    "мой тем чтобы нее сейчас были куда зачем всех никогда можно при наконец "
+    "два об другой хоть после над больше тот через эти нас про всего них "
+    "какая много разве три эту моя впрочем хорошо свою этой перед иногда "
+    "лучше чуть том нельзя такой им более всегда конечно всю между".split()
+)
+STOPWORDS = ENGLISH_STOPWORDS | RUSSIAN_STOPWORDS
+
+# слова так, как их выделяет standard tokenizer: буквы и цифры, апостроф
+# внутри слова
+WORD = re.compile(r"\w+(?:'\w+)*")
+
+
+def words(text: str) -> list[str]:
+    """Слова текста в нижнем регистре без стоп-слов, по порядку"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return [word for word in WORD.findall(text) if word not in STOPWORDS]
@@ -0,0 +1,55 @@
+import hashlib
+import math
+
+BLOOM_KEY_PREFIX = "bloom"
+
+
+def bloom_keys(index: str) -> tuple[str, str]:
+    """
+    Ключи Redis, под которыми хранится фильтр Блума индекса
+    :param index: название индекса эластика
+    :return: ключ с битовым массивом и ключ с параметрами фильтра
+    """
+    return f"{BLOOM_KEY_PREFIX}:{index}", f"{BLOOM_KEY_PREFIX}:{index}:meta"
+
+
+class BloomFilter:
+    """
+    Фильтр Блума по идентификаторам документов.
+    Модуль используется и в data_sync, и в API, поэтому зависит только от
+    стандартной библиотеки. Порядок битов совпадает с SETBIT/GETBIT Redis:
+    нулевой бит - старший бит первого байта.
+    """
+
+    def __init__(self, size: int, hash_count: int, bits: bytes | None = None):
+        self.size = size
+        self.hash_count = hash_count
+        self.bits = bytearray(bits or b"").ljust(math.ceil(size / 8), b"\x00")
+
+    @classmethod
+    def for_capacity(cls, capacity: int, fp_rate: float) -> "BloomFilter":
+        """
+        Создает пустой фильтр, рассчитанный на capacity элементов
+        с заданной вероятностью ложноположительного срабатывания
+        """
+        capacity = max(capacity, 1)
+        size = math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+        hash_count = max(round(size / capacity * math.log(2)), 1)
+        return cls(size=size, hash_count=hash_count)
+
+    def positions(self, item: str) -> list[int]:
+        """Номера битов элемента (двойное хэширование Кирша-Митценмахера)"""
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        for position in self.positions(item):
+            self.bits[position >> 3] |= 0x80 >> (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (0x80 >> (position & 7))
+            for position in self.positions(item)
+        )
@@ -0,0 +1,34 @@
+# Теги записей кэша API. Тег называет сущность, от которой зависит запись:
+# по тегу можно удалить все зависящие от нее записи, не сбрасывая весь кэш.
+# Модуль используется и в data_sync, и в API.
+
+# канал Redis, в который публикуется каждая инвалидация: воркеры API
+# сбрасывают по нему значения, закрепленные в памяти (db.hot_keys)
+INVALIDATION_CHANNEL = "cache:invalidated"
+
+
+def tag_key(tag: str) -> str:
+    """Множество Redis с ключами записей, помеченных тегом"""
+    return f"tag:{tag}"
+
+
+def film_tag(film_id: str) -> str:
+    return f"film:{film_id}"
+
+
+def genre_tag(genre_id: str) -> str:
+    return f"genre:{genre_id}"
+
+
+def person_tag(person_id: str) -> str:
+    return f"person:{person_id}"
+
+
+def genre_films_tag(genre_id: str) -> str:
+    """Страницы списка фильмов с фильтром по жанру"""
+    return f"films:genre:{genre_id}"
+
+
+def person_films_tag(person_id: str) -> str:
+    """Страницы фильмографии персоны"""
+    return f"films:person:{person_id}"
@@ -8,4 +8,7 @@ PERSONS_INDEX = "persons"
 
 PG_FETCH_SIZE = 100
 
+# сколько лучших по рейтингу фильмов хранится в документе персоны
+PERSON_FILMS_SUMMARY = 10
+
 BACKOFF_ITERATIONS_COUNT = 15
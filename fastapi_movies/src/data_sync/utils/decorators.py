@@ -3,6 +3,7 @@ from time import sleep
 
 import elastic_transport
 import psycopg
+from redis.exceptions import ConnectionError as RedisConnectionError
 from utils.constants import BACKOFF_ITERATIONS_COUNT
 
 logger = logging.getLogger(__name__)
@@ -27,6 +28,7 @@ def backoff(start_sleep_time=0.1, factor=2, border_sleep_time=10):
                 except (
                     psycopg.OperationalError,
                     elastic_transport.ConnectionError,
+                    RedisConnectionError,
                 ) as e:
                     logger.error(e)
                     if curr_sleep_time < border_sleep_time:
@@ -0,0 +1,64 @@
+import hashlib
+from bisect import bisect, insort
+from typing import Iterable
+
+
+def parse_node(node: str) -> tuple[str, int]:
+    """Адрес узла в виде host:port"""
+    host, _, port = node.rpartition(":")
+    return host, int(port)
+
+
+def ring_hash(value: str) -> int:
+    """Стабильный между процессами хэш строки (в отличие от hash())"""
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), "big"
+    )
+
+
+class HashRing:
+    """
+    Консистентное хэширование ключей кэша по узлам Redis.
+    Каждый узел занимает на кольце vnodes точек, ключ принадлежит узлу
+    первой точки за хэшем ключа. При добавлении узла на него переезжает
+    около 1/N ключей, остальные остаются на прежних узлах.
+    Модуль используется и в data_sync, и в API, поэтому зависит только от
+    стандартной библиотеки.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 160):
+        self.vnodes = vnodes
+        self._points: list[int] = []
+        self._owners: dict[int, str] = {}
+        self.nodes: list[str] = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for replica in range(self.vnodes):
+            point = ring_hash(f"{node}#{replica}")
+            # при совпадении точек владелец определяется порядком имен,
+            # а не порядком добавления узлов
+            if point in self._owners:
+                self._owners[point] = min(self._owners[point], node)
+                continue
+            self._owners[point] = node
+            insort(self._points, point)
+
+    def remove(self, node: str) -> None:
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        nodes = self.nodes
+        self.nodes, self._points, self._owners = [], [], {}
+        for node in nodes:
+            self.add(node)
+
+    def node_for(self, key: str) -> str:
+        if not self._points:
+            raise LookupError("Hash ring has no nodes")
+        index = bisect(self._points, ring_hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
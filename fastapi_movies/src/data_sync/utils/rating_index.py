@@ -0,0 +1,16 @@
+# Ключи вторичного индекса фильмов по рейтингу в Redis.
+# Модуль используется и в data_sync, и в API.
+RATING_KEY = "idx:films:rating"
+# поля краткой карточки фильма, которые хранятся в хэше
+FILM_CARD_FIELDS = ("id", "title", "imdb_rating")
+# рейтинг фильмов без оценки: при сортировке по убыванию они идут последними,
+# как и в эластике
+MISSING_RATING = float("-inf")
+
+
+def genre_rating_key(genre_id: str, rating_key: str = RATING_KEY) -> str:
+    return f"{rating_key}:genre:{genre_id}"
+
+
+def film_card_key(film_id: str) -> str:
+    return f"idx:film:{film_id}"
@@ -0,0 +1,130 @@
+# Схема локальной базы SQLite с документами индексов эластика: ее строит
+# data_sync (sqlite_export.py), а API читает вместо эластика
+# (db.sqlite.SqliteStorage, STORAGE_BACKEND=sqlite).
+# Модуль используется и в data_sync, и в API.
+import json
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from .analysis import words
+
+SCHEMA_VERSION = 1
+# porter - английский стемминг; русские слова ищутся без стемминга
+FTS_TOKENIZER = "porter unicode61 remove_diacritics 2"
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    # поля полнотекстового поиска (match), индексируются в FTS5
+    text_fields: tuple[str, ...]
+    # поля для сортировки и диапазонов: поле запроса -> колонка таблицы.
+    # Значение поля "x.raw" берется из поля "x" документа
+    columns: dict[str, str] = field(default_factory=dict)
+    # keyword-поля со списками id для term и terms
+    keyword_fields: tuple[str, ...] = ()
+
+
+TABLES = {
+    "movies": TableSchema(
+        text_fields=("title",),
+        columns={
+            "imdb_rating": "imdb_rating",
+            "title.raw": "title_raw",
+            "modified": "modified",
+        },
+        keyword_fields=(
+            "genre_ids",
+            "actor_ids",
+            "director_ids",
+            "writer_ids",
+            "person_ids",
+        ),
+    ),
+    "genres": TableSchema(text_fields=("name",), columns={"modified": "modified"}),
+    "persons": TableSchema(
+        text_fields=("full_name",), columns={"modified": "modified"}
+    ),
+}
+
+
+def fts_text(value: Any) -> str:
+    """Текст поля для FTS5: слова без стоп-слов, как их видит анализатор ru_en"""
+    if isinstance(value, list):
+        value = " ".join(str(item) for item in value)
+    return " ".join(words(str(value))) if value else ""
+
+
+def fts_query(field_name: str, text: str) -> str | None:
+    """
+    Запрос FTS5 для match: любое из слов текста в поле, как у match эластика
+    с оператором OR. None, если в тексте одни стоп-слова
+    """
+    terms = words(text)
+    if not terms:
+        return None
+    alternatives = " OR ".join(f'"{term}"' for term in terms)
+    return f"{{{field_name}}} : ({alternatives})"
+
+
+def create_tables(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    for name, schema in TABLES.items():
+        columns = "".join(f", {column}" for column in schema.columns.values())
+        conn.execute(
+            f"CREATE TABLE {name} (rowid INTEGER PRIMARY KEY, "
+            f"id TEXT NOT NULL UNIQUE, source TEXT NOT NULL{columns})"
+        )
+        # id - последний ключ любой сортировки (services.film_filter.parse_sort)
+        for column in schema.columns.values():
+            conn.execute(f"CREATE INDEX {name}_{column} ON {name} ({column}, id)")
+        conn.execute(
+            f"CREATE TABLE {name}_terms (field TEXT NOT NULL, value TEXT NOT NULL, "
+            f"doc INTEGER NOT NULL, PRIMARY KEY (field, value, doc)) WITHOUT ROWID"
+        )
+        # contentless: документы хранятся в основной таблице, FTS5 хранит
+        # только индекс
+        conn.execute(
+            f"CREATE VIRTUAL TABLE {name}_fts USING fts5("
+            f"{', '.join(schema.text_fields)}, content='', "
+            f"tokenize='{FTS_TOKENIZER}')"
+        )
+    conn.execute(
+        "INSERT INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),)
+    )
+
+
+def insert_documents(
+    conn: sqlite3.Connection, name: str, documents: Iterable[dict]
+) -> int:
+    """Добавляет документы индекса name; возвращает их число"""
+    schema = TABLES[name]
+    columns = list(schema.columns.items())
+    placeholders = ", ".join("?" * (len(columns) + 2))
+    column_names = "".join(f", {column}" for _, column in columns)
+    count = 0
+    for document in documents:
+        cursor = conn.execute(
+            f"INSERT INTO {name} (id, source{column_names}) VALUES ({placeholders})",
+            (
+                document["id"],
+                json.dumps(document, ensure_ascii=False),
+                *(document.get(field.removesuffix(".raw")) for field, _ in columns),
+            ),
+        )
+        rowid = cursor.lastrowid
+        conn.executemany(
+            f"INSERT OR IGNORE INTO {name}_terms VALUES (?, ?, ?)",
+            [
+                (field, value, rowid)
+                for field in schema.keyword_fields
+                for value in document.get(field) or ()
+            ],
+        )
+        conn.execute(
+            f"INSERT INTO {name}_fts (rowid, {', '.join(schema.text_fields)}) "
+            f"VALUES (?{', ?' * len(schema.text_fields)})",
+            (rowid, *(fts_text(document.get(f)) for f in schema.text_fields)),
+        )
+        count += 1
+    return count
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Optional
 
 
 class AbstractCache(ABC):
@@ -30,3 +30,24 @@ class AbstractStorage(ABC):
     @abstractmethod
     async def get_batch(self, *args, **kwargs):
         pass
+
+    async def iter_batch(
+        self, index: str, body: dict, offset: int, size: int, chunk_size: int
+    ) -> AsyncIterator[dict]:
+        """
+        Отдает документы страницы [offset, offset + size) по одному,
+        запрашивая их у хранилища частями по chunk_size
+        """
+        end = offset + size
+        for start in range(offset, end, chunk_size):
+            chunk = min(chunk_size, end - start)
+            doc = await self.get_batch(
+                index=index, body={**body, "from": start, "size": chunk}
+            )
+            if not doc:
+                return
+            hits = doc["hits"]["hits"]
+            for hit in hits:
+                yield hit
+            if len(hits) < chunk:
+                return
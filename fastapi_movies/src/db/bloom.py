@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+
+from redis.asyncio import Redis
+
+from data_sync.utils.bloom import BloomFilter, bloom_keys
+
+logger = logging.getLogger(__name__)
+
+
+class IdBloomFilters:
+    """
+    Фильтры Блума по id документов индексов, построенные data_sync.
+    Фильтры периодически копируются из Redis в память воркера, поэтому проверка
+    id не требует сетевых обращений. Если фильтра индекса нет, все id
+    считаются возможно существующими.
+
+    data_sync ставит биты новых id до записи документов в эластик и вместе
+    с ними обновляет метку synced. Раз в sync_check_seconds фоновая задача
+    сверяет метки с копиями: если копия старше последней записи в фильтр,
+    все id индекса считаются возможно существующими до следующего обновления
+    копии. Ложный 404 для нового документа возможен только в пределах
+    sync_check_seconds после его записи.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        indexes: list[str],
+        refresh_seconds: float,
+        sync_check_seconds: float = 1.0,
+    ):
+        self.redis = redis
+        self.indexes = indexes
+        self.refresh_seconds = refresh_seconds
+        self.sync_check_seconds = sync_check_seconds
+        self._filters: dict[str, BloomFilter] = {}
+        self._meta: dict[str, dict] = {}
+        # индексы, в фильтр которых писали после копирования
+        self._stale: set[str] = set()
+
+    def might_exist(self, index: str, doc_id: str) -> bool:
+        bloom = self._filters.get(index)
+        return bloom is None or index in self._stale or doc_id in bloom
+
+    async def check_synced(self) -> None:
+        """Отмечает копии, после которых data_sync писал в фильтр"""
+        indexes = list(self._filters)
+        if not indexes:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for index in indexes:
+                pipe.hget(bloom_keys(index)[1], "synced")
+            marks = await pipe.execute()
+        for index, synced in zip(indexes, marks):
+            meta = self._meta.get(index)
+            if meta is not None and synced != meta.get(b"synced"):
+                self._stale.add(index)
+
+    async def refresh(self) -> None:
+        for index in self.indexes:
+            bits_key, meta_key = bloom_keys(index)
+            meta = await self.redis.hgetall(meta_key)
+            if not meta:
+                self._filters.pop(index, None)
+                self._meta.pop(index, None)
+                self._stale.discard(index)
+                continue
+            if meta == self._meta.get(index):
+                self._stale.discard(index)
+                continue
+
+            async with self.redis.pipeline(transaction=True) as pipe:
+                bits, meta = await pipe.get(bits_key).hgetall(meta_key).execute()
+            if not bits or not meta:
+                continue
+            self._filters[index] = BloomFilter(
+                size=int(meta[b"size"]),
+                hash_count=int(meta[b"hash_count"]),
+                bits=bits,
+            )
+            self._meta[index] = meta
+            self._stale.discard(index)
+
+    async def run(self) -> None:
+        """Фоновое обновление фильтров на протяжении жизни приложения"""
+        next_refresh = 0.0
+        while True:
+            try:
+                if time.monotonic() >= next_refresh:
+                    await self.refresh()
+                    next_refresh = time.monotonic() + self.refresh_seconds
+                else:
+                    await self.check_synced()
+            except Exception:
+                logger.exception("Не удалось обновить фильтры Блума")
+            await asyncio.sleep(min(self.sync_check_seconds, self.refresh_seconds))
+
+
+id_filters: IdBloomFilters | None = None
+
+
+# Функция понадобится при внедрении зависимостей
+async def get_id_filters() -> IdBloomFilters | None:
+    return id_filters
@@ -0,0 +1,77 @@
+import json
+import random
+from collections import OrderedDict
+from typing import Any, Iterable, NamedTuple
+
+from redis.asyncio.client import Pipeline
+
+from core.config import CachePolicy
+from core.config import settings as config
+from data_sync.utils.cache_tags import tag_key
+
+
+class CacheEntry(NamedTuple):
+    """Запись кэша вместе с параметрами хранения"""
+
+    value: Any
+    ttl: int
+    tags: frozenset[str] = frozenset()
+    # значения больше этого размера в байтах не кэшируются
+    max_size: int | None = None
+
+
+class AccessCounter:
+    """
+    Счетчик обращений к ключам кэша в пределах воркера. Хранит последние
+    max_keys ключей, давно не запрашиваемые вытесняются
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._counts: OrderedDict[str, int] = OrderedDict()
+
+    def touch(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._counts[key] = self._counts.pop(key, 0) + 1
+        while len(self._counts) > self.max_keys:
+            self._counts.popitem(last=False)
+
+    def hits(self, key: str) -> int:
+        return self._counts.get(key, 0)
+
+
+access_counter = AccessCounter(config.cache_access_tracked_keys)
+
+
+def policy_ttl(policy: CachePolicy, hits: int) -> int:
+    """
+    Время жизни записи по политике и числу обращений к ключу: ключ,
+    запрошенный один раз, живет меньше, популярный - дольше. Разброс не дает
+    ключам, созданным одновременно, одновременно истечь
+    """
+    if hits <= 1:
+        ttl = policy.ttl * policy.min_ttl_factor
+    elif hits >= policy.hot_hits:
+        ttl = policy.ttl * policy.max_ttl_factor
+    else:
+        ttl = policy.ttl
+    jitter = ttl * policy.jitter_percent / 100
+    return max(1, round(ttl + random.uniform(-jitter, jitter)))
+
+
+def pipeline_set(pipe: Pipeline, key: str, entry: CacheEntry) -> bool:
+    """
+    Добавляет в пайплайн запись значения и его тегов. Множество тега живет
+    не меньше самой долгой из добавленных в него записей.
+    Возвращает False, если значение больше допустимого и не записано
+    """
+    data = json.dumps(entry.value)
+    if entry.max_size is not None and len(data) > entry.max_size:
+        return False
+    pipe.set(key, data, ex=entry.ttl)
+    for tag in entry.tags:
+        pipe.sadd(tag_key(tag), key)
+        # NX задает срок новому множеству, GT только продлевает существующий
+        pipe.expire(tag_key(tag), entry.ttl, nx=True)
+        pipe.expire(tag_key(tag), entry.ttl, gt=True)
+    return True
@@ -0,0 +1,59 @@
+import asyncio
+import logging
+from collections import defaultdict
+
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+# хэш Redis с попаданиями и промахами всех воркеров по префиксам ключей
+CACHE_STATS_KEY = "stats:cache"
+# служебные ключи, у которых префикс отделен двоеточием
+SERVICE_PREFIXES = ("tag", "idx", "bloom", "stats")
+
+
+def key_prefix(key: str) -> str:
+    """
+    Префикс ключа кэша для группировки в статистике: films - страницы
+    фильмов, films:id - записи фильмов, tag - множества тегов и т.д.
+    """
+    head = key.split(":", 1)[0]
+    if head in SERVICE_PREFIXES:
+        return head
+    return key.split("_", 1)[0]
+
+
+class CacheStats:
+    """
+    Попадания и промахи кэша по префиксам ключей. Счетчики копятся в памяти
+    воркера и периодически добавляются в общий хэш Redis, откуда их читает
+    python -m db.keyspace
+    """
+
+    def __init__(self, redis: Redis, flush_seconds: float):
+        self.redis = redis
+        self.flush_seconds = flush_seconds
+        self._counts: defaultdict[str, int] = defaultdict(int)
+
+    def record(self, key: str, hit: bool) -> None:
+        self._counts[f"{key_prefix(key)}:{'hits' if hit else 'misses'}"] += 1
+
+    async def flush(self) -> None:
+        counts, self._counts = self._counts, defaultdict(int)
+        if not counts:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for field, count in counts.items():
+                pipe.hincrby(CACHE_STATS_KEY, field, count)
+            await pipe.execute()
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Cache stats flush failed")
+
+
+cache_stats: CacheStats | None = None
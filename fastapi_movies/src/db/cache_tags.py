@@ -0,0 +1,25 @@
+from typing import Iterable
+
+from redis.asyncio import Redis
+
+from data_sync.utils.cache_tags import tag_key
+
+
+async def invalidate_tags(redis: Redis, tags: Iterable[str]) -> int:
+    """
+    Удаляет записи, помеченные любым из тегов, и сами теги. Множества тегов
+    читаются и удаляются в одной транзакции: ключ, помеченный тегом после
+    чтения, попадает в новое множество, а не пропадает вместе со старым
+    """
+    tag_keys = [tag_key(tag) for tag in set(tags)]
+    if not tag_keys:
+        return 0
+    async with redis.pipeline(transaction=True) as pipe:
+        for key in tag_keys:
+            pipe.smembers(key)
+        pipe.delete(*tag_keys)
+        *members, _ = await pipe.execute()
+    keys = set().union(*members)
+    if not keys:
+        return 0
+    return await redis.delete(*keys)
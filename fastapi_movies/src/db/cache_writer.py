@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import suppress
+
+from redis.asyncio import Redis
+
+from db.cache_policy import CacheEntry, pipeline_set
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWriter:
+    """
+    Отложенная запись в кэш: запрос только ставит значение в очередь, а
+    фоновая задача сериализует его и пишет пачками через пайплайн Redis.
+    Очередь ограничена: повторная запись ключа заменяет ожидающее значение,
+    а при заполненной очереди новая запись отбрасывается - кэш не обязан
+    содержать каждый ответ.
+    """
+
+    def __init__(
+        self, redis: Redis, max_pending: int, batch_size: int, flush_interval: float
+    ):
+        self.redis = redis
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        self.submitted = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.oversized = 0
+        self.batches = 0
+
+    def submit(self, key: str, entry: CacheEntry) -> None:
+        """Ставит запись в очередь, не дожидаясь Redis"""
+        self.submitted += 1
+        if key in self._pending:
+            self.coalesced += 1
+            entry = entry._replace(tags=entry.tags | self._pending[key].tags)
+        elif len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending[key] = entry
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """
+        Останавливает фоновую задачу, не прерывая запись текущей пачки,
+        и дописывает оставшиеся записи
+        """
+        self._closing = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+        await self.flush()
+
+    async def _run(self) -> None:
+        """Пишет пачку, когда она набралась или вышло время"""
+        while not self._closing:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Пишет все ожидающие записи"""
+        while self._pending:
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                batch.append(self._pending.popitem(last=False))
+            await self._write(batch)
+
+    async def _write(self, batch: list[tuple[str, CacheEntry]]) -> None:
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                written = sum(pipeline_set(pipe, key, entry) for key, entry in batch)
+                await pipe.execute()
+        except Exception:
+            self.failed += len(batch)
+            logger.exception(f"Cache write of {len(batch)} keys failed")
+            return
+        self.written += written
+        self.oversized += len(batch) - written
+        self.batches += 1
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "oversized": self.oversized,
+            "batches": self.batches,
+        }
+
+
+cache_writer: CacheWriter | None = None
+
+
+# Функция понадобится при внедрении зависимостей
+async def get_cache_writer() -> CacheWriter | None:
+    return cache_writer
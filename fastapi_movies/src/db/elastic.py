@@ -1,6 +1,12 @@
+from typing import AsyncIterator
+
+from elastic_transport import ConnectionTimeout
 from elasticsearch import AsyncElasticsearch, NotFoundError
 
+from core.deadline import DeadlineExceeded, remaining_budget
+from core.preference import session_preference
 from db.base_models import AbstractStorage
+from db.hedging import Hedger
 
 es: AsyncElasticsearch | None = None
 
@@ -11,19 +17,201 @@ async def get_elastic() -> AsyncElasticsearch:
 
 
 class ElasticStorage(AbstractStorage):
-    def __init__(self, elastic: AsyncElasticsearch):
+    # доля оставшегося бюджета, которую получают шарды на поиск: остаток нужен,
+    # чтобы частичный результат успел вернуться до таймаута соединения
+    SHARD_TIMEOUT_SHARE = 0.8
+
+    def __init__(self, elastic: AsyncElasticsearch, hedger: Hedger | None = None):
         self.elastic = elastic
+        # если задан, медленные get и search дублируются
+        self.hedger = hedger
+
+    def _client(self) -> tuple[AsyncElasticsearch, float | None]:
+        """Клиент с таймаутом, равным оставшемуся бюджету запроса"""
+        budget = remaining_budget()
+        if budget is None:
+            return self.elastic, None
+        return self.elastic.options(request_timeout=budget), budget
+
+    async def _hedged(self, operation: str, call, **kwargs):
+        """
+        Вызов call с дублированием, если оно включено. Основной запрос идет
+        с preference сессии, дубль - со случайным, чтобы попасть на другую
+        копию шарда
+        """
+        preference = session_preference()
+        if preference:
+            kwargs.setdefault("preference", preference)
+        if not self.hedger:
+            return await call(**kwargs)
 
-    async def get(self, index: str, id: str) -> dict | None:
+        async def attempt(preference: str | None):
+            if preference:
+                return await call(**{**kwargs, "preference": preference})
+            return await call(**kwargs)
+
+        return await self.hedger.run(operation, attempt)
+
+    async def get(self, index: str, id: str, **kwargs) -> dict | None:
+        client, budget = self._client()
         try:
-            doc = await self.elastic.get(index=index, id=id)
+            doc = await self._hedged("get", client.get, index=index, id=id, **kwargs)
         except NotFoundError:
             return None
+        except ConnectionTimeout:
+            # без бюджета это обычный таймаут соединения клиента
+            if budget is None:
+                raise
+            raise DeadlineExceeded
         return doc
 
     async def get_batch(self, index: str, body: dict, **kwargs) -> dict | None:
+        client, budget = self._client()
+        # таймаут шардов входит в ключ request cache и каждый раз разный,
+        # поэтому кэшируемым запросам его не задаем: их ограничивает таймаут
+        # соединения
+        if budget is not None and not kwargs.get("request_cache"):
+            kwargs.setdefault(
+                "timeout", f"{int(budget * self.SHARD_TIMEOUT_SHARE * 1000)}ms"
+            )
         try:
-            doc = await self.elastic.search(index=index, body=body, **kwargs)
+            doc = await self._hedged(
+                "search", client.search, index=index, body=body, **kwargs
+            )
         except NotFoundError:
             return None
+        except ConnectionTimeout:
+            if budget is None:
+                raise
+            raise DeadlineExceeded
         return doc
+
+    async def get_multi(
+        self, searches: list[tuple[str, dict, dict]]
+    ) -> list[dict | None]:
+        """
+        Несколько поисковых запросов за одно обращение к эластику (msearch):
+        индекс, тело и параметры заголовка запроса (request_cache и т.п.).
+        Для запросов, завершившихся ошибкой, возвращается None
+        """
+        client, budget = self._client()
+        header = {}
+        preference = session_preference()
+        if preference:
+            header["preference"] = preference
+        body = []
+        for index, search, params in searches:
+            if budget is not None and not params.get("request_cache"):
+                search = {
+                    "timeout": f"{int(budget * self.SHARD_TIMEOUT_SHARE * 1000)}ms",
+                    **search,
+                }
+            body.extend([{"index": index, **header, **params}, search])
+        try:
+            doc = await client.msearch(body=body)
+        except ConnectionTimeout:
+            if budget is None:
+                raise
+            raise DeadlineExceeded
+        return [
+            None if "error" in response else response for response in doc["responses"]
+        ]
+
+    async def iter_batch(
+        self, index: str, body: dict, offset: int, size: int, chunk_size: int
+    ) -> AsyncIterator[dict]:
+        """
+        Отдает документы страницы [offset, offset + size) по одному в одном
+        point in time: первая часть берется по from, следующие - через
+        search_after. Документы, проиндексированные во время выдачи, не
+        сдвигают страницу, поэтому части не повторяются и не теряются.
+        Сортировка дополняется id, чтобы search_after продолжал ровно с места
+        остановки и при равных значениях первых ключей (например, _score)
+        """
+        sort = list(body.get("sort") or [{"_score": "desc"}])
+        if "id" not in sort[-1]:
+            sort.append({"id": "asc"})
+        client, budget = self._client()
+        try:
+            pit = await client.open_point_in_time(index=index, keep_alive="1m")
+        except NotFoundError:
+            return
+        except ConnectionTimeout:
+            if budget is None:
+                raise
+            raise DeadlineExceeded
+        pit_id = pit["id"]
+        search_after = None
+        left = size
+        try:
+            while left > 0:
+                chunk = min(chunk_size, left)
+                search = {
+                    **body,
+                    "size": chunk,
+                    "sort": sort,
+                    "pit": {"id": pit_id, "keep_alive": "1m"},
+                }
+                if search_after is None:
+                    search["from"] = offset
+                else:
+                    search["from"] = 0
+                    search["search_after"] = search_after
+                client, budget = self._client()
+                try:
+                    doc = await client.search(body=search)
+                except ConnectionTimeout:
+                    if budget is None:
+                        raise
+                    raise DeadlineExceeded
+                pit_id = doc.get("pit_id", pit_id)
+                hits = doc["hits"]["hits"]
+                for hit in hits:
+                    yield hit
+                if len(hits) < chunk:
+                    return
+                left -= chunk
+                search_after = hits[-1]["sort"]
+        finally:
+            await self.elastic.close_point_in_time(id=pit_id)
+
+    async def scan(
+        self,
+        index: str,
+        query: dict,
+        source: list[str] | None = None,
+        chunk_size: int = 1000,
+        keep_alive: str = "1m",
+    ) -> AsyncIterator[dict]:
+        """
+        Обходит все документы индекса через point in time и search_after.
+        В памяти держится только текущая порция документов, а следующая
+        запрашивается лишь после того, как потребитель разобрал предыдущую.
+        Бюджет времени запроса здесь не применяется: выгрузка длительная.
+        """
+        pit = await self.elastic.open_point_in_time(index=index, keep_alive=keep_alive)
+        pit_id = pit["id"]
+        search_after = None
+        try:
+            while True:
+                body = {
+                    "query": query,
+                    "size": chunk_size,
+                    "pit": {"id": pit_id, "keep_alive": keep_alive},
+                    "sort": [{"_shard_doc": "asc"}],
+                    "track_total_hits": False,
+                }
+                if source is not None:
+                    body["_source"] = source
+                if search_after is not None:
+                    body["search_after"] = search_after
+                doc = await self.elastic.search(body=body)
+                pit_id = doc.get("pit_id", pit_id)
+                hits = doc["hits"]["hits"]
+                if not hits:
+                    return
+                for hit in hits:
+                    yield hit
+                search_after = hits[-1]["sort"]
+        finally:
+            await self.elastic.close_point_in_time(id=pit_id)
@@ -0,0 +1,83 @@
+import itertools
+import time
+
+from elastic_transport import AiohttpHttpNode, NodeSelector
+from elasticsearch import AsyncElasticsearch
+
+
+class TrackedNode(AiohttpHttpNode):
+    """
+    Узел эластика, считающий запросы в полете, ошибки и время ответа.
+    Счетчики нужны селектору LeastInFlightSelector и метрикам воркера
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_failure: float | None = None
+        self.last_latency: float | None = None
+
+    async def perform_request(self, *args, **kwargs):
+        self.in_flight += 1
+        self.requests += 1
+        started = time.monotonic()
+        try:
+            response = await super().perform_request(*args, **kwargs)
+        except Exception:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_failure = time.time()
+            raise
+        finally:
+            self.in_flight -= 1
+        self.consecutive_failures = 0
+        self.last_latency = time.monotonic() - started
+        return response
+
+    def health(self) -> dict:
+        return {
+            "url": self.base_url,
+            "healthy": self.consecutive_failures == 0,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_failure": self.last_failure,
+            "last_latency": self.last_latency,
+        }
+
+
+class LeastInFlightSelector(NodeSelector):
+    """
+    Выбирает живой узел с наименьшим числом запросов в полете: медленный
+    узел копит незавершенные запросы и получает меньше новых. При равенстве
+    узлы чередуются по кругу
+    """
+
+    def __init__(self, node_configs):
+        super().__init__(node_configs)
+        self._counter = itertools.count()
+
+    def select(self, nodes):
+        offset = next(self._counter) % len(nodes)
+        rotated = nodes[offset:] + nodes[:offset]
+        return min(rotated, key=lambda node: getattr(node, "in_flight", 0))
+
+
+# значения ELASTIC_NODE_SELECTOR
+NODE_SELECTORS = {
+    "round_robin": "round_robin",
+    "random": "random",
+    "least_in_flight": LeastInFlightSelector,
+}
+
+
+def nodes_health(elastic: AsyncElasticsearch) -> list[dict]:
+    """Состояние узлов пула клиента, включая найденные сниффингом"""
+    return [
+        node.health() if isinstance(node, TrackedNode) else {"url": node.base_url}
+        for node in elastic.transport.node_pool.all()
+    ]
@@ -0,0 +1,115 @@
+import asyncio
+import time
+import uuid
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class Hedger:
+    """
+    Дублирование медленных запросов к эластику. Если запрос не ответил за
+    время, которое укладывается в заданный перцентиль недавних запросов этого
+    типа, отправляется копия с другим preference (ее обработает другая копия
+    шарда), и используется первый ответ, а второй запрос отменяется.
+    Доля дублей ограничена корзиной токенов: каждый запрос добавляет
+    max_ratio токена, каждый дубль тратит один.
+    """
+
+    # сколько последних задержек помнить для расчета перцентиля
+    SAMPLES = 1000
+    # пока замеров меньше, дубли не отправляются
+    MIN_SAMPLES = 50
+    # как часто пересчитывать задержку дубля, в замерах
+    RECOMPUTE_EVERY = 50
+
+    def __init__(
+        self, percentile: float, min_delay: float, max_ratio: float, burst: float
+    ):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self.burst = burst
+        self._tokens = burst
+        self._samples: dict[str, deque[float]] = {}
+        self._delays: dict[str, float] = {}
+        self._since_recompute: dict[str, int] = {}
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.rate_limited = 0
+
+    async def run(
+        self, operation: str, call: Callable[[str | None], Awaitable[T]]
+    ) -> T:
+        """
+        Выполняет call(preference), при необходимости дублируя его.
+        Основной запрос получает preference=None
+        """
+        self.requests += 1
+        self._tokens = min(self.burst, self._tokens + self.max_ratio)
+        started = time.monotonic()
+
+        primary = asyncio.create_task(call(None))
+        pending = {primary}
+        try:
+            delay = self._delays.get(operation)
+            if delay is not None:
+                done, pending = await asyncio.wait(pending, timeout=delay)
+                if not pending:
+                    result = primary.result()
+                    self._record(operation, time.monotonic() - started)
+                    return result
+                if self._tokens < 1:
+                    self.rate_limited += 1
+                else:
+                    self._tokens -= 1
+                    self.hedged += 1
+                    pending.add(asyncio.create_task(call(f"hedge-{uuid.uuid4().hex}")))
+
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner:
+                    if winner is not primary:
+                        self.hedge_wins += 1
+                    self._record(operation, time.monotonic() - started)
+                    return winner.result()
+            # все запросы завершились ошибкой: отдаем ошибку основного
+            return primary.result()
+        finally:
+            # проигравший запрос (или все, если отменили нас самих) отменяется
+            for task in pending:
+                task.cancel()
+
+    def _record(self, operation: str, elapsed: float) -> None:
+        samples = self._samples.setdefault(operation, deque(maxlen=self.SAMPLES))
+        samples.append(elapsed)
+        since = self._since_recompute.get(operation, 0) + 1
+        if len(samples) >= self.MIN_SAMPLES and since >= self.RECOMPUTE_EVERY:
+            ordered = sorted(samples)
+            index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+            self._delays[operation] = max(self.min_delay, ordered[index])
+            since = 0
+        self._since_recompute[operation] = since
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "rate_limited": self.rate_limited,
+            "hedge_rate": self.hedged / self.requests if self.requests else 0.0,
+            "delays": dict(self._delays),
+        }
+
+
+hedger: Hedger | None = None
+
+
+# Функция понадобится при внедрении зависимостей
+async def get_hedger() -> Hedger | None:
+    return hedger
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import random
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any
+
+from redis.asyncio import Redis
+
+from data_sync.utils.cache_tags import INVALIDATION_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+
+class CountMinSketch:
+    """
+    Оценка частоты ключей в фиксированной памяти: оценка не меньше
+    настоящего числа обращений и превышает его только из-за коллизий
+    """
+
+    def __init__(self, width: int, depth: int):
+        self.width = width
+        self.depth = depth
+        self._rows = [array("L", bytes(8 * width)) for _ in range(depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Учитывает обращения к ключу и возвращает новую оценку"""
+        estimate = None
+        for row, counters in enumerate(self._rows):
+            index = hash((row, key)) % self.width
+            counters[index] += count
+            if estimate is None or counters[index] < estimate:
+                estimate = counters[index]
+        return estimate
+
+    def decay(self) -> None:
+        """Уменьшает счетчики вдвое, чтобы старые обращения весили меньше"""
+        for counters in self._rows:
+            for index, value in enumerate(counters):
+                counters[index] = value >> 1
+
+
+class HotKeys:
+    """
+    Поиск самых запрашиваемых ключей кэша в воркере и их копирование в память
+    воркера. Обращения учитываются выборочно в count-min sketch, лучшие top_k
+    ключей по оценке хранятся отдельно. Ключ с оценкой не меньше hot_threshold
+    обращений за окно считается горячим: его значение после чтения из Redis
+    хранится в памяти local_ttl секунд, и запросы за это время не доходят до
+    Redis. Короткий срок ограничивает расхождение копии с Redis.
+    """
+
+    def __init__(
+        self,
+        top_k: int,
+        hot_threshold: int,
+        sample_rate: float,
+        window_seconds: float,
+        local_ttl: float,
+        sketch_width: int = 4096,
+        sketch_depth: int = 4,
+    ):
+        self.top_k = top_k
+        self.hot_threshold = hot_threshold
+        self.sample_rate = sample_rate
+        self.window_seconds = window_seconds
+        self.local_ttl = local_ttl
+        self._sketch = CountMinSketch(sketch_width, sketch_depth)
+        self._top: dict[str, int] = {}
+        self._window_started = time.monotonic()
+        self._pinned: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self.pin_hits = 0
+        self.pins = 0
+
+    def record(self, key: str) -> None:
+        """Учитывает обращение к ключу"""
+        now = time.monotonic()
+        if now - self._window_started >= self.window_seconds:
+            self._decay(now)
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        estimate = round(self._sketch.add(key) / self.sample_rate)
+        if key in self._top or len(self._top) < self.top_k:
+            self._top[key] = estimate
+            return
+        coldest = min(self._top, key=self._top.get)
+        if estimate > self._top[coldest]:
+            del self._top[coldest]
+            self._top[key] = estimate
+
+    def is_hot(self, key: str) -> bool:
+        return self._top.get(key, 0) >= self.hot_threshold
+
+    def get_pinned(self, key: str) -> Any | None:
+        """Значение из памяти воркера, если ключ закреплен и срок не истек"""
+        pinned = self._pinned.get(key)
+        if pinned is None:
+            return None
+        expires, value = pinned
+        if expires <= time.monotonic():
+            del self._pinned[key]
+            return None
+        self.pin_hits += 1
+        return value
+
+    def maybe_pin(self, key: str, value: Any) -> None:
+        """Закрепляет значение в памяти воркера, если ключ горячий"""
+        if not self.is_hot(key):
+            return
+        self.pins += 1
+        self._pinned[key] = (time.monotonic() + self.local_ttl, value)
+        self._pinned.move_to_end(key)
+        while len(self._pinned) > self.top_k:
+            self._pinned.popitem(last=False)
+
+    def clear_pinned(self) -> None:
+        """Сбрасывает закрепленные значения, например после инвалидации"""
+        self._pinned.clear()
+
+    async def listen_invalidations(self, redis: Redis) -> None:
+        """
+        Фоновая подписка на инвалидации кэша (INVALIDATION_CHANNEL) на
+        протяжении жизни приложения: сброс в любом воркере или в data_sync
+        сбрасывает и значения, закрепленные в этом воркере
+        """
+        while True:
+            try:
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    # за время переподключения сообщения могли потеряться
+                    self.clear_pinned()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.clear_pinned()
+            except Exception:
+                logger.exception("Подписка на инвалидации кэша прервана")
+            await asyncio.sleep(1)
+
+    def _decay(self, now: float) -> None:
+        self._sketch.decay()
+        self._top = {
+            key: estimate >> 1 for key, estimate in self._top.items() if estimate > 1
+        }
+        self._window_started = now
+
+    def hottest(self) -> list[dict]:
+        """Горячие ключи по убыванию оценки числа обращений"""
+        return [
+            {"key": key, "estimate": estimate, "pinned": key in self._pinned}
+            for key, estimate in sorted(
+                self._top.items(), key=lambda item: item[1], reverse=True
+            )
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self._top),
+            "hot": sum(1 for key in self._top if self.is_hot(key)),
+            "pinned": len(self._pinned),
+            "pins": self.pins,
+            "pin_hits": self.pin_hits,
+        }
+
+
+hot_keys: HotKeys | None = None
+
+
+# Функция понадобится при внедрении зависимостей
+async def get_hot_keys() -> HotKeys | None:
+    return hot_keys
@@ -0,0 +1,181 @@
+"""
+Анализ ключей кэша в Redis для планирования памяти.
+
+Обходит ключи основного узла и узлов кэша (REDIS_CACHE_NODES) через SCAN
+и по каждому префиксу (см. db.cache_stats.key_prefix) считает число ключей,
+занимаемую память и ее перцентили, распределение TTL, попадания и промахи,
+собранные воркерами API, и самые большие значения.
+
+Запуск из каталога src:
+    python -m db.keyspace [--match 'persons*'] [--oversized 65536] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from redis.asyncio import Redis
+
+from core.config import settings as config
+from data_sync.utils.hash_ring import parse_node
+from db.cache_stats import CACHE_STATS_KEY, key_prefix
+
+# границы корзин TTL в секундах
+TTL_BUCKETS = (60, 300, 900, 3600)
+TTL_BUCKET_NAMES = ("<1m", "<5m", "<15m", "<1h", ">=1h")
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class PrefixReport:
+    keys: int = 0
+    total_bytes: int = 0
+    sizes: list[int] = field(default_factory=list)
+    ttl: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    oversized: list[tuple[int, str]] = field(default_factory=list)
+    hits: int = 0
+    misses: int = 0
+
+    def add(self, key: str, size: int, ttl: int, oversized: int) -> None:
+        self.keys += 1
+        self.total_bytes += size
+        self.sizes.append(size)
+        if ttl < 0:
+            self.ttl["no expiry"] += 1
+        else:
+            self.ttl[TTL_BUCKET_NAMES[bisect_right(TTL_BUCKETS, ttl)]] += 1
+        if size > oversized:
+            self.oversized.append((size, key))
+
+    def summary(self, top: int) -> dict:
+        sizes = sorted(self.sizes)
+        lookups = self.hits + self.misses
+        return {
+            "keys": self.keys,
+            "total_bytes": self.total_bytes,
+            "size_percentiles": (
+                {
+                    f"p{p}": sizes[min(len(sizes) - 1, len(sizes) * p // 100)]
+                    for p in PERCENTILES
+                }
+                if sizes
+                else {}
+            ),
+            "max_bytes": sizes[-1] if sizes else 0,
+            "ttl": dict(self.ttl),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else None,
+            "oversized": [
+                {"key": key, "bytes": size}
+                for size, key in sorted(self.oversized, reverse=True)[:top]
+            ],
+        }
+
+
+async def analyze(
+    redis: Redis,
+    match: str,
+    oversized: int,
+    scan_count: int = 1000,
+    reports: dict[str, PrefixReport] | None = None,
+) -> dict[str, PrefixReport]:
+    """
+    Собирает отчет по ключам, подходящим под match. Размер ключа - оценка
+    MEMORY USAGE, включая служебные структуры Redis. Отчеты по нескольким
+    узлам кэша складываются в общий reports
+    """
+    if reports is None:
+        reports = defaultdict(PrefixReport)
+    cursor = 0
+    while True:
+        cursor, keys = await redis.scan(cursor, match=match, count=scan_count)
+        if keys:
+            async with redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.memory_usage(key, samples=0)
+                    pipe.ttl(key)
+                results = await pipe.execute()
+            for index, key in enumerate(keys):
+                size, ttl = results[2 * index], results[2 * index + 1]
+                if size is None:
+                    # ключ истек между SCAN и MEMORY USAGE
+                    continue
+                key = key.decode()
+                reports[key_prefix(key)].add(key, size, ttl, oversized)
+        if cursor == 0:
+            break
+
+    for field_name, count in (await redis.hgetall(CACHE_STATS_KEY)).items():
+        prefix, _, kind = field_name.decode().rpartition(":")
+        if kind == "hits":
+            reports[prefix].hits = int(count)
+        elif kind == "misses":
+            reports[prefix].misses = int(count)
+    return reports
+
+
+def format_report(summaries: dict[str, dict]) -> str:
+    lines = []
+    for prefix, summary in sorted(
+        summaries.items(), key=lambda item: item[1]["total_bytes"], reverse=True
+    ):
+        percentiles = ", ".join(
+            f"{name}={size}" for name, size in summary["size_percentiles"].items()
+        )
+        ttl = ", ".join(f"{name}: {count}" for name, count in summary["ttl"].items())
+        hit_ratio = summary["hit_ratio"]
+        lines.append(
+            f"{prefix}: {summary['keys']} keys, {summary['total_bytes']} bytes"
+            f" ({percentiles}, max={summary['max_bytes']})"
+        )
+        lines.append(f"  ttl: {ttl or '-'}")
+        lines.append(
+            f"  hits: {summary['hits']}, misses: {summary['misses']}, hit ratio: "
+            + (f"{hit_ratio:.1%}" if hit_ratio is not None else "-")
+        )
+        for item in summary["oversized"]:
+            lines.append(f"  oversized: {item['key']} ({item['bytes']} bytes)")
+    return "\n".join(lines)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Анализ ключей кэша в Redis")
+    parser.add_argument("--match", default="*", help="шаблон ключей для SCAN")
+    parser.add_argument(
+        "--oversized",
+        type=int,
+        default=64 * 1024,
+        help="значения больше этого размера в байтах попадают в отчет",
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="сколько больших значений показать"
+    )
+    parser.add_argument("--json", action="store_true", help="вывод в JSON")
+    args = parser.parse_args()
+
+    nodes = [(config.redis_host, config.redis_port)] + [
+        parse_node(node)
+        for node in config.redis_cache_nodes
+        if parse_node(node) != (config.redis_host, config.redis_port)
+    ]
+    reports = defaultdict(PrefixReport)
+    for host, port in nodes:
+        redis = Redis(host=host, port=port)
+        try:
+            await analyze(redis, args.match, args.oversized, reports=reports)
+        finally:
+            await redis.close()
+
+    summaries = {prefix: report.summary(args.top) for prefix, report in reports.items()}
+    if args.json:
+        print(json.dumps(summaries, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(summaries))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
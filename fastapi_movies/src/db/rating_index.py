@@ -0,0 +1,72 @@
+from redis.asyncio import Redis
+
+from core.deadline import budget_timeout
+from data_sync.utils.rating_index import (FILM_CARD_FIELDS, RATING_KEY,
+                                          film_card_key, genre_rating_key)
+
+
+class RatingIndex:
+    """
+    Вторичный индекс фильмов по рейтингу, который data_sync поддерживает в
+    Redis: отсортированные множества id (общее и по жанрам) и краткие карточки
+    фильмов. Позволяет отдать страницу фильмов по убыванию рейтинга без
+    запроса в эластик.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    # порядок ZREVRANGE: по убыванию рейтинга, при равенстве по убыванию id
+    ORDER = ("-imdb_rating", "-id")
+
+    def covers(self, film_filter, fields: list[str] | None) -> bool:
+        """
+        Можно ли ответить на запрос списка фильмов (services.film_filter.
+        FilmFilter) из индекса: порядок индекса, не больше одного жанра и
+        без ограничения рейтинга
+        """
+        return (
+            film_filter.sort == self.ORDER
+            and len(film_filter.genres) <= 1
+            and not film_filter.has_rating_range
+            and set(fields or FILM_CARD_FIELDS) <= set(FILM_CARD_FIELDS)
+        )
+
+    async def page(
+        self, genre_id: str | None, offset: int, size: int
+    ) -> list[dict] | None:
+        """
+        Карточки фильмов страницы по убыванию рейтинга.
+        None, если индекс еще не построен
+        """
+        key = genre_rating_key(genre_id) if genre_id else RATING_KEY
+        async with budget_timeout():
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.exists(RATING_KEY)
+                pipe.zrevrange(key, offset, offset + size - 1)
+                ready, film_ids = await pipe.execute()
+            if not ready:
+                return None
+            if not film_ids:
+                return []
+
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for film_id in film_ids:
+                    pipe.hmget(film_card_key(film_id.decode()), FILM_CARD_FIELDS)
+                cards = await pipe.execute()
+
+        films = []
+        for card in cards:
+            # карточка могла пропасть между запросами: такую страницу
+            # безопаснее собрать из эластика
+            if card[0] is None:
+                return None
+            film_id, title, rating = (value.decode() for value in card)
+            films.append(
+                {
+                    "id": film_id,
+                    "title": title,
+                    "imdb_rating": float(rating) if rating else None,
+                }
+            )
+        return films
@@ -1,10 +1,26 @@
 import json
-from typing import Any
+import logging
+from typing import Any, Iterable
 
+from pydantic import BaseModel
 from redis.asyncio import Redis
 
+from core.config import CachePolicy
+from core.config import settings as config
+from core.deadline import DeadlineExceeded, budget_timeout
+from data_sync.utils.cache_tags import (INVALIDATION_CHANNEL, film_tag,
+                                        genre_films_tag, genre_tag,
+                                        person_films_tag, person_tag)
+from db import cache_stats, hot_keys
 from db.base_models import AbstractCache
-from models.models import Film, GenreDetail, PersonDetail
+from db.cache_policy import (CacheEntry, access_counter, pipeline_set,
+                             policy_ttl)
+from db.cache_tags import invalidate_tags
+from db.cache_writer import CacheWriter
+from models.models import Film, GenreDetail, PersonDetail, SearchResult
+from models.partial import partial_model
+
+logger = logging.getLogger(__name__)
 
 redis: Redis | None = None
 
@@ -17,99 +33,398 @@ async def get_redis() -> Redis:
 class RedisCache(AbstractCache):
     """Реализуем интерфейс Redis"""
 
-    CACHE_SECONDS = 60 * 5
+    _cache_prefix = ""
+    _model: type[BaseModel] | None = None
+    # политики кэширования (core.config.DEFAULT_CACHE_POLICIES) записей
+    # сущностей и страниц
+    _entity_policy = ""
+    _page_policy = ""
+
+    def __init__(self, cache_client: Redis, writer: CacheWriter | None = None):
+        super().__init__(cache_client)
+        # если задан, запись в кэш уходит в фоновую очередь и не задерживает
+        # ответ
+        self.writer = writer
 
     async def get_from_cache(self, key: str) -> dict | None:
-        data = await self.cache_client.get(key)
+        access_counter.touch([key])
+        hot = hot_keys.hot_keys
+        if hot:
+            hot.record(key)
+            pinned = hot.get_pinned(key)
+            if pinned is not None:
+                if cache_stats.cache_stats:
+                    cache_stats.cache_stats.record(key, True)
+                return pinned
+        async with budget_timeout():
+            data = await self.cache_client.get(key)
+        if cache_stats.cache_stats:
+            cache_stats.cache_stats.record(key, bool(data))
         if data:
-            return json.loads(data)
+            value = json.loads(data)
+            if hot:
+                hot.maybe_pin(key, value)
+            return value
         return None
 
-    async def put_to_cache(self, key: str, value: Any, ttl: int) -> None:
-        await self.cache_client.set(key, json.dumps(value), ex=ttl)
+    async def put_to_cache(
+        self, key: str, value: Any, ttl: int, tags: Iterable[str] = ()
+    ) -> None:
+        """
+        Запись одного ключа с базовым временем жизни ttl. Множители по числу
+        обращений, разброс и предельный размер - как в политике по умолчанию
+        """
+        policy = CachePolicy(ttl=ttl)
+        entry = CacheEntry(
+            value=value,
+            ttl=policy_ttl(policy, access_counter.hits(key)),
+            tags=frozenset(tags),
+            max_size=policy.max_size,
+        )
+        await self.put_many_to_cache({key: entry})
+
+    async def get_many_from_cache(self, keys: list[str]) -> list[Any | None]:
+        """
+        Значения нескольких ключей за одно обращение (MGET). Ключи,
+        закрепленные в памяти воркера, в Redis не запрашиваются
+        """
+        access_counter.touch(keys)
+        hot = hot_keys.hot_keys
+        values = {}
+        if hot:
+            for key in keys:
+                hot.record(key)
+                pinned = hot.get_pinned(key)
+                if pinned is not None:
+                    values[key] = pinned
+                    if cache_stats.cache_stats:
+                        cache_stats.cache_stats.record(key, True)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            async with budget_timeout():
+                data = await self.cache_client.mget(missing)
+            for key, raw in zip(missing, data):
+                if cache_stats.cache_stats:
+                    cache_stats.cache_stats.record(key, bool(raw))
+                values[key] = json.loads(raw) if raw else None
+                if hot and raw:
+                    hot.maybe_pin(key, values[key])
+        return [values[key] for key in keys]
+
+    async def put_many_to_cache(self, entries: dict[str, CacheEntry]) -> None:
+        """
+        Запись нескольких ключей одним пайплайном. По тегам записей их можно
+        удалить через invalidate
+        """
+        if not entries:
+            return
+        if self.writer:
+            for key, entry in entries.items():
+                self.writer.submit(key, entry)
+            return
+        # запись в кэш не нужна пользователю, поэтому при исчерпанном бюджете
+        # она пропускается, а не превращает готовый ответ в ошибку
+        try:
+            async with budget_timeout():
+                async with self.cache_client.pipeline(transaction=False) as pipe:
+                    for key, entry in entries.items():
+                        pipeline_set(pipe, key, entry)
+                    await pipe.execute()
+        except DeadlineExceeded:
+            logger.warning(f"Cache write for {len(entries)} keys skipped")
+
+    @staticmethod
+    def entry(
+        key: str, value: Any, policy: str, tags: Iterable[str] = ()
+    ) -> CacheEntry:
+        """Запись по политике: время жизни зависит от числа обращений к ключу"""
+        cache_policy = config.cache_policy(policy)
+        return CacheEntry(
+            value=value,
+            ttl=policy_ttl(cache_policy, access_counter.hits(key)),
+            tags=frozenset(tags),
+            max_size=cache_policy.max_size,
+        )
+
+    async def invalidate(self, tags: Iterable[str]) -> int:
+        """Удаляет записи, помеченные любым из тегов; возвращает их число"""
+        removed = await invalidate_tags(self.cache_client, tags)
+        if hot_keys.hot_keys:
+            hot_keys.hot_keys.clear_pinned()
+        # остальные воркеры сбрасывают закрепленные значения по сообщению
+        await self.cache_client.publish(INVALIDATION_CHANNEL, removed)
+        return removed
+
+    def list_key(self, *args) -> str:
+        """Ключ страницы списка или поиска"""
+        return self.create_cache_key(self._cache_prefix, *args)
+
+    def entity_key(self, entity_id: str, fields: list[str] | None = None) -> str:
+        """Ключ записи одной сущности; его же использует кэш деталей"""
+        return self.create_cache_key(
+            f"{self._cache_prefix}:id", entity_id, self.fields_key(fields)
+        )
+
+    @staticmethod
+    def fields_key(fields: list[str] | None) -> str | None:
+        """Часть ключа для записи, содержащей только часть полей"""
+        return f"fields:{','.join(fields)}" if fields else None
+
+    def model_for(self, fields: list[str] | None) -> type[BaseModel]:
+        """Модель записи: полная или только с запрошенными полями"""
+        return partial_model(self._model, frozenset(fields)) if fields else self._model
+
+    async def get_entity(
+        self, entity_id: str, fields: list[str] | None = None
+    ) -> BaseModel | None:
+        data = await self.get_from_cache(self.entity_key(entity_id, fields))
+        if data:
+            return self.model_for(fields).parse_obj(data)
+        return None
+
+    async def put_entity(
+        self, entity: BaseModel, fields: list[str] | None = None
+    ) -> None:
+        await self.put_many_to_cache(self.entity_entries([entity], fields))
+
+    def entity_tags(self, entity: BaseModel) -> set[str]:
+        """Теги записи сущности: сущности, данные которых в нее входят"""
+        return set()
+
+    async def hydrate(
+        self, ids: list[str], fields: list[str] | None = None
+    ) -> list[BaseModel] | None:
+        """
+        Сущности по списку id одним MGET. None, если хотя бы одной записи
+        нет: страницу тогда дешевле собрать заново, чем дочитывать по одной
+        """
+        if not ids:
+            return []
+        values = await self.get_many_from_cache(
+            [self.entity_key(entity_id, fields) for entity_id in ids]
+        )
+        if not all(values):
+            return None
+        model = self.model_for(fields)
+        return [model.parse_obj(value) for value in values]
+
+    def entity_entries(
+        self, entities: list[BaseModel], fields: list[str] | None = None
+    ) -> dict[str, CacheEntry]:
+        """Записи сущностей для put_many_to_cache"""
+        entries = {}
+        for entity in entities:
+            key = self.entity_key(entity.id, fields)
+            entries[key] = self.entry(
+                key, entity.dict(), self._entity_policy, self.entity_tags(entity)
+            )
+        return entries
+
+    def page_entry(
+        self,
+        page_key: str,
+        entities: list[BaseModel],
+        tags: Iterable[str] = (),
+        policy: str | None = None,
+    ) -> dict[str, CacheEntry]:
+        """Запись страницы из id сущностей для put_many_to_cache"""
+        return {
+            page_key: self.entry(
+                page_key,
+                [entity.id for entity in entities],
+                policy or self._page_policy,
+                tags,
+            )
+        }
+
+    async def get_page(
+        self, *args, fields: list[str] | None = None
+    ) -> list[BaseModel] | None:
+        """
+        Страница списка или поиска. В ключе страницы хранятся только id,
+        сами сущности хранятся по одной под своими ключами
+        """
+        ids = await self.get_from_cache(self.list_key(*args, self.fields_key(fields)))
+        if not ids:
+            return None
+        return await self.hydrate(ids, fields)
+
+    async def put_page(
+        self,
+        entities: list[BaseModel],
+        *args,
+        fields: list[str] | None = None,
+        tags: Iterable[str] = (),
+        policy: str | None = None,
+    ) -> None:
+        """
+        tags - теги самой страницы: от чего зависит ее состав. От изменения
+        сущностей страницу защищает то, что без их записей она не соберется.
+        policy - политика страницы, если она отличается от политики списка
+        """
+        page_key = self.list_key(*args, self.fields_key(fields))
+        await self.put_many_to_cache(
+            {
+                **self.entity_entries(entities, fields),
+                **self.page_entry(page_key, entities, tags, policy),
+            }
+        )
 
 
 class FilmRedisCache(RedisCache):
     """Класс для кэширования фильмов"""
 
     _cache_prefix = "films"
+    _model = Film
+    _entity_policy = "film"
+    _page_policy = "films"
 
-    async def get_film(self, film_id: str) -> Film | None:
-        data = await self.get_from_cache(film_id)
-        if data:
-            return Film.parse_obj(data)
-        return None
+    async def get_film(
+        self, film_id: str, fields: list[str] | None = None
+    ) -> Film | None:
+        return await self.get_entity(film_id, fields)
 
-    async def put_film(self, film: Film) -> None:
-        await self.put_to_cache(film.id, film.dict(), self.CACHE_SECONDS)
+    async def put_film(self, film: Film, fields: list[str] | None = None) -> None:
+        await self.put_entity(film, fields)
 
-    async def get_films(self, *args) -> list[Film] | None:
-        cache_key = self.create_cache_key(self._cache_prefix, *args)
-        data = await self.get_from_cache(cache_key)
-        if data:
-            return [Film.parse_obj(item) for item in data]
-        return None
+    async def get_films(
+        self, *args, fields: list[str] | None = None
+    ) -> list[Film] | None:
+        return await self.get_page(*args, fields=fields)
 
-    async def put_films(self, films: list[Film], *args) -> None:
-        cache_key = self.create_cache_key(self._cache_prefix, *args)
-        await self.put_to_cache(
-            cache_key, [film.dict() for film in films], self.CACHE_SECONDS
+    async def put_films(
+        self,
+        films: list[Film],
+        *args,
+        fields: list[str] | None = None,
+        tags: Iterable[str] = (),
+        policy: str | None = None,
+    ) -> None:
+        await self.put_page(films, *args, fields=fields, tags=tags, policy=policy)
+
+    def entity_tags(self, film: Film) -> set[str]:
+        # у записи с частью полей теги только по тем данным, что в ней есть
+        tags = {film_tag(film.id)}
+        tags.update(
+            genre_tag(genre.id) for genre in getattr(film, "genres", None) or []
         )
+        for role in ("actors", "writers", "directors"):
+            tags.update(
+                person_tag(person.id) for person in getattr(film, role, None) or []
+            )
+        return tags
+
+    @staticmethod
+    def genre_page_tags(genres: Iterable[str]) -> set[str]:
+        """Теги страницы списка фильмов с фильтром по жанрам"""
+        return {genre_films_tag(genre) for genre in genres}
+
+
+class PersonFilmsRedisCache(FilmRedisCache):
+    """
+    Класс для кэширования страниц фильмографии персон. Записи фильмов общие
+    с FilmRedisCache, у страниц свой префикс и своя политика
+    """
+
+    _page_prefix = "films:person"
+    _page_policy = "person_films"
+
+    def list_key(self, *args) -> str:
+        return self.create_cache_key(self._page_prefix, *args)
+
+    @staticmethod
+    def person_page_tags(person_id: str) -> set[str]:
+        """Теги страницы фильмографии: меняются при изменении фильмов персоны"""
+        return {person_films_tag(person_id)}
 
 
 class GenresRedisCache(RedisCache):
     """Класс для кэширования жанров"""
 
     _cache_prefix = "genres"
+    _model = GenreDetail
+    _entity_policy = "genre"
+    _page_policy = "genres"
 
-    async def get_genre(self, genre_id: str) -> GenreDetail | None:
-        data = await self.get_from_cache(genre_id)
-        if data:
-            return GenreDetail.parse_obj(data)
-        return None
+    async def get_genre(
+        self, genre_id: str, fields: list[str] | None = None
+    ) -> GenreDetail | None:
+        return await self.get_entity(genre_id, fields)
 
-    async def put_genre(self, genre: GenreDetail) -> None:
-        await self.put_to_cache(genre.id, genre.dict(), self.CACHE_SECONDS)
+    async def put_genre(
+        self, genre: GenreDetail, fields: list[str] | None = None
+    ) -> None:
+        await self.put_entity(genre, fields)
 
-    async def get_genres(self, *args) -> list[GenreDetail] | None:
-        cache_key = self.create_cache_key(self._cache_prefix, *args)
-        data = await self.get_from_cache(cache_key)
-        if data:
-            return [GenreDetail.parse_obj(item) for item in data]
-        return None
+    async def get_genres(
+        self, *args, fields: list[str] | None = None
+    ) -> list[GenreDetail] | None:
+        return await self.get_page(*args, fields=fields)
 
-    async def put_genres(self, genres: list[GenreDetail], *args) -> None:
-        cache_key = self.create_cache_key(self._cache_prefix, *args)
-        await self.put_to_cache(
-            cache_key, [genre.dict() for genre in genres], self.CACHE_SECONDS
-        )
+    async def put_genres(
+        self, genres: list[GenreDetail], *args, fields: list[str] | None = None
+    ) -> None:
+        await self.put_page(genres, *args, fields=fields)
+
+    def entity_tags(self, genre: GenreDetail) -> set[str]:
+        return {genre_tag(genre.id)}
 
 
 class PersonsRedisCache(RedisCache):
     """Класс для кэширования личностей"""
 
     _cache_prefix = "persons"
+    _model = PersonDetail
+    _entity_policy = "person"
+    # списки персон есть только у поиска
+    _page_policy = "persons_search"
 
-    async def get_person(self, person_id: str) -> PersonDetail | None:
-        data = await self.get_from_cache(person_id)
-        if data:
-            return PersonDetail.parse_obj(data)
-        return None
+    async def get_person(
+        self, person_id: str, fields: list[str] | None = None
+    ) -> PersonDetail | None:
+        return await self.get_entity(person_id, fields)
 
-    async def put_person(self, person: PersonDetail) -> None:
-        await self.put_to_cache(person.id, person.dict(), self.CACHE_SECONDS)
+    async def put_person(
+        self, person: PersonDetail, fields: list[str] | None = None
+    ) -> None:
+        await self.put_entity(person, fields)
 
-    async def get_persons(self, *args) -> list[PersonDetail] | None:
-        cache_key = self.create_cache_key(self._cache_prefix, *args)
-        data = await self.get_from_cache(cache_key)
-        if data:
-            return [PersonDetail.parse_obj(item) for item in data]
-        return None
+    async def get_persons(
+        self, *args, fields: list[str] | None = None
+    ) -> list[PersonDetail] | None:
+        return await self.get_page(*args, fields=fields)
 
-    async def put_persons(self, persons: list[GenreDetail], *args) -> None:
-        cache_key = self.create_cache_key(self._cache_prefix, *args)
-        await self.put_to_cache(
-            cache_key,
-            [person.dict() for person in persons],
-            self.CACHE_SECONDS,
-        )
+    async def put_persons(
+        self, persons: list[PersonDetail], *args, fields: list[str] | None = None
+    ) -> None:
+        await self.put_page(persons, *args, fields=fields)
+
+    def entity_tags(self, person: PersonDetail) -> set[str]:
+        return {person_tag(person.id)}
+
+
+class SearchRedisCache(RedisCache):
+    """
+    Класс для кэширования общего поиска по фильмам и персонам: в записи
+    хранятся только id найденных фильмов и персон
+    """
+
+    _cache_prefix = "search"
+    _page_policy = "search"
+
+    async def get_search(self, *args) -> dict[str, list[str]] | None:
+        return await self.get_from_cache(self.list_key(*args))
+
+    def search_entry(self, result: SearchResult, *args) -> dict[str, CacheEntry]:
+        """Запись результата поиска для put_many_to_cache"""
+        key = self.list_key(*args)
+        return {
+            key: self.entry(
+                key,
+                {
+                    "films": [film.id for film in result.films],
+                    "persons": [person.id for person in result.persons],
+                },
+                self._page_policy,
+            )
+        }
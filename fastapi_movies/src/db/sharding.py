@@ -0,0 +1,142 @@
+import asyncio
+from collections import defaultdict
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
+
+from data_sync.utils.hash_ring import HashRing
+
+# ключи, которые строит и читает data_sync (фильтры Блума, индекс рейтинга,
+# множества тегов), и общая статистика кэша живут на основном узле REDIS_HOST
+PRIMARY_PREFIXES = ("bloom:", "idx:", "tag:", "stats:")
+
+
+class ShardedRedis:
+    """
+    Клиент Redis, раскладывающий записи кэша по нескольким узлам
+    консистентным хэшированием (data_sync.utils.hash_ring). У каждого узла
+    свой клиент и пул соединений. Повторяет ту часть интерфейса
+    redis.asyncio.Redis, которой пользуется API: команды с одним ключом
+    уходят на узел ключа, MGET, DELETE и пайплайны разбиваются по узлам и
+    выполняются параллельно, а ответы собираются в исходном порядке.
+    """
+
+    def __init__(self, primary: Redis, nodes: dict[str, Redis], vnodes: int = 160):
+        self.primary = primary
+        self.nodes = nodes
+        self.ring = HashRing(nodes, vnodes)
+
+    def client_for(self, key: str | bytes) -> Redis:
+        if isinstance(key, bytes):
+            key = key.decode()
+        if key.startswith(PRIMARY_PREFIXES):
+            return self.primary
+        return self.nodes[self.ring.node_for(key)]
+
+    def _split(self, keys) -> dict[Redis, list[int]]:
+        """Позиции ключей, сгруппированные по узлам"""
+        groups: dict[Redis, list[int]] = defaultdict(list)
+        for position, key in enumerate(keys):
+            groups[self.client_for(key)].append(position)
+        return groups
+
+    def __getattr__(self, name: str):
+        # команды с одним ключом первым аргументом: get, set, hgetall, ...
+        def command(key, *args, **kwargs):
+            return getattr(self.client_for(key), name)(key, *args, **kwargs)
+
+        return command
+
+    async def mget(self, keys, *args) -> list[Any]:
+        keys = [keys, *args] if isinstance(keys, (str, bytes)) else list(keys)
+        groups = self._split(keys)
+        replies = await asyncio.gather(
+            *(
+                client.mget([keys[position] for position in positions])
+                for client, positions in groups.items()
+            )
+        )
+        values = [None] * len(keys)
+        for positions, reply in zip(groups.values(), replies):
+            for position, value in zip(positions, reply):
+                values[position] = value
+        return values
+
+    async def delete(self, *keys) -> int:
+        groups = self._split(keys)
+        removed = await asyncio.gather(
+            *(
+                client.delete(*(keys[position] for position in positions))
+                for client, positions in groups.items()
+            )
+        )
+        return sum(removed)
+
+    def publish(self, channel: str, message) -> Any:
+        # каналы pub/sub, как и служебные ключи, - на основном узле
+        return self.primary.publish(channel, message)
+
+    def pubsub(self) -> PubSub:
+        return self.primary.pubsub()
+
+    def pipeline(self, transaction: bool = True) -> "ShardedPipeline":
+        return ShardedPipeline(self, transaction)
+
+    async def close(self) -> None:
+        clients = {self.primary, *self.nodes.values()}
+        await asyncio.gather(*(client.close() for client in clients))
+
+
+class ShardedPipeline:
+    """
+    Пайплайн ShardedRedis: команды копятся и при execute отправляются
+    отдельными пайплайнами на узлы своих ключей. Транзакция возможна, только
+    если все ключи пайплайна лежат на одном узле.
+    """
+
+    def __init__(self, sharded: ShardedRedis, transaction: bool):
+        self.sharded = sharded
+        self.transaction = transaction
+        self._commands: list[tuple[str, tuple, dict]] = []
+
+    async def __aenter__(self) -> "ShardedPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.reset()
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def reset(self) -> None:
+        self._commands = []
+
+    def __getattr__(self, name: str):
+        def command(key, *args, **kwargs) -> "ShardedPipeline":
+            self._commands.append((name, (key, *args), kwargs))
+            return self
+
+        return command
+
+    async def execute(self) -> list[Any]:
+        commands, self._commands = self._commands, []
+        groups = self.sharded._split(args[0] for _, args, _ in commands)
+        if self.transaction and len(groups) > 1:
+            raise ValueError("Transaction keys belong to different Redis nodes")
+
+        async def run(client: Redis, positions: list[int]) -> list[Any]:
+            async with client.pipeline(transaction=self.transaction) as pipe:
+                for position in positions:
+                    name, args, kwargs = commands[position]
+                    getattr(pipe, name)(*args, **kwargs)
+                return await pipe.execute()
+
+        replies = await asyncio.gather(
+            *(run(client, positions) for client, positions in groups.items())
+        )
+        results = [None] * len(commands)
+        for positions, reply in zip(groups.values(), replies):
+            for position, value in zip(positions, reply):
+                results[position] = value
+        return results
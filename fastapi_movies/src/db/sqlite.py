@@ -0,0 +1,289 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator
+
+from core.deadline import budget_timeout
+from data_sync.utils.sqlite_schema import TABLES, TableSchema, fts_query
+from db.base_models import AbstractStorage
+
+storage: "SqliteStorage | None" = None
+
+RANGE_OPERATORS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+# размер страницы эластика по умолчанию
+DEFAULT_SIZE = 10
+
+
+class UnsupportedQuery(ValueError):
+    """В теле запроса есть то, чего нет в схеме базы SQLite"""
+
+
+class SqliteStorage(AbstractStorage):
+    """
+    Хранилище поверх локальной базы SQLite, которую строит data_sync
+    (sqlite_export.py). Принимает те же тела запросов, что собирает
+    services.query.SearchQuery, и отвечает в формате эластика, поэтому
+    сервисы работают с ним так же, как с ElasticStorage.
+
+    Файл открывается только на чтение. sqlite3 синхронный, поэтому запросы
+    выполняются в потоках пула, у каждого потока свое соединение.
+
+    data_sync подменяет файл новой выгрузкой, а открытое соединение
+    продолжает читать старый, уже удаленный файл. Поэтому не чаще раза в
+    reopen_interval секунд соединение сверяет inode и время изменения файла
+    и при расхождении открывается заново
+    """
+
+    def __init__(
+        self,
+        path: str,
+        cache_size_kib: int = 8192,
+        mmap_size: int = 0,
+        reopen_interval: float = 1.0,
+    ):
+        self.path = path
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.reopen_interval = reopen_interval
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        now = time.monotonic()
+        if conn is not None and now - self._local.checked >= self.reopen_interval:
+            self._local.checked = now
+            if self._file_id() not in (None, self._local.file_id):
+                self._close(conn)
+                conn = None
+        if conn is None:
+            file_id = self._file_id()
+            conn = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+            )
+            conn.execute(f"PRAGMA cache_size = -{self.cache_size_kib}")
+            conn.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+            self._local.conn = conn
+            self._local.file_id = file_id
+            self._local.checked = now
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _file_id(self) -> tuple[int, int] | None:
+        """inode и время изменения файла базы; None, если файла сейчас нет"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _close(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._connections.remove(conn)
+        conn.close()
+
+    async def _run(self, func, *args):
+        async with budget_timeout():
+            return await asyncio.to_thread(func, *args)
+
+    async def get(
+        self, index: str, id: str, source_includes: list[str] | None = None, **kwargs
+    ) -> dict | None:
+        if index not in TABLES:
+            return None
+        row = await self._run(self._get, index, id)
+        if row is None:
+            return None
+        return self._hit(index, id, row, source_includes)
+
+    def _get(self, index: str, id: str) -> tuple | None:
+        return (
+            self._connection()
+            .execute(f"SELECT source FROM {index} WHERE id = ?", (id,))
+            .fetchone()
+        )
+
+    async def get_batch(self, index: str, body: dict, **kwargs) -> dict | None:
+        if index not in TABLES:
+            return None
+        return await self._run(self._search, index, body)
+
+    async def get_multi(
+        self, searches: list[tuple[str, dict, dict]]
+    ) -> list[dict | None]:
+        """Несколько поисков за один переход в поток, как msearch"""
+
+        def run() -> list[dict | None]:
+            return [
+                self._search(index, body) if index in TABLES else None
+                for index, body, _ in searches
+            ]
+
+        return await self._run(run)
+
+    async def scan(
+        self,
+        index: str,
+        query: dict,
+        source: list[str] | None = None,
+        chunk_size: int = 1000,
+        keep_alive: str = "1m",
+    ) -> AsyncIterator[dict]:
+        """
+        Обходит все документы, подходящие под запрос, порциями по rowid.
+        Бюджет времени запроса здесь не применяется: выгрузка длительная
+        """
+        sql, params, _ = self._compile(index, {"query": query})
+        last_rowid = 0
+        while True:
+            rows = await asyncio.to_thread(
+                self._fetch,
+                f"{sql} AND t.rowid > ? ORDER BY t.rowid LIMIT ?",
+                [*params, last_rowid, chunk_size],
+            )
+            if not rows:
+                return
+            for rowid, id, raw in rows:
+                yield self._hit(index, id, (raw,), source)
+            last_rowid = rows[-1][0]
+
+    def _fetch(self, sql: str, params: list) -> list[tuple]:
+        return self._connection().execute(sql, params).fetchall()
+
+    def _search(self, index: str, body: dict) -> dict:
+        sql, params, full_text = self._compile(index, body)
+        order_by = self._order_by(index, body, full_text)
+        sql += f" ORDER BY {order_by} LIMIT ? OFFSET ?"
+        params += [body.get("size", DEFAULT_SIZE), body.get("from", 0)]
+        source = body.get("_source")
+        return {
+            "hits": {
+                "hits": [
+                    self._hit(index, id, (raw,), source)
+                    for _, id, raw in self._fetch(sql, params)
+                ]
+            }
+        }
+
+    @staticmethod
+    def _hit(
+        index: str, id: str, row: tuple, source: list[str] | None
+    ) -> dict[str, Any]:
+        document = json.loads(row[0])
+        if source:
+            document = {key: document[key] for key in source if key in document}
+        return {"_index": index, "_id": id, "_source": document}
+
+    def _compile(self, index: str, body: dict) -> tuple[str, list, bool]:
+        """
+        SELECT rowid, id, source по query тела запроса, без сортировки, и
+        признак полнотекстового поиска
+        """
+        schema = TABLES[index]
+        query = body.get("query") or {"match_all": {}}
+        if "match_all" in query:
+            must, filters = [], []
+        elif set(query) == {"bool"}:
+            must = query["bool"].get("must", [])
+            filters = query["bool"].get("filter", [])
+        else:
+            raise UnsupportedQuery(f"query: {', '.join(query)}")
+
+        conditions, params = ["1"], []
+        matches = [self._match(schema, clause) for clause in must]
+        full_text = bool(matches) and None not in matches
+        if full_text:
+            conditions.append(f"{index}_fts MATCH ?")
+            params.append(" AND ".join(f"({match})" for match in matches))
+        elif matches:
+            # match из одних стоп-слов в эластике ничего не находит
+            conditions.append("0")
+        for clause in filters:
+            condition, values = self._filter(index, schema, clause)
+            conditions.append(condition)
+            params.extend(values)
+
+        tables = (
+            f"{index}_fts JOIN {index} t ON t.rowid = {index}_fts.rowid"
+            if full_text
+            else f"{index} t"
+        )
+        return (
+            f"SELECT t.rowid, t.id, t.source FROM {tables} "
+            f"WHERE {' AND '.join(conditions)}",
+            params,
+            full_text,
+        )
+
+    @staticmethod
+    def _match(schema: TableSchema, clause: dict) -> str | None:
+        [(kind, spec)] = clause.items()
+        [(field, options)] = spec.items()
+        if kind != "match" or field not in schema.text_fields:
+            raise UnsupportedQuery(f"{kind}: {field}")
+        text = options["query"] if isinstance(options, dict) else options
+        return fts_query(field, text)
+
+    def _filter(
+        self, index: str, schema: TableSchema, clause: dict
+    ) -> tuple[str, list]:
+        [(kind, spec)] = clause.items()
+        [(field, value)] = spec.items()
+        if kind in ("term", "terms"):
+            values = value if kind == "terms" else [value]
+            marks = ", ".join("?" * len(values))
+            if field in schema.keyword_fields:
+                return (
+                    f"t.rowid IN (SELECT doc FROM {index}_terms "
+                    f"WHERE field = ? AND value IN ({marks}))",
+                    [field, *values],
+                )
+            return f"{self._column(schema, field)} IN ({marks})", list(values)
+        if kind == "range":
+            column = self._column(schema, field)
+            conditions = [
+                f"{column} {RANGE_OPERATORS[op]} ?"
+                for op in value
+                if op in RANGE_OPERATORS
+            ]
+            if len(conditions) != len(value):
+                raise UnsupportedQuery(f"range: {', '.join(value)}")
+            return " AND ".join(conditions), list(value.values())
+        raise UnsupportedQuery(f"{kind}: {field}")
+
+    @staticmethod
+    def _column(schema: TableSchema, field: str) -> str:
+        if field == "id":
+            return "t.id"
+        if field not in schema.columns:
+            raise UnsupportedQuery(f"field: {field}")
+        return f"t.{schema.columns[field]}"
+
+    def _order_by(self, index: str, body: dict, full_text: bool) -> str:
+        """
+        Сортировка тела запроса. Документы без значения идут последними при
+        любом направлении, как в эластике. Без сортировки - по релевантности
+        для полнотекстового поиска и в порядке выгрузки для остальных
+        """
+        keys = []
+        for key in body.get("sort", []):
+            [(field, direction)] = key.items()
+            column = self._column(TABLES[index], field)
+            order = "DESC" if direction == "desc" else "ASC"
+            keys.append(f"{column} IS NULL, {column} {order}")
+        if keys:
+            return ", ".join(keys)
+        if full_text:
+            return f"bm25({index}_fts)"
+        return "t.rowid"
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
@@ -0,0 +1,18 @@
+from elasticsearch import AsyncElasticsearch
+
+from db import sqlite
+from db.base_models import AbstractStorage
+from db.elastic import ElasticStorage
+from db.hedging import Hedger
+
+
+def search_storage(
+    elastic: AsyncElasticsearch | None, hedger: Hedger | None = None
+) -> AbstractStorage:
+    """
+    Хранилище документов для сервисов: локальная база SQLite, если она
+    подключена (STORAGE_BACKEND=sqlite), иначе эластик
+    """
+    if sqlite.storage is not None:
+        return sqlite.storage
+    return ElasticStorage(elastic, hedger)
@@ -0,0 +1,22 @@
+# Конфигурация продакшен-сервера: gunicorn -c gunicorn_conf.py main:app
+import multiprocessing
+import time
+
+# имя config зарезервировано настройками gunicorn
+from core.config import settings as app_settings
+
+bind = app_settings.server_bind
+workers = app_settings.server_workers or multiprocessing.cpu_count()
+worker_class = "core.worker.ProductionWorker"
+# приложение импортируется в каждом воркере, поэтому соединения с Redis
+# и Elasticsearch не наследуются от мастер-процесса
+preload_app = False
+max_requests = app_settings.server_max_requests
+max_requests_jitter = app_settings.server_max_requests_jitter
+timeout = app_settings.server_timeout
+graceful_timeout = app_settings.server_graceful_timeout
+keepalive = app_settings.server_keepalive
+
+
+def pre_fork(server, worker):
+    time.sleep(app_settings.server_worker_stagger_seconds)
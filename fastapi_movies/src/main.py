@@ -1,26 +1,146 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from http import HTTPStatus
 
+from brotli_asgi import BrotliMiddleware
 from elasticsearch import AsyncElasticsearch
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.responses import ORJSONResponse
 from redis.asyncio import Redis
 
-from api.v1 import films, genres, persons
+from api.admin import verify_admin_token
+from api.deadline import RequestBudget
+from api.preference import get_session_preference
+from api.v1 import (cache, export, films, genres, homepage, metrics, persons,
+                    search)
 from core.config import settings as config
-from db import elastic, redis
+from core.deadline import DeadlineExceeded
+from data_sync.utils.hash_ring import parse_node
+from db import (bloom, cache_stats, cache_writer, elastic, es_nodes, hedging,
+                hot_keys, redis, sharding, sqlite)
+from services import normalizer, prefetch
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # startup
+    # startup: выполняется в каждом воркере, поэтому пулы соединений у воркеров
+    # свои и не разделяются между процессами
+    bloom_task = None
+    stats_task = None
+    invalidations_task = None
     try:
         redis.redis = Redis(host=config.redis_host, port=config.redis_port)
-        elastic.es = AsyncElasticsearch(hosts=[config.elastic_host])
+        if config.redis_cache_nodes:
+            redis.redis = sharding.ShardedRedis(
+                primary=redis.redis,
+                nodes={
+                    node: Redis(*parse_node(node)) for node in config.redis_cache_nodes
+                },
+                vnodes=config.redis_ring_vnodes,
+            )
+        if config.storage_backend == "sqlite":
+            # эластик не нужен: сервисы читают локальную базу (db.storage)
+            sqlite.storage = sqlite.SqliteStorage(
+                path=config.sqlite_path,
+                cache_size_kib=config.sqlite_cache_size_kib,
+                mmap_size=config.sqlite_mmap_size,
+                reopen_interval=config.sqlite_reopen_interval,
+            )
+        else:
+            sniffing = (
+                {
+                    "sniff_on_start": True,
+                    "sniff_on_node_failure": True,
+                    "min_delay_between_sniffing": config.elastic_sniff_interval,
+                    "sniff_timeout": config.elastic_sniff_timeout,
+                }
+                if config.elastic_sniff_enabled
+                else {}
+            )
+            elastic.es = AsyncElasticsearch(
+                hosts=config.elastic_hosts,
+                node_class=es_nodes.TrackedNode,
+                node_selector_class=es_nodes.NODE_SELECTORS[
+                    config.elastic_node_selector
+                ],
+                **sniffing,
+            )
+        normalizer.query_normalizer = normalizer.QueryNormalizer(
+            mode=config.query_normalizer_mode,
+            elastic=elastic.es,
+            max_tracked=config.query_normalizer_tracked,
+        )
+        if config.cache_stats_enabled:
+            cache_stats.cache_stats = cache_stats.CacheStats(
+                redis=redis.redis, flush_seconds=config.cache_stats_flush_seconds
+            )
+            stats_task = asyncio.create_task(cache_stats.cache_stats.run())
+        if config.hot_keys_enabled:
+            hot_keys.hot_keys = hot_keys.HotKeys(
+                top_k=config.hot_keys_top_k,
+                hot_threshold=config.hot_keys_threshold,
+                sample_rate=config.hot_keys_sample_rate,
+                window_seconds=config.hot_keys_window_seconds,
+                local_ttl=config.hot_keys_local_ttl,
+            )
+            invalidations_task = asyncio.create_task(
+                hot_keys.hot_keys.listen_invalidations(redis.redis)
+            )
+        if config.elastic_hedge_enabled:
+            hedging.hedger = hedging.Hedger(
+                percentile=config.elastic_hedge_percentile,
+                min_delay=config.elastic_hedge_min_delay,
+                max_ratio=config.elastic_hedge_max_ratio,
+                burst=config.elastic_hedge_burst,
+            )
+        if config.bloom_filter_enabled:
+            bloom.id_filters = bloom.IdBloomFilters(
+                redis=redis.redis,
+                indexes=["movies", "genres", "persons"],
+                refresh_seconds=config.bloom_refresh_seconds,
+                sync_check_seconds=config.bloom_sync_check_seconds,
+            )
+            bloom_task = asyncio.create_task(bloom.id_filters.run())
+        if config.cache_writer_enabled:
+            cache_writer.cache_writer = cache_writer.CacheWriter(
+                redis=redis.redis,
+                max_pending=config.cache_writer_max_pending,
+                batch_size=config.cache_writer_batch_size,
+                flush_interval=config.cache_writer_flush_interval,
+            )
+            cache_writer.cache_writer.start()
+        if config.prefetch_enabled:
+            prefetch.prefetcher = prefetch.Prefetcher(
+                max_concurrency=config.prefetch_max_concurrency,
+                timeout=config.prefetch_timeout,
+                track_seconds=config.cache_policy("films").ttl,
+            )
         yield
     finally:
         # shutdown
+        if prefetch.prefetcher:
+            await prefetch.prefetcher.close()
+        if bloom_task:
+            bloom_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await bloom_task
+        if invalidations_task:
+            invalidations_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await invalidations_task
+        if cache_writer.cache_writer:
+            # дописываем то, что осталось в очереди, пока Redis доступен
+            await cache_writer.cache_writer.close()
+        if stats_task:
+            stats_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await stats_task
+            await cache_stats.cache_stats.flush()
         await redis.redis.close()
-        await elastic.es.close()
+        if elastic.es:
+            await elastic.es.close()
+        if sqlite.storage:
+            sqlite.storage.close()
 
 
 app = FastAPI(
@@ -31,9 +151,58 @@ app = FastAPI(
     default_response_class=ORJSONResponse,
 )
 
+# br для клиентов, которые его поддерживают, иначе gzip; мелкие ответы
+# отдаются без сжатия
+app.add_middleware(
+    BrotliMiddleware,
+    quality=config.compression_quality,
+    minimum_size=config.compression_minimum_size,
+    gzip_fallback=True,
+)
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    return ORJSONResponse(
+        status_code=HTTPStatus.GATEWAY_TIMEOUT,
+        content={"detail": "request deadline exceeded"},
+    )
+
 
 # Подключаем роутер к серверу, указав префикс /v1/films
 # Теги указываем для удобства навигации по документации
-app.include_router(films.router, prefix="/api/v1/films", tags=["films"])
-app.include_router(persons.router, prefix="/api/v1/persons", tags=["persons"])
-app.include_router(genres.router, prefix="/api/v1/genres", tags=["genres"])
+# Бюджет времени по умолчанию задается для всех ручек, отдельные ручки
+# могут переопределить его своей зависимостью RequestBudget. Поиски
+# сессии пользователя идут на одни и те же копии шардов эластика
+common = [Depends(RequestBudget()), Depends(get_session_preference)]
+app.include_router(
+    films.router, prefix="/api/v1/films", tags=["films"], dependencies=common
+)
+app.include_router(
+    persons.router, prefix="/api/v1/persons", tags=["persons"], dependencies=common
+)
+app.include_router(
+    genres.router, prefix="/api/v1/genres", tags=["genres"], dependencies=common
+)
+app.include_router(
+    homepage.router, prefix="/api/v1/homepage", tags=["homepage"], dependencies=common
+)
+app.include_router(
+    search.router, prefix="/api/v1/search", tags=["search"], dependencies=common
+)
+# метрики (адреса узлов эластика, состояние кэша), сброс кэша и горячие
+# ключи доступны только с общим секретом
+app.include_router(
+    metrics.router,
+    prefix="/api/v1/metrics",
+    tags=["metrics"],
+    dependencies=[Depends(verify_admin_token)],
+)
+app.include_router(
+    cache.router,
+    prefix="/api/v1/cache",
+    tags=["cache"],
+    dependencies=[Depends(verify_admin_token)],
+)
+# выгрузка длительная, поэтому бюджет времени запроса к ней не применяется
+app.include_router(export.router, prefix="/api/v1/export", tags=["export"])
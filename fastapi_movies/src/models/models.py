@@ -27,7 +27,9 @@ class PersonFilm(IdMixIn):
 
 class PersonDetail(IdMixIn):
     full_name: str
+    # лучшие по рейтингу фильмы; вся фильмография - FilmService.get_by_person
     films: list[PersonFilm] | None = None
+    films_count: int | None = None
 
 
 class Person(IdMixIn):
@@ -45,3 +47,8 @@ class Film(IdMixIn):
     actors_names: list[str] | None
     writers_names: list[str] | None
     directors_names: list[str] | None
+
+
+class SearchResult(BaseModel):
+    films: list[Film]
+    persons: list[PersonDetail]
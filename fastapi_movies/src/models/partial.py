@@ -0,0 +1,20 @@
+from functools import lru_cache
+
+from pydantic import BaseModel, create_model
+
+
+@lru_cache(maxsize=None)
+def partial_model(model: type[BaseModel], fields: frozenset[str]) -> type[BaseModel]:
+    """
+    Модель с подмножеством полей исходной модели.
+    Определения полей (типы, алиасы) сохраняются, поэтому частичный объект
+    валидируется и сериализуется так же, как полный.
+    """
+    return create_model(
+        f"Partial{model.__name__}",
+        **{
+            name: (info.annotation, info)
+            for name, info in model.model_fields.items()
+            if name in fields
+        },
+    )
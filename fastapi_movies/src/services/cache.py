@@ -0,0 +1,21 @@
+from functools import lru_cache
+
+from fastapi import Depends
+from redis.asyncio import Redis
+
+from db.redis import RedisCache, get_redis
+
+
+class CacheService:
+    """Управление кэшем API: удаление записей по тегам"""
+
+    def __init__(self, redis: Redis):
+        self.redis = RedisCache(redis)
+
+    async def invalidate(self, tags: list[str]) -> int:
+        return await self.redis.invalidate(tags)
+
+
+@lru_cache()
+def get_cache_service(redis: Redis = Depends(get_redis)) -> CacheService:
+    return CacheService(redis)
@@ -0,0 +1,125 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from elasticsearch import AsyncElasticsearch
+from fastapi import Depends
+from redis.asyncio import Redis
+
+from db.cache_writer import CacheWriter, get_cache_writer
+from db.elastic import get_elastic
+from db.redis import FilmRedisCache, GenresRedisCache, RedisCache, get_redis
+from db.storage import search_storage
+
+from .film_filter import FilmFilter
+from .query import SearchQuery
+from .utils import timed_out
+
+
+@dataclass
+class CompositePart:
+    """
+    Часть составного запроса: ключ страницы в кэше, кэш ее сущностей,
+    запрос в эластик для промаха и теги страницы
+    """
+
+    cache_key: str
+    cache: RedisCache
+    index: str
+    query: SearchQuery
+    tags: set[str] = field(default_factory=set)
+
+
+class CompositeService:
+    """
+    Выполняет несколько списочных запросов за один проход: id закэшированных
+    страниц читаются одним MGET, их сущности - вторым, промахи уходят в
+    эластик одним msearch. Ключи кэша совпадают с ключами FilmService и
+    GenreService.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        elastic: AsyncElasticsearch,
+        cache_writer: CacheWriter | None = None,
+    ):
+        self.redis = RedisCache(redis, cache_writer)
+        self.films_cache = FilmRedisCache(redis, cache_writer)
+        self.genres_cache = GenresRedisCache(redis, cache_writer)
+        self.elastic = search_storage(elastic)
+
+    def films_part(
+        self, film_filter: FilmFilter, page_num: int, page_size: int
+    ) -> CompositePart:
+        return CompositePart(
+            cache_key=self.films_cache.list_key(
+                page_num, page_size, film_filter.cache_key()
+            ),
+            cache=self.films_cache,
+            index="movies",
+            query=film_filter.query().page(page_num, page_size),
+            tags=self.films_cache.genre_page_tags(film_filter.genres),
+        )
+
+    def genres_part(self, page_num: int, page_size: int) -> CompositePart:
+        return CompositePart(
+            cache_key=self.genres_cache.list_key(page_num, page_size),
+            cache=self.genres_cache,
+            index="genres",
+            query=SearchQuery().page(page_num, page_size),
+        )
+
+    async def run(self, parts: dict[str, CompositePart]) -> dict[str, list]:
+        cached_ids = await self.redis.get_many_from_cache(
+            [part.cache_key for part in parts.values()]
+        )
+        entity_keys = {
+            name: [part.cache.entity_key(entity_id) for entity_id in ids]
+            for (name, part), ids in zip(parts.items(), cached_ids)
+            if ids
+        }
+        flat_keys = [key for keys in entity_keys.values() for key in keys]
+        entities = await self.redis.get_many_from_cache(flat_keys) if flat_keys else []
+
+        results = {}
+        misses = {}
+        position = 0
+        for name, part in parts.items():
+            keys = entity_keys.get(name, [])
+            values = entities[position : position + len(keys)]
+            position += len(keys)
+            if keys and all(values):
+                model = part.cache.model_for(None)
+                results[name] = [model.parse_obj(value) for value in values]
+            else:
+                misses[name] = part
+
+        if misses:
+            docs = await self.elastic.get_multi(
+                [
+                    (part.index, part.query.build(), part.query.params())
+                    for part in misses.values()
+                ]
+            )
+            to_cache = {}
+            for (name, part), doc in zip(misses.items(), docs):
+                hits = doc["hits"]["hits"] if doc else []
+                model = part.cache.model_for(None)
+                results[name] = [model(**hit["_source"]) for hit in hits]
+                if results[name] and not timed_out(doc):
+                    to_cache.update(part.cache.entity_entries(results[name]))
+                    to_cache.update(
+                        part.cache.page_entry(part.cache_key, results[name], part.tags)
+                    )
+            await self.redis.put_many_to_cache(to_cache)
+
+        return results
+
+
+@lru_cache()
+def get_composite_service(
+    redis: Redis = Depends(get_redis),
+    elastic: AsyncElasticsearch = Depends(get_elastic),
+    cache_writer: CacheWriter | None = Depends(get_cache_writer),
+) -> CompositeService:
+    return CompositeService(redis, elastic, cache_writer)
@@ -0,0 +1,69 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import AsyncIterator
+
+from elasticsearch import AsyncElasticsearch
+from fastapi import Depends
+
+from db.elastic import get_elastic
+from db.storage import search_storage
+from models.models import Film, GenreDetail, PersonDetail
+
+from .query import SearchQuery
+
+
+class UnknownFieldsError(ValueError):
+    """Запрошены поля, которых нет в документах индекса"""
+
+
+class ExportService:
+    # поля документов, доступные для выгрузки, по индексам
+    _index_fields = {
+        "movies": set(Film.model_fields) | {"modified"},
+        "genres": set(GenreDetail.model_fields),
+        "persons": set(PersonDetail.model_fields) | {"modified"},
+    }
+
+    def __init__(self, elastic: AsyncElasticsearch):
+        self.elastic = search_storage(elastic)
+
+    def export(
+        self,
+        index: str,
+        fields: list[str] | None,
+        modified_since: datetime | None,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[dict]:
+        """
+        Все документы индекса (или измененные с modified_since) по одному.
+        Поля проверяются сразу, до начала выгрузки, чтобы ошибку можно было
+        вернуть обычным ответом, а не обрывом потока
+        """
+        if fields:
+            unknown = set(fields) - self._index_fields[index]
+            if unknown:
+                raise UnknownFieldsError(", ".join(sorted(unknown)))
+
+        return self._scan(index, fields, modified_since, chunk_size)
+
+    async def _scan(
+        self,
+        index: str,
+        fields: list[str] | None,
+        modified_since: datetime | None,
+        chunk_size: int,
+    ) -> AsyncIterator[dict]:
+        async for hit in self.elastic.scan(
+            index=index,
+            query=SearchQuery().range("modified", gte=modified_since).query(),
+            source=fields,
+            chunk_size=chunk_size,
+        ):
+            yield hit["_source"]
+
+
+@lru_cache()
+def get_export_service(
+    elastic: AsyncElasticsearch = Depends(get_elastic),
+) -> ExportService:
+    return ExportService(elastic)
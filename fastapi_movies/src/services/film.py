@@ -1,17 +1,27 @@
 from abc import ABC, abstractmethod
 from functools import lru_cache
-from typing import Any
+from typing import Any, AsyncIterator
 
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 from redis.asyncio import Redis
 
-from db.elastic import ElasticStorage, get_elastic
-from db.redis import FilmRedisCache, get_redis
+from core.config import settings as config
+from data_sync.utils.rating_index import FILM_CARD_FIELDS
+from db.bloom import IdBloomFilters, get_id_filters
+from db.cache_writer import CacheWriter, get_cache_writer
+from db.elastic import get_elastic
+from db.hedging import Hedger, get_hedger
+from db.rating_index import RatingIndex
+from db.redis import FilmRedisCache, PersonFilmsRedisCache, get_redis
+from db.storage import search_storage
 from models.models import Film
 
-from .utils import (get_genre_filter_params, get_offset_params,
-                    get_search_params, get_sort_params)
+from .film_filter import FilmFilter, person_films_query
+from .normalizer import NormalizedQuery, QueryNormalizer, get_query_normalizer
+from .prefetch import Prefetcher, get_prefetcher, load_with_prefetch
+from .query import SearchQuery, page_offset
+from .utils import timed_out
 
 
 class AbstractFilmService(ABC):
@@ -29,85 +39,312 @@ class AbstractFilmService(ABC):
 
 
 class FilmService(AbstractFilmService):
-    def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
-        self.redis = FilmRedisCache(redis)
-        self.elastic = ElasticStorage(elastic)
+    def __init__(
+        self,
+        redis: Redis,
+        elastic: AsyncElasticsearch,
+        id_filters: IdBloomFilters | None = None,
+        prefetcher: Prefetcher | None = None,
+        cache_writer: CacheWriter | None = None,
+        hedger: Hedger | None = None,
+        normalizer: QueryNormalizer | None = None,
+    ):
+        self.redis = FilmRedisCache(redis, cache_writer)
+        self.person_films = PersonFilmsRedisCache(redis, cache_writer)
+        self.elastic = search_storage(elastic, hedger)
+        self.id_filters = id_filters
+        self.prefetcher = prefetcher
+        self.normalizer = normalizer or QueryNormalizer()
+        self.rating_index = RatingIndex(redis) if config.rating_index_enabled else None
         self._index = "movies"
 
-    async def get_by_id(self, film_id: str) -> Film | None:
-        film = await self.redis.get_film(film_id=film_id)
+    @staticmethod
+    def _search_query(sorting: tuple[str, ...], query: str) -> SearchQuery:
+        return SearchQuery().match("title", query).sort(sorting)
+
+    async def get_by_id(
+        self, film_id: str, fields: list[str] | None = None
+    ) -> Film | None:
+        """
+        Фильм по id. Если переданы fields, из эластика запрашиваются и
+        кэшируются только эти поля документа
+        """
+        if self.id_filters and not self.id_filters.might_exist(self._index, film_id):
+            return None
+
+        film = await self.redis.get_film(film_id=film_id, fields=fields)
         if film:
             return film
 
-        doc = await self.elastic.get(index=self._index, id=film_id)
+        source = {"source_includes": fields} if fields else {}
+        doc = await self.elastic.get(index=self._index, id=film_id, **source)
         if not doc:
             return None
 
-        film = Film(**doc["_source"])
-        await self.redis.put_film(film=film)
+        film = self.redis.model_for(fields)(**doc["_source"])
+        await self.redis.put_film(film=film, fields=fields)
 
         return film
 
     async def get_all(
         self,
-        sorting: str,
-        genre_filter: str | None,
+        film_filter: FilmFilter,
         page_num: int,
         page_size: int,
+        fields: list[str] | None = None,
     ) -> list[Film] | None:
-        sort_params = get_sort_params(sorting)
-        genre_params = get_genre_filter_params(genre_filter)
-        offset_params = get_offset_params(page_num, page_size)
-        params = {**sort_params, **genre_params, **offset_params}
+        return await load_with_prefetch(
+            self.prefetcher,
+            load=lambda page: self._get_all(film_filter, page, page_size, fields),
+            page_key=lambda page: self.redis.list_key(
+                page, page_size, film_filter.cache_key(), self.redis.fields_key(fields)
+            ),
+            page_num=page_num,
+            page_size=page_size,
+        )
 
-        films = await self.redis.get_films(page_num, page_size, sorting, genre_filter)
+    async def _get_all(
+        self,
+        film_filter: FilmFilter,
+        page_num: int,
+        page_size: int,
+        fields: list[str] | None = None,
+    ) -> list[Film] | None:
+        if self.rating_index and self.rating_index.covers(film_filter, fields):
+            cards = await self.rating_index.page(
+                film_filter.genre, page_offset(page_num, page_size), page_size
+            )
+            if cards is not None:
+                model = self.redis.model_for(fields or list(FILM_CARD_FIELDS))
+                return [model(**card) for card in cards]
+
+        films = await self.redis.get_films(
+            page_num, page_size, film_filter.cache_key(), fields=fields
+        )
         if films:
             return films
 
-        doc = await self.elastic.get_batch(index=self._index, body=params)
+        query = film_filter.query().page(page_num, page_size).source(fields)
+        doc = await self.elastic.get_batch(
+            index=self._index, body=query.build(), **query.params()
+        )
         if not doc:
             return None
 
         hits_films = doc["hits"]["hits"]
 
-        films = [Film(**film["_source"]) for film in hits_films]
+        model = self.redis.model_for(fields)
+        films = [model(**film["_source"]) for film in hits_films]
+        if timed_out(doc):
+            return films
 
-        await self.redis.put_films(films, page_num, page_size, genre_filter, sorting)
+        await self.redis.put_films(
+            films,
+            page_num,
+            page_size,
+            film_filter.cache_key(),
+            fields=fields,
+            tags=self.redis.genre_page_tags(film_filter.genres),
+        )
 
         return films
 
     async def search(
         self,
-        sorting: str,
+        sorting: tuple[str, ...],
         query: str,
         page_num: int,
         page_size: int,
+        fields: list[str] | None = None,
     ) -> list[Film] | None:
-        sort_params = get_sort_params(sorting)
-        search_params = get_search_params(field="title", query=query)
-        offset_params = get_offset_params(page_num, page_size)
-        params = {**sort_params, **search_params, **offset_params}
+        normalized = await self.normalizer.normalize(query, self._index)
+        return await load_with_prefetch(
+            self.prefetcher,
+            load=lambda page: self._search(
+                sorting, normalized, page, page_size, fields
+            ),
+            page_key=lambda page: self.redis.list_key(
+                page,
+                page_size,
+                ",".join(sorting),
+                normalized.key,
+                self.redis.fields_key(fields),
+            ),
+            page_num=page_num,
+            page_size=page_size,
+        )
 
-        films = await self.redis.get_films(page_num, page_size, sorting, query)
+    async def _search(
+        self,
+        sorting: tuple[str, ...],
+        query: NormalizedQuery,
+        page_num: int,
+        page_size: int,
+        fields: list[str] | None = None,
+    ) -> list[Film] | None:
+        films = await self.redis.get_films(
+            page_num, page_size, ",".join(sorting), query.key, fields=fields
+        )
         if films:
             return films
 
-        doc = await self.elastic.get_batch(index=self._index, body=params)
+        search_query = (
+            self._search_query(sorting, query.text)
+            .page(page_num, page_size)
+            .source(fields)
+        )
+        doc = await self.elastic.get_batch(
+            index=self._index, body=search_query.build(), **search_query.params()
+        )
         if not doc:
             return None
 
         hits_films = doc["hits"]["hits"]
 
-        films = [Film(**film["_source"]) for film in hits_films]
+        model = self.redis.model_for(fields)
+        films = [model(**film["_source"]) for film in hits_films]
+        if timed_out(doc):
+            return films
+
+        await self.redis.put_films(
+            films,
+            page_num,
+            page_size,
+            ",".join(sorting),
+            query.key,
+            fields=fields,
+            policy="films_search",
+        )
+
+        return films
+
+    async def get_by_person(
+        self,
+        person_id: str,
+        role: str | None,
+        sorting: tuple[str, ...],
+        page_num: int,
+        page_size: int,
+    ) -> list[Film] | None:
+        """
+        Фильмография персоны (в роли role или в любой роли) запросом к
+        индексу movies: названия и рейтинги всегда актуальны, а размер ответа
+        не зависит от числа фильмов персоны
+        """
+        return await load_with_prefetch(
+            self.prefetcher,
+            load=lambda page: self._get_by_person(
+                person_id, role, sorting, page, page_size
+            ),
+            page_key=lambda page: self.person_films.list_key(
+                person_id,
+                role,
+                ",".join(sorting),
+                page,
+                page_size,
+                self.redis.fields_key(list(FILM_CARD_FIELDS)),
+            ),
+            page_num=page_num,
+            page_size=page_size,
+        )
+
+    async def _get_by_person(
+        self,
+        person_id: str,
+        role: str | None,
+        sorting: tuple[str, ...],
+        page_num: int,
+        page_size: int,
+    ) -> list[Film] | None:
+        fields = list(FILM_CARD_FIELDS)
+        films = await self.person_films.get_films(
+            person_id, role, ",".join(sorting), page_num, page_size, fields=fields
+        )
+        if films:
+            return films
+
+        query = (
+            person_films_query(person_id, role, sorting)
+            .page(page_num, page_size)
+            .source(fields)
+        )
+        doc = await self.elastic.get_batch(
+            index=self._index, body=query.build(), **query.params()
+        )
+        if not doc:
+            return None
+
+        model = self.redis.model_for(fields)
+        films = [model(**film["_source"]) for film in doc["hits"]["hits"]]
+        if timed_out(doc):
+            return films
 
-        await self.redis.put_films(films, page_num, page_size, query, sorting)
+        await self.person_films.put_films(
+            films,
+            person_id,
+            role,
+            ",".join(sorting),
+            page_num,
+            page_size,
+            fields=fields,
+            tags=self.person_films.person_page_tags(person_id),
+        )
 
         return films
 
+    async def iter_all(
+        self,
+        film_filter: FilmFilter,
+        page_num: int,
+        page_size: int,
+        fields: list[str] | None = None,
+    ) -> AsyncIterator[Film]:
+        """
+        Потоковая выдача большой страницы фильмов в обход кэша:
+        память на запрос не зависит от размера страницы
+        """
+        query = film_filter.query().source(fields)
+        model = self.redis.model_for(fields)
+        async for hit in self.elastic.iter_batch(
+            index=self._index,
+            body=query.build(),
+            offset=page_offset(page_num, page_size),
+            size=page_size,
+            chunk_size=config.stream_chunk_size,
+        ):
+            yield model(**hit["_source"])
+
+    async def iter_search(
+        self,
+        sorting: tuple[str, ...],
+        query: str,
+        page_num: int,
+        page_size: int,
+        fields: list[str] | None = None,
+    ) -> AsyncIterator[Film]:
+        """Потоковая выдача большой страницы поиска фильмов в обход кэша"""
+        search_query = self._search_query(sorting, query).source(fields)
+        model = self.redis.model_for(fields)
+        async for hit in self.elastic.iter_batch(
+            index=self._index,
+            body=search_query.build(),
+            offset=page_offset(page_num, page_size),
+            size=page_size,
+            chunk_size=config.stream_chunk_size,
+        ):
+            yield model(**hit["_source"])
+
 
 @lru_cache()
 def get_film_service(
     redis: Redis = Depends(get_redis),
     elastic: AsyncElasticsearch = Depends(get_elastic),
+    id_filters: IdBloomFilters | None = Depends(get_id_filters),
+    prefetcher: Prefetcher | None = Depends(get_prefetcher),
+    cache_writer: CacheWriter | None = Depends(get_cache_writer),
+    hedger: Hedger | None = Depends(get_hedger),
+    normalizer: QueryNormalizer | None = Depends(get_query_normalizer),
 ) -> FilmService:
-    return FilmService(redis, elastic)
+    return FilmService(
+        redis, elastic, id_filters, prefetcher, cache_writer, hedger, normalizer
+    )
@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+from typing import Iterable
+
+from .query import SearchQuery
+
+# поля сортировки списков фильмов: у всех есть doc values
+SORT_FIELDS = ("imdb_rating", "title.raw", "id")
+DEFAULT_SORT = "-imdb_rating"
+MAX_GENRES = 20
+# поля фильма с id персон по ролям; без роли - персоны в любой роли
+PERSON_ROLE_FIELDS = {
+    "actor": "actor_ids",
+    "director": "director_ids",
+    "writer": "writer_ids",
+}
+ALL_PERSONS_FIELD = "person_ids"
+
+
+class InvalidFilmFilter(ValueError):
+    """Параметры сортировки или фильтрации фильмов не прошли проверку"""
+
+
+def parse_sort(sort: str | None) -> tuple[str, ...]:
+    """
+    Разбирает сортировку вида "-imdb_rating,title.raw" в канонический вид.
+    Последним ключом всегда идет id в направлении первого ключа: порядок
+    страниц не зависит от шарда, а при сортировке по убыванию рейтинга
+    совпадает с индексом рейтинга в Redis (ZREVRANGE) и index.sort индекса
+    movies. Ключи после id ничего не меняют и отбрасываются, поэтому
+    "-imdb_rating" и "-imdb_rating,-id" дают один ключ кэша
+    """
+    keys = []
+    for key in (sort or DEFAULT_SORT).split(","):
+        key = key.strip()
+        field = key.removeprefix("-")
+        if field not in SORT_FIELDS:
+            raise InvalidFilmFilter(f"unknown sort field: {field or key!r}")
+        if any(existing.removeprefix("-") == field for existing in keys):
+            raise InvalidFilmFilter(f"duplicate sort field: {field}")
+        keys.append(key)
+        if field == "id":
+            break
+    else:
+        keys.append("-id" if keys[0].startswith("-") else "id")
+    return tuple(keys)
+
+
+def _number(value: float | None) -> str:
+    return "" if value is None else f"{value:g}"
+
+
+@dataclass(frozen=True)
+class FilmFilter:
+    """
+    Сортировка и фильтры списка фильмов в каноническом виде: одинаковые по
+    смыслу запросы дают один ключ кэша и одно тело запроса в эластик.
+    Жанры объединяются по ИЛИ, рейтинг ограничивается включительно
+    """
+
+    sort: tuple[str, ...] = parse_sort(DEFAULT_SORT)
+    genres: tuple[str, ...] = ()
+    rating_min: float | None = None
+    rating_max: float | None = None
+
+    @classmethod
+    def parse(
+        cls,
+        sort: str | None = None,
+        genres: Iterable[str] | None = None,
+        rating_min: float | None = None,
+        rating_max: float | None = None,
+    ) -> "FilmFilter":
+        genres = tuple(
+            sorted({genre.strip() for genre in genres or () if genre.strip()})
+        )
+        if len(genres) > MAX_GENRES:
+            raise InvalidFilmFilter(f"too many genres, max {MAX_GENRES}")
+        if (
+            rating_min is not None
+            and rating_max is not None
+            and rating_min > rating_max
+        ):
+            raise InvalidFilmFilter("rating_min is greater than rating_max")
+        return cls(
+            sort=parse_sort(sort),
+            genres=genres,
+            rating_min=None if rating_min is None else float(rating_min),
+            rating_max=None if rating_max is None else float(rating_max),
+        )
+
+    @property
+    def genre(self) -> str | None:
+        """Единственный жанр фильтра или None, если жанров нет или несколько"""
+        return self.genres[0] if len(self.genres) == 1 else None
+
+    @property
+    def has_rating_range(self) -> bool:
+        return self.rating_min is not None or self.rating_max is not None
+
+    def cache_key(self) -> str:
+        parts = [",".join(self.sort)]
+        if self.genres:
+            parts.append("g=" + ",".join(self.genres))
+        if self.has_rating_range:
+            parts.append(f"r={_number(self.rating_min)}:{_number(self.rating_max)}")
+        return ";".join(parts)
+
+    def query(self) -> SearchQuery:
+        """Запрос без пагинации: фильтры в filter-контексте и сортировка"""
+        query = SearchQuery().sort(self.sort)
+        if len(self.genres) == 1:
+            query.term("genre_ids", self.genres[0])
+        elif self.genres:
+            query.terms("genre_ids", self.genres)
+        if self.has_rating_range:
+            query.range("imdb_rating", gte=self.rating_min, lte=self.rating_max)
+        return query
+
+
+def person_films_query(
+    person_id: str, role: str | None, sort: tuple[str, ...]
+) -> SearchQuery:
+    """Запрос фильмографии персоны без пагинации"""
+    field = PERSON_ROLE_FIELDS[role] if role else ALL_PERSONS_FIELD
+    return SearchQuery().term(field, person_id).sort(sort)
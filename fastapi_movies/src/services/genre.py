@@ -6,11 +6,16 @@ from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 from redis.asyncio import Redis
 
-from db.elastic import ElasticStorage, get_elastic
+from db.bloom import IdBloomFilters, get_id_filters
+from db.cache_writer import CacheWriter, get_cache_writer
+from db.elastic import get_elastic
+from db.hedging import Hedger, get_hedger
 from db.redis import GenresRedisCache, get_redis
+from db.storage import search_storage
 from models.models import GenreDetail
 
-from .utils import get_offset_params
+from .query import SearchQuery
+from .utils import timed_out
 
 
 class AbstractGenreService(ABC):
@@ -24,43 +29,61 @@ class AbstractGenreService(ABC):
 
 
 class GenreService(AbstractGenreService):
-    def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
-        self.redis = GenresRedisCache(redis)
-        self.elastic = ElasticStorage(elastic)
+    def __init__(
+        self,
+        redis: Redis,
+        elastic: AsyncElasticsearch,
+        id_filters: IdBloomFilters | None = None,
+        cache_writer: CacheWriter | None = None,
+        hedger: Hedger | None = None,
+    ):
+        self.redis = GenresRedisCache(redis, cache_writer)
+        self.elastic = search_storage(elastic, hedger)
+        self.id_filters = id_filters
         self._index = "genres"
 
-    async def get_by_id(self, genre_id: str) -> GenreDetail | None:
-        genre = await self.redis.get_genre(genre_id=genre_id)
+    async def get_by_id(
+        self, genre_id: str, fields: list[str] | None = None
+    ) -> GenreDetail | None:
+        if self.id_filters and not self.id_filters.might_exist(self._index, genre_id):
+            return None
+
+        genre = await self.redis.get_genre(genre_id=genre_id, fields=fields)
         if genre:
             return genre
 
-        doc = await self.elastic.get(index=self._index, id=genre_id)
+        source = {"source_includes": fields} if fields else {}
+        doc = await self.elastic.get(index=self._index, id=genre_id, **source)
         if not doc:
             return None
 
-        genre = GenreDetail(**doc["_source"])
+        genre = self.redis.model_for(fields)(**doc["_source"])
 
-        await self.redis.put_genre(genre=genre)
+        await self.redis.put_genre(genre=genre, fields=fields)
 
         return genre
 
-    async def get_all(self, page_num: int, page_size: int) -> list[GenreDetail] | None:
-        query = {"query": {"match_all": {}}}
-        offset_params = get_offset_params(page_num, page_size)
-        params = {**query, **offset_params}
-
-        genres = await self.redis.get_genres(page_num, page_size)
+    async def get_all(
+        self, page_num: int, page_size: int, fields: list[str] | None = None
+    ) -> list[GenreDetail] | None:
+        genres = await self.redis.get_genres(page_num, page_size, fields=fields)
         if genres:
             return genres
 
-        doc = await self.elastic.get_batch(index=self._index, body=params)
+        query = SearchQuery().page(page_num, page_size).source(fields)
+        doc = await self.elastic.get_batch(
+            index=self._index, body=query.build(), **query.params()
+        )
         if not doc:
             return None
 
         hits_genres = doc["hits"]["hits"]
-        genres = [GenreDetail(**genre["_source"]) for genre in hits_genres]
+        model = self.redis.model_for(fields)
+        genres = [model(**genre["_source"]) for genre in hits_genres]
+        if timed_out(doc):
+            return genres
 
-        await self.redis.put_genres(genres, page_num, page_size)
+        await self.redis.put_genres(genres, page_num, page_size, fields=fields)
 
         return genres
 
@@ -69,5 +92,8 @@ class GenreService(AbstractGenreService):
 def get_genre_service(
     redis: Redis = Depends(get_redis),
     elastic: AsyncElasticsearch = Depends(get_elastic),
+    id_filters: IdBloomFilters | None = Depends(get_id_filters),
+    cache_writer: CacheWriter | None = Depends(get_cache_writer),
+    hedger: Hedger | None = Depends(get_hedger),
 ) -> GenreService:
-    return GenreService(redis, elastic)
+    return GenreService(redis, elastic, id_filters, cache_writer, hedger)
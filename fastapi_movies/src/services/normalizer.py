@@ -0,0 +1,117 @@
+from collections import OrderedDict
+from typing import Literal, NamedTuple
+
+from elasticsearch import AsyncElasticsearch
+
+from data_sync.utils.analysis import words
+
+from .utils import normalize_query
+
+NormalizerMode = Literal["basic", "stopwords", "analyzer"]
+
+
+class NormalizedQuery(NamedTuple):
+    # запрос для эластика: исходная строка пользователя, ее разбирает
+    # анализатор индекса
+    text: str
+    # нормализованный запрос, часть ключа кэша
+    key: str
+
+
+class QueryNormalizer:
+    """
+    Приводит поисковый запрос к виду, по которому строится ключ кэша.
+    Режимы:
+    basic - normalize_query;
+    stopwords - еще и без стоп-слов анализатора ru_en, слова по порядку;
+    analyzer - ключ из отсортированных токенов анализатора индекса (_analyze)
+    с повторами: совпадает у запросов, которые различаются только формами
+    слов и их порядком. Токены
+    запросов хранятся в памяти воркера, чтобы не спрашивать эластик повторно.
+
+    Для оценки выигрыша считается, сколько обращений пришло с запросом,
+    который без нормализации дал бы другой ключ (merged), хотя такой
+    нормализованный ключ уже встречался.
+    """
+
+    def __init__(
+        self,
+        mode: NormalizerMode = "basic",
+        elastic: AsyncElasticsearch | None = None,
+        analyzer: str = "ru_en",
+        max_tracked: int = 10_000,
+    ):
+        self.mode = mode
+        self.elastic = elastic
+        self.analyzer = analyzer
+        self.max_tracked = max_tracked
+        self._tokens: OrderedDict[tuple[str, str], str] = OrderedDict()
+        # ключ -> строки запросов (до нормализации), с которыми он встречался
+        self._seen: OrderedDict[str, set[str]] = OrderedDict()
+        self.requests = 0
+        self.changed = 0
+        self.merged = 0
+        self.analyze_calls = 0
+
+    async def normalize(self, query: str, index: str = "movies") -> NormalizedQuery:
+        text = normalize_query(query)
+        if self.mode == "stopwords":
+            # запрос только из стоп-слов оставляем как есть: пустая строка
+            # выпала бы из ключа кэша и совпала с ключом списка без поиска
+            text = " ".join(words(text)) or text
+        key = text
+        if self.mode == "analyzer" and self.elastic is not None:
+            key = await self._analyzed(text, index) or text
+        self._record(query, key)
+        # нормализованная строка нужна только для ключа: эластик получает
+        # исходный запрос, чтобы результат не зависел от режима нормализации
+        return NormalizedQuery(text=query, key=key)
+
+    async def _analyzed(self, text: str, index: str) -> str:
+        cached = self._tokens.get((index, text))
+        if cached is not None:
+            self._tokens.move_to_end((index, text))
+            return cached
+        self.analyze_calls += 1
+        response = await self.elastic.indices.analyze(
+            index=index, analyzer=self.analyzer, text=text
+        )
+        # повторы токенов влияют на релевантность, поэтому остаются в ключе
+        key = " ".join(sorted(token["token"] for token in response["tokens"]))
+        self._tokens[(index, text)] = key
+        while len(self._tokens) > self.max_tracked:
+            self._tokens.popitem(last=False)
+        return key
+
+    def _record(self, query: str, key: str) -> None:
+        self.requests += 1
+        if query != key:
+            self.changed += 1
+        queries = self._seen.pop(key, None)
+        if queries is None:
+            queries = set()
+        elif query not in queries:
+            self.merged += 1
+        if len(queries) < 100:
+            queries.add(query)
+        self._seen[key] = queries
+        while len(self._seen) > self.max_tracked:
+            self._seen.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "requests": self.requests,
+            "changed": self.changed,
+            "merged": self.merged,
+            "merged_rate": self.merged / self.requests if self.requests else 0.0,
+            "analyze_calls": self.analyze_calls,
+        }
+
+
+query_normalizer: QueryNormalizer | None = None
+
+
+# Функция понадобится при внедрении зависимостей
+async def get_query_normalizer() -> QueryNormalizer | None:
+    return query_normalizer
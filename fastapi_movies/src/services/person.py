@@ -1,16 +1,24 @@
 from abc import ABC, abstractmethod
 from functools import lru_cache
-from typing import Any
+from typing import Any, AsyncIterator
 
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 from redis.asyncio import Redis
 
-from db.elastic import ElasticStorage, get_elastic
+from core.config import settings as config
+from db.bloom import IdBloomFilters, get_id_filters
+from db.cache_writer import CacheWriter, get_cache_writer
+from db.elastic import get_elastic
+from db.hedging import Hedger, get_hedger
 from db.redis import PersonsRedisCache, get_redis
+from db.storage import search_storage
 from models.models import PersonDetail
 
-from .utils import get_offset_params, get_search_params
+from .normalizer import NormalizedQuery, QueryNormalizer, get_query_normalizer
+from .prefetch import Prefetcher, get_prefetcher, load_with_prefetch
+from .query import SearchQuery, page_offset
+from .utils import timed_out
 
 
 class AbstractPersonService(ABC):
@@ -24,23 +32,41 @@ class AbstractPersonService(ABC):
 
 
 class PersonService(AbstractPersonService):
-    def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
-        self.redis = PersonsRedisCache(redis)
-        self.elastic = ElasticStorage(elastic)
+    def __init__(
+        self,
+        redis: Redis,
+        elastic: AsyncElasticsearch,
+        id_filters: IdBloomFilters | None = None,
+        prefetcher: Prefetcher | None = None,
+        cache_writer: CacheWriter | None = None,
+        hedger: Hedger | None = None,
+        normalizer: QueryNormalizer | None = None,
+    ):
+        self.redis = PersonsRedisCache(redis, cache_writer)
+        self.elastic = search_storage(elastic, hedger)
+        self.id_filters = id_filters
+        self.prefetcher = prefetcher
+        self.normalizer = normalizer or QueryNormalizer()
         self._index = "persons"
 
-    async def get_by_id(self, person_id: str) -> PersonDetail | None:
-        person = await self.redis.get_person(person_id)
+    async def get_by_id(
+        self, person_id: str, fields: list[str] | None = None
+    ) -> PersonDetail | None:
+        if self.id_filters and not self.id_filters.might_exist(self._index, person_id):
+            return None
+
+        person = await self.redis.get_person(person_id, fields=fields)
         if person:
             return person
 
-        doc = await self.elastic.get(index=self._index, id=person_id)
+        source = {"source_includes": fields} if fields else {}
+        doc = await self.elastic.get(index=self._index, id=person_id, **source)
         if not doc:
             return None
 
-        person = PersonDetail(**(doc["_source"]))
+        person = self.redis.model_for(fields)(**(doc["_source"]))
 
-        await self.redis.put_person(person)
+        await self.redis.put_person(person, fields=fields)
 
         return person
 
@@ -49,30 +75,88 @@ class PersonService(AbstractPersonService):
         query: str,
         page_num: int,
         page_size: int,
+        fields: list[str] | None = None,
     ) -> list[PersonDetail] | None:
-        search_params = get_search_params(field="full_name", query=query)
-        offset_params = get_offset_params(page_num, page_size)
-        params = {**search_params, **offset_params}
-
-        persons = await self.redis.get_persons(query, page_num, page_size)
+        normalized = await self.normalizer.normalize(query, self._index)
+        return await load_with_prefetch(
+            self.prefetcher,
+            load=lambda page: self._search(normalized, page, page_size, fields),
+            page_key=lambda page: self.redis.list_key(
+                normalized.key, page, page_size, self.redis.fields_key(fields)
+            ),
+            page_num=page_num,
+            page_size=page_size,
+        )
+
+    async def _search(
+        self,
+        query: NormalizedQuery,
+        page_num: int,
+        page_size: int,
+        fields: list[str] | None = None,
+    ) -> list[PersonDetail] | None:
+        persons = await self.redis.get_persons(
+            query.key, page_num, page_size, fields=fields
+        )
         if persons:
             return persons
 
-        doc = await self.elastic.get_batch(index=self._index, body=params)
+        search_query = (
+            SearchQuery()
+            .match("full_name", query.text)
+            .page(page_num, page_size)
+            .source(fields)
+        )
+        doc = await self.elastic.get_batch(
+            index=self._index, body=search_query.build(), **search_query.params()
+        )
         if not doc:
             return None
 
         hits_persons = doc["hits"]["hits"]
-        persons = [PersonDetail(**person["_source"]) for person in hits_persons]
+        model = self.redis.model_for(fields)
+        persons = [model(**person["_source"]) for person in hits_persons]
+        if timed_out(doc):
+            return persons
 
-        await self.redis.put_persons(persons, query, page_num, page_size)
+        await self.redis.put_persons(
+            persons, query.key, page_num, page_size, fields=fields
+        )
 
         return persons
 
+    async def iter_search(
+        self,
+        query: str,
+        page_num: int,
+        page_size: int,
+        fields: list[str] | None = None,
+    ) -> AsyncIterator[PersonDetail]:
+        """
+        Потоковая выдача большой страницы поиска персон в обход кэша:
+        память на запрос не зависит от размера страницы
+        """
+        model = self.redis.model_for(fields)
+        async for hit in self.elastic.iter_batch(
+            index=self._index,
+            body=SearchQuery().match("full_name", query).source(fields).build(),
+            offset=page_offset(page_num, page_size),
+            size=page_size,
+            chunk_size=config.stream_chunk_size,
+        ):
+            yield model(**hit["_source"])
+
 
 @lru_cache()
 def get_person_service(
     redis: Redis = Depends(get_redis),
     elastic: AsyncElasticsearch = Depends(get_elastic),
+    id_filters: IdBloomFilters | None = Depends(get_id_filters),
+    prefetcher: Prefetcher | None = Depends(get_prefetcher),
+    cache_writer: CacheWriter | None = Depends(get_cache_writer),
+    hedger: Hedger | None = Depends(get_hedger),
+    normalizer: QueryNormalizer | None = Depends(get_query_normalizer),
 ) -> PersonService:
-    return PersonService(redis, elastic)
+    return PersonService(
+        redis, elastic, id_filters, prefetcher, cache_writer, hedger, normalizer
+    )
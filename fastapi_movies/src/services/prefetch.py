@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from core.deadline import start_budget
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """
+    Фоновая загрузка в кэш страницы, которую пользователь скорее всего
+    запросит следующей. Число одновременных загрузок ограничено на воркер:
+    если лимит исчерпан, значит сервис нагружен, и загрузка пропускается.
+    """
+
+    # сколько последних загруженных страниц помнить для подсчета попаданий
+    MAX_TRACKED_KEYS = 10_000
+
+    def __init__(self, max_concurrency: int, timeout: float, track_seconds: float):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.track_seconds = track_seconds
+        self._tasks: set[asyncio.Task] = set()
+        self._prefetched: OrderedDict[str, float] = OrderedDict()
+        self.scheduled = 0
+        self.skipped = 0
+        self.failed = 0
+        self.hits = 0
+
+    def schedule(self, key: str, load: Callable[[], Awaitable]) -> None:
+        """Запускает load в фоне, если есть свободный слот"""
+        if key in self._prefetched:
+            return
+        if len(self._tasks) >= self.max_concurrency:
+            self.skipped += 1
+            return
+        self.scheduled += 1
+        task = asyncio.create_task(self._run(key, load))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def record_request(self, key: str) -> None:
+        """Учитывает запрос страницы: попадание, если она была загружена заранее"""
+        expires = self._prefetched.pop(key, None)
+        if expires and expires > time.monotonic():
+            self.hits += 1
+
+    async def _run(self, key: str, load: Callable[[], Awaitable]) -> None:
+        # у фоновой загрузки свой бюджет, а не остаток бюджета запроса
+        start_budget(self.timeout)
+        try:
+            await load()
+        except Exception:
+            self.failed += 1
+            logger.exception(f"Prefetch of {key} failed")
+            return
+        self._prefetched[key] = time.monotonic() + self.track_seconds
+        while len(self._prefetched) > self.MAX_TRACKED_KEYS:
+            self._prefetched.popitem(last=False)
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        completed = self.scheduled - self.failed - len(self._tasks)
+        return {
+            "scheduled": self.scheduled,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "in_flight": len(self._tasks),
+            "hits": self.hits,
+            "hit_rate": self.hits / completed if completed > 0 else 0.0,
+        }
+
+
+prefetcher: Prefetcher | None = None
+
+
+# Функция понадобится при внедрении зависимостей
+async def get_prefetcher() -> Prefetcher | None:
+    return prefetcher
+
+
+async def load_with_prefetch(
+    prefetcher: Prefetcher | None,
+    load: Callable[[int], Awaitable[list | None]],
+    page_key: Callable[[int], str],
+    page_num: int,
+    page_size: int,
+) -> list | None:
+    """
+    Загружает страницу page_num и, если включена предзагрузка и страница
+    полная, в фоне загружает в кэш следующую
+    """
+    if prefetcher:
+        prefetcher.record_request(page_key(page_num))
+
+    items = await load(page_num)
+
+    if prefetcher and items and len(items) == page_size:
+        prefetcher.schedule(page_key(page_num + 1), lambda: load(page_num + 1))
+
+    return items
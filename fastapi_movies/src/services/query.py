@@ -0,0 +1,114 @@
+import json
+from datetime import datetime
+from typing import Any, Iterable
+
+
+def page_offset(page_num: int, page_size: int) -> int:
+    """Смещение первого документа страницы"""
+    return (page_num - 1) * page_size
+
+
+class SearchQuery:
+    """
+    Построитель тела поискового запроса к эластику.
+
+    Полнотекстовые условия попадают в bool.must и определяют релевантность,
+    все остальные - в bool.filter: для них эластик не считает score и
+    кэширует их битовые маски. Тело собирается в фиксированном порядке
+    ключей, фильтры сортируются, поэтому одинаковые запросы дают побайтно
+    одинаковое тело, а это ключ shard request cache. Запросы без
+    полнотекстовой части стабильны и немногочисленны, для них request cache
+    включается явно (params), в том числе при size > 0.
+    """
+
+    def __init__(self):
+        self._must: list[dict] = []
+        self._filter: list[dict] = []
+        self._sort: list[dict] = []
+        self._from: int | None = None
+        self._size: int | None = None
+        self._source: list[str] | None = None
+
+    def match(self, field: str, query: str) -> "SearchQuery":
+        """Полнотекстовый поиск по полю"""
+        self._must.append({"match": {field: {"query": query}}})
+        return self
+
+    def term(self, field: str, value: Any) -> "SearchQuery":
+        """Точное совпадение keyword-поля"""
+        self._filter.append({"term": {field: value}})
+        return self
+
+    def terms(self, field: str, values: Iterable[Any]) -> "SearchQuery":
+        """Совпадение keyword-поля с любым из значений"""
+        self._filter.append({"terms": {field: sorted(values)}})
+        return self
+
+    def range(self, field: str, **bounds: Any) -> "SearchQuery":
+        """Диапазон значений поля: gte, lte и т.д."""
+        bounds = {
+            op: value.isoformat() if isinstance(value, datetime) else value
+            for op, value in sorted(bounds.items())
+            if value is not None
+        }
+        if bounds:
+            self._filter.append({"range": {field: bounds}})
+        return self
+
+    def sort(self, keys: Iterable[str]) -> "SearchQuery":
+        """
+        Сортировка по ключам вида "-imdb_rating" (по убыванию) или "title.raw".
+        Без сортировки документы упорядочиваются по релевантности
+        """
+        for key in keys:
+            field = key.removeprefix("-")
+            self._sort.append({field: "desc" if key.startswith("-") else "asc"})
+        return self
+
+    def page(self, page_num: int, page_size: int) -> "SearchQuery":
+        self._from = page_offset(page_num, page_size)
+        self._size = page_size
+        return self
+
+    def limit(self, size: int) -> "SearchQuery":
+        self._from = 0
+        self._size = size
+        return self
+
+    def source(self, fields: list[str] | None) -> "SearchQuery":
+        """Только нужные поля документа; None - документ целиком"""
+        self._source = sorted(fields) if fields else None
+        return self
+
+    @property
+    def cacheable(self) -> bool:
+        return not self._must
+
+    def query(self) -> dict:
+        if not self._must and not self._filter:
+            return {"match_all": {}}
+        clauses = {}
+        if self._must:
+            clauses["must"] = self._must
+        if self._filter:
+            clauses["filter"] = sorted(
+                self._filter, key=lambda clause: json.dumps(clause, sort_keys=True)
+            )
+        return {"bool": clauses}
+
+    def build(self) -> dict:
+        body = {"query": self.query()}
+        if self._sort:
+            body["sort"] = self._sort
+        if self._from is not None:
+            body["from"] = self._from
+            body["size"] = self._size
+        if self._source is not None:
+            body["_source"] = self._source
+        # общее число найденных документов API не использует
+        body["track_total_hits"] = False
+        return body
+
+    def params(self) -> dict:
+        """Параметры запроса search (или заголовка msearch) помимо тела"""
+        return {"request_cache": True} if self.cacheable else {}
@@ -0,0 +1,96 @@
+from functools import lru_cache
+
+from elasticsearch import AsyncElasticsearch
+from fastapi import Depends
+from redis.asyncio import Redis
+
+from db.cache_writer import CacheWriter, get_cache_writer
+from db.elastic import get_elastic
+from db.redis import (FilmRedisCache, PersonsRedisCache, SearchRedisCache,
+                      get_redis)
+from db.storage import search_storage
+from models.models import Film, PersonDetail, SearchResult
+
+from .normalizer import QueryNormalizer, get_query_normalizer
+from .query import SearchQuery
+from .utils import timed_out
+
+
+class SearchService:
+    """
+    Общий поиск по фильмам и персонам: оба запроса уходят в эластик одним
+    msearch, результат кэшируется одной записью по нормализованному запросу.
+    В записи хранятся только id, фильмы и персоны берутся из их общего кэша
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        elastic: AsyncElasticsearch,
+        cache_writer: CacheWriter | None = None,
+        normalizer: QueryNormalizer | None = None,
+    ):
+        self.redis = SearchRedisCache(redis, cache_writer)
+        self.films_cache = FilmRedisCache(redis, cache_writer)
+        self.persons_cache = PersonsRedisCache(redis, cache_writer)
+        self.elastic = search_storage(elastic)
+        self.normalizer = normalizer or QueryNormalizer()
+
+    async def search(
+        self, query: str, films_limit: int, persons_limit: int
+    ) -> SearchResult | None:
+        normalized = await self.normalizer.normalize(query, "movies")
+
+        ids = await self.redis.get_search(normalized.key, films_limit, persons_limit)
+        if ids:
+            films = await self.films_cache.hydrate(ids["films"])
+            persons = await self.persons_cache.hydrate(ids["persons"])
+            if films is not None and persons is not None:
+                return SearchResult(films=films, persons=persons)
+
+        films_query = SearchQuery().match("title", normalized.text).limit(films_limit)
+        persons_query = (
+            SearchQuery().match("full_name", normalized.text).limit(persons_limit)
+        )
+        films_doc, persons_doc = await self.elastic.get_multi(
+            [
+                ("movies", films_query.build(), films_query.params()),
+                ("persons", persons_query.build(), persons_query.params()),
+            ]
+        )
+        result = SearchResult(
+            films=[
+                Film(**hit["_source"])
+                for hit in (films_doc["hits"]["hits"] if films_doc else [])
+            ],
+            persons=[
+                PersonDetail(**hit["_source"])
+                for hit in (persons_doc["hits"]["hits"] if persons_doc else [])
+            ],
+        )
+        if not result.films and not result.persons:
+            return None
+        if timed_out(films_doc, persons_doc):
+            return result
+
+        await self.redis.put_many_to_cache(
+            {
+                **self.films_cache.entity_entries(result.films),
+                **self.persons_cache.entity_entries(result.persons),
+                **self.redis.search_entry(
+                    result, normalized.key, films_limit, persons_limit
+                ),
+            }
+        )
+
+        return result
+
+
+@lru_cache()
+def get_search_service(
+    redis: Redis = Depends(get_redis),
+    elastic: AsyncElasticsearch = Depends(get_elastic),
+    cache_writer: CacheWriter | None = Depends(get_cache_writer),
+    normalizer: QueryNormalizer | None = Depends(get_query_normalizer),
+) -> SearchService:
+    return SearchService(redis, elastic, cache_writer, normalizer)
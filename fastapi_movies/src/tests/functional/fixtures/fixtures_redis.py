@@ -1,6 +1,7 @@
 import pytest_asyncio
 import redis.asyncio as redis
 
+from data_sync.utils.hash_ring import parse_node
 from tests.functional.settings import test_settings
 
 
@@ -17,3 +18,16 @@ async def redis_client():
 @pytest_asyncio.fixture(scope="function")
 async def redis_flushall(redis_client):
     await redis_client.flushall()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def redis_cache_nodes():
+    """Очищенные узлы кэша шардированного экземпляра API"""
+    clients = {
+        node: redis.Redis(*parse_node(node)) for node in test_settings.redis_cache_nodes
+    }
+    for client in clients.values():
+        await client.flushall()
+    yield clients
+    for client in clients.values():
+        await client.aclose()
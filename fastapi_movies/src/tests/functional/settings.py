@@ -24,6 +24,11 @@ class TestSettings(BaseSettings):
     redis_host: str = Field("127.0.0.1", alias="REDIS_HOST")
     redis_port: str = Field("6379", alias="REDIS_PORT")
     service_url: str = Field("http://localhost:8080", alias="SERVICE_URL")
+    # экземпляр API, раскладывающий кэш по нескольким узлам Redis
+    # (REDIS_CACHE_NODES); без него тесты шардирования пропускаются
+    sharded_service_url: str | None = Field(None, alias="SHARDED_SERVICE_URL")
+    redis_cache_nodes: list[str] = Field([], alias="REDIS_CACHE_NODES")
+    redis_ring_vnodes: int = Field(160, alias="REDIS_RING_VNODES")
 
 
 test_settings = TestSettings()
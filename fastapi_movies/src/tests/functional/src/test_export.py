@@ -0,0 +1,44 @@
+import json
+from http import HTTPStatus
+
+import pytest
+
+from tests.functional.settings import test_settings
+from tests.functional.test_data.es_data import movies_data
+
+
+class TestExportApi:
+    """Тестируем выгрузку каталога в NDJSON"""
+
+    def setup_method(self):
+        self.endpoint = "/api/v1/export"
+
+    @pytest.mark.asyncio
+    async def test_export_films(self, aiohttp_session, es_write_data):
+        await es_write_data(
+            movies_data,
+            test_settings.es_index_movies,
+            test_settings.es_mapping_films,
+        )
+
+        async with aiohttp_session.get(
+            test_settings.service_url + f"{self.endpoint}/films",
+            params={"fields": "id,title"},
+        ) as response:
+            status = response.status
+            lines = (await response.text()).splitlines()
+
+        assert status == HTTPStatus.OK
+        assert len(lines) == len(movies_data)
+        assert set(json.loads(lines[0])) == {"id", "title"}
+
+    @pytest.mark.asyncio
+    async def test_export_unknown_fields(self, aiohttp_request):
+        body, status = await aiohttp_request(
+            method="GET",
+            endpoint=f"{self.endpoint}/films",
+            params={"fields": "id,budget"},
+        )
+
+        assert status == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert len(body) == 1
@@ -1,7 +1,10 @@
+import asyncio
 from http import HTTPStatus
 
 import pytest
 
+from data_sync.utils.rating_index import (RATING_KEY, film_card_key,
+                                          genre_rating_key)
 from tests.functional.settings import test_settings
 
 from ..test_data.es_data import movies_data
@@ -52,10 +55,64 @@ test_data = [
         "result": 1,
         "status_code": HTTPStatus.NOT_FOUND,
     },
+    # 7 кейс, сортировка по нескольким ключам
+    {
+        "page_size": 50,
+        "page_num": 1,
+        "sort": "-imdb_rating,title.raw",
+        "result": 50,
+        "status_code": HTTPStatus.OK,
+    },
+    # 8 кейс, неизвестное поле сортировки, ожидаем 422
+    {
+        "page_size": 50,
+        "page_num": 1,
+        "sort": "budget",
+        "result": 1,
+        "status_code": HTTPStatus.UNPROCESSABLE_ENTITY,
+    },
+    # 9 кейс, фильмы в диапазоне рейтинга
+    {
+        "page_size": 50,
+        "page_num": 1,
+        "rating_min": 8,
+        "rating_max": 9,
+        "result": 50,
+        "status_code": HTTPStatus.OK,
+    },
+    # 10 кейс, нет фильмов с рейтингом выше заданного, ожидаем 404
+    {
+        "page_size": 50,
+        "page_num": 1,
+        "rating_min": 9,
+        "result": 1,
+        "status_code": HTTPStatus.NOT_FOUND,
+    },
 ]
 # fmt: on
 
 
+async def build_rating_index(redis_client, es_data: list[dict]) -> None:
+    """Индекс рейтинга в Redis, как его строит data_sync (RatingIndexHook)"""
+    async with redis_client.pipeline(transaction=True) as pipe:
+        for doc in es_data:
+            film = doc["_source"]
+            genres = [genre["id"] for genre in film["genres"]]
+            pipe.zadd(RATING_KEY, {film["id"]: film["imdb_rating"]})
+            for genre_id in genres:
+                pipe.zadd(genre_rating_key(genre_id), {film["id"]: film["imdb_rating"]})
+            pipe.hset(
+                film_card_key(film["id"]),
+                mapping={
+                    "id": film["id"],
+                    "title": film["title"],
+                    "imdb_rating": film["imdb_rating"],
+                    "genres": ",".join(sorted(genres)),
+                },
+            )
+        await pipe.execute()
+
+
 class TestFilmsApi:
     """Тестируем API для фильмов"""
 
@@ -80,6 +137,11 @@ class TestFilmsApi:
                 "page_size": test_case.get("page_size"),
                 "page_number": test_case.get("page_num"),
                 "genre": test_case.get("genre", ""),
+                **{
+                    key: test_case[key]
+                    for key in ("sort", "rating_min", "rating_max")
+                    if key in test_case
+                },
             },
         )
 
@@ -117,3 +179,89 @@ class TestFilmsApi:
 
         assert status == HTTPStatus.NOT_FOUND
         assert len(body) == 1
+
+    @pytest.mark.asyncio
+    async def test_get_film_by_id_fields(self, aiohttp_request, es_write_data):
+        await es_write_data(
+            self.es_data,
+            test_settings.es_index_movies,
+            test_settings.es_mapping_films,
+        )
+
+        body, status = await aiohttp_request(
+            method="GET",
+            endpoint=f"{self.endpoint}/{self.first_film_id}",
+            params={"fields": "title"},
+        )
+
+        assert status == HTTPStatus.OK
+        assert set(body) == {"uuid", "title"}
+
+    @pytest.mark.parametrize("page_number", [1, 2])
+    @pytest.mark.asyncio
+    async def test_rating_index_genre_page(
+        self, aiohttp_request, es_write_data, redis_client, redis_flushall, page_number
+    ):
+        """Страница жанра из индекса рейтинга в Redis совпадает со страницей эластика"""
+        await es_write_data(
+            self.es_data,
+            test_settings.es_index_movies,
+            test_settings.es_mapping_films,
+        )
+        params = {
+            "genre": "fbd77e08-4dd6-4daf-9276-2abaa709fe87",
+            "page_size": 20,
+            "page_number": page_number,
+        }
+
+        await build_rating_index(redis_client, self.es_data)
+        redis_body, redis_status = await aiohttp_request(
+            method="GET", endpoint=self.endpoint, params=params
+        )
+        # без индекса (и без закэшированной страницы) API идет в эластик
+        await redis_client.flushall()
+        es_body, es_status = await aiohttp_request(
+            method="GET", endpoint=self.endpoint, params=params
+        )
+
+        assert redis_status == es_status == HTTPStatus.OK
+        assert len(redis_body) == 20
+        assert redis_body == es_body
+
+    @pytest.mark.asyncio
+    async def test_list_page_hits_request_cache(
+        self, aiohttp_request, es_client, es_write_data, redis_client, redis_flushall
+    ):
+        """Повторная страница без полнотекстового поиска берется из request cache"""
+        await es_write_data(
+            self.es_data,
+            test_settings.es_index_movies,
+            test_settings.es_mapping_films,
+        )
+        params = {
+            "genre": "fbd77e08-4dd6-4daf-9276-2abaa709fe87",
+            "sort": "title.raw",
+            "page_size": 10,
+            "page_number": 1,
+        }
+
+        async def hit_count() -> int:
+            stats = await es_client.indices.stats(
+                index=test_settings.es_index_movies, metric="request_cache"
+            )
+            return stats["_all"]["total"]["request_cache"]["hit_count"]
+
+        _, status = await aiohttp_request(
+            method="GET", endpoint=self.endpoint, params=params
+        )
+        hits_before = await hit_count()
+        # запись в кэш идет фоновой очередью: ждем ее и сбрасываем кэш, чтобы
+        # API снова пошло в эластик с тем же телом запроса
+        await asyncio.sleep(1)
+        await redis_client.flushall()
+        _, repeated_status = await aiohttp_request(
+            method="GET", endpoint=self.endpoint, params=params
+        )
+
+        assert status == repeated_status == HTTPStatus.OK
+        assert await hit_count() > hits_before
@@ -0,0 +1,42 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.functional.settings import test_settings
+from tests.functional.test_data.es_data import genres_data, movies_data
+
+
+@pytest.mark.asyncio
+async def test_homepage(es_write_data, aiohttp_request, redis_flushall):
+    await es_write_data(
+        movies_data, test_settings.es_index_movies, test_settings.es_mapping_films
+    )
+    await es_write_data(
+        genres_data, test_settings.es_index_genres, test_settings.es_mapping_genres
+    )
+
+    body, status = await aiohttp_request(
+        method="POST",
+        endpoint="/api/v1/homepage/",
+        json={
+            "queries": {
+                "top": {"type": "films", "page_size": 10},
+                "sci_fi": {
+                    "type": "films",
+                    "genre": "fbd77e08-4dd6-4daf-9276-2abaa709fe87",
+                    "page_size": 5,
+                },
+                "no_films": {
+                    "type": "films",
+                    "genre": "6659b767-b656-49cf-80b2-6a7c012e9d22",
+                },
+                "genres": {"type": "genres"},
+            }
+        },
+    )
+
+    assert status == HTTPStatus.OK
+    assert len(body["top"]) == 10
+    assert len(body["sci_fi"]) == 5
+    assert len(body["no_films"]) == 0
+    assert len(body["genres"]) == 5
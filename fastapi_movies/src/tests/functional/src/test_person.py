@@ -3,7 +3,7 @@ from http import HTTPStatus
 import pytest
 
 from tests.functional.settings import test_settings
-from tests.functional.test_data.es_data import persons_data
+from tests.functional.test_data.es_data import movies_data, persons_data
 
 
 class TestPersonsApi:
@@ -13,6 +13,7 @@ class TestPersonsApi:
         self.es_data = persons_data
         self.second_person_id = self.es_data[1]["_id"]
         self.es_data[1]["_source"]["films"] = []
+        self.es_data[1]["_source"]["films_count"] = 0
 
     @pytest.mark.parametrize(
         "person_id, expected_answer",
@@ -20,7 +21,7 @@ class TestPersonsApi:
             # тестируем, что возвращается существующий объект
             (
                 persons_data[0]["_id"],
-                {"status": HTTPStatus.OK, "length": 3},
+                {"status": HTTPStatus.OK, "length": 4},
             ),
             # тестируем, что корректно возвращается ответ, если объекта нет в базе
             ("35b63763", {"status": HTTPStatus.NOT_FOUND, "length": 1}),
@@ -44,31 +45,55 @@ class TestPersonsApi:
         assert len(body) == expected_answer["length"]
 
     @pytest.mark.parametrize(
-        "person_id, expected_answer",
+        "person_id, params, expected_answer",
         [
-            # тестируем, что возвращается существующий объект
+            # тестируем, что фильмография берется из индекса фильмов
+            (
+                persons_data[0]["_id"],
+                {},
+                {"status": HTTPStatus.OK, "length": 50},
+            ),
+            # тестируем пагинацию фильмографии
+            (
+                persons_data[0]["_id"],
+                {"page_number": 2, "page_size": 40},
+                {"status": HTTPStatus.OK, "length": 20},
+            ),
+            # тестируем фильтр по роли
             (
                 persons_data[0]["_id"],
-                {"status": HTTPStatus.OK, "length": 2},
+                {"role": "director"},
+                {"status": HTTPStatus.NOT_FOUND, "length": 1},
             ),
             # тестируем, что от персоны без фильмов возвращается корректный ответ
-            (persons_data[1]["_id"], {"status": HTTPStatus.NOT_FOUND, "length": 1}),
+            (
+                persons_data[1]["_id"],
+                {},
+                {"status": HTTPStatus.NOT_FOUND, "length": 1},
+            ),
             # тестируем, что корректно возвращается ответ, если объекта нет в базе
-            ("35b63763", {"status": HTTPStatus.NOT_FOUND, "length": 1}),
+            ("35b63763", {}, {"status": HTTPStatus.NOT_FOUND, "length": 1}),
         ],
     )
     @pytest.mark.asyncio
-    async def test_persons(
-        self, aiohttp_request, es_write_data, person_id, expected_answer
+    async def test_person_films(
+        self, aiohttp_request, es_write_data, person_id, params, expected_answer
     ):
         await es_write_data(
             self.es_data,
             test_settings.es_index_persons,
             test_settings.es_mapping_persons,
         )
+        await es_write_data(
+            movies_data,
+            test_settings.es_index_movies,
+            test_settings.es_mapping_films,
+        )
 
         body, status = await aiohttp_request(
-            method="GET", endpoint=f"{self.endpoint}/{person_id}/film"
+            method="GET",
+            endpoint=f"{self.endpoint}/{person_id}/film",
+            params=params,
         )
 
         assert status == expected_answer["status"]
@@ -1,3 +1,4 @@
+import asyncio
 from http import HTTPStatus
 
 import pytest
@@ -58,6 +59,41 @@ async def test_search_films_from_cache(
     assert len(body) == 50
 
 
+@pytest.mark.parametrize("query", ["the  STAR ", "Ｔｈｅ Star", "the star of"])
+@pytest.mark.asyncio
+async def test_search_films_normalized_query(
+    query, es_write_data, aiohttp_request, redis_client, redis_flushall
+):
+    # запрос нормализуется к тому же ключу кэша, что и "The Star"
+    await es_write_data(
+        data=movies_data,
+        index=test_settings.es_index_movies,
+        mapping=test_settings.es_mapping_films,
+    )
+    endpoint = "/api/v1/films/search"
+
+    async def page_keys() -> set[bytes]:
+        # запись в кэш идет фоновой очередью
+        await asyncio.sleep(1)
+        return {key async for key in redis_client.scan_iter(match="films_1_*")}
+
+    _, status = await aiohttp_request(
+        method="get", endpoint=endpoint, params={"query": "The Star"}
+    )
+    assert status == HTTPStatus.OK
+    expected_keys = await page_keys()
+    assert len(expected_keys) == 1
+
+    await redis_client.flushall()
+    body, status = await aiohttp_request(
+        method="get", endpoint=endpoint, params={"query": query}
+    )
+
+    assert status == HTTPStatus.OK
+    assert len(body) == 50
+    assert await page_keys() == expected_keys
+
+
 @pytest.mark.asyncio
 async def test_search_persons(es_write_data, aiohttp_request, redis_flushall):
     await es_write_data(
@@ -104,3 +140,40 @@ async def test_search_persons_paginated(
     )
     assert status == persons_expected_answer["status"]
     assert len(body) == persons_expected_answer["length"]
+
+
+@pytest.mark.parametrize(
+    "query_data, expected_answer",
+    [
+        (
+            {"query": "The Star", "films_limit": 5},
+            {"status": HTTPStatus.OK, "films": 5, "persons": 0},
+        ),
+        (
+            {"query": " lucas ", "persons_limit": 3},
+            {"status": HTTPStatus.OK, "films": 0, "persons": 3},
+        ),
+    ],
+)
+@pytest.mark.asyncio
+async def test_global_search(
+    query_data, expected_answer, es_write_data, aiohttp_request, redis_flushall
+):
+    await es_write_data(
+        data=movies_data,
+        index=test_settings.es_index_movies,
+        mapping=test_settings.es_mapping_films,
+    )
+    await es_write_data(
+        data=persons_data,
+        index=test_settings.es_index_persons,
+        mapping=test_settings.es_mapping_persons,
+    )
+
+    body, status = await aiohttp_request(
+        method="get", endpoint="/api/v1/search/", params=query_data
+    )
+
+    assert status == expected_answer["status"]
+    assert len(body["films"]) == expected_answer["films"]
+    assert len(body["persons"]) == expected_answer["persons"]
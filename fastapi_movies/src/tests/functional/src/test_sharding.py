@@ -0,0 +1,86 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+
+from data_sync.utils.hash_ring import HashRing
+from tests.functional.settings import test_settings
+
+from ..test_data.es_data import movies_data
+
+
+@pytest.mark.skipif(
+    not test_settings.sharded_service_url or len(test_settings.redis_cache_nodes) < 2,
+    reason="sharded API instance is not configured",
+)
+class TestShardedCache:
+    """Тестируем раскладку кэша API по нескольким узлам Redis"""
+
+    def setup_method(self):
+        self.url = f"{test_settings.sharded_service_url}/api/v1/films"
+        self.es_data = movies_data
+
+    @pytest.mark.asyncio
+    async def test_cache_keys_follow_ring(
+        self,
+        aiohttp_session,
+        es_write_data,
+        redis_client,
+        redis_flushall,
+        redis_cache_nodes,
+    ):
+        await es_write_data(
+            self.es_data,
+            test_settings.es_index_movies,
+            test_settings.es_mapping_films,
+        )
+
+        for page_number in range(1, 7):
+            async with aiohttp_session.get(
+                self.url, params={"page_size": 10, "page_number": page_number}
+            ) as response:
+                assert response.status == HTTPStatus.OK
+        # запись в кэш идет фоновой очередью
+        await asyncio.sleep(1)
+
+        ring = HashRing(redis_cache_nodes, test_settings.redis_ring_vnodes)
+        node_keys = {
+            node: [key.decode() async for key in client.scan_iter()]
+            for node, client in redis_cache_nodes.items()
+        }
+        assert all(node_keys.values())
+        for node, keys in node_keys.items():
+            assert all(ring.node_for(key) == node for key in keys)
+        # на основном узле только служебные ключи: теги, статистика
+        primary_keys = [key.decode() async for key in redis_client.scan_iter()]
+        assert any(key.startswith("tag:") for key in primary_keys)
+        assert all(
+            key.startswith(("bloom:", "idx:", "tag:", "stats:")) for key in primary_keys
+        )
+
+    @pytest.mark.asyncio
+    async def test_cached_page_served_from_node(
+        self,
+        aiohttp_session,
+        es_client,
+        es_write_data,
+        redis_flushall,
+        redis_cache_nodes,
+    ):
+        await es_write_data(
+            self.es_data,
+            test_settings.es_index_movies,
+            test_settings.es_mapping_films,
+        )
+        params = {"page_size": 10, "page_number": 2}
+
+        async with aiohttp_session.get(self.url, params=params) as response:
+            first = await response.json()
+        await asyncio.sleep(1)
+        # без индекса страница может прийти только из кэша на узле
+        await es_client.indices.delete(index=test_settings.es_index_movies)
+        async with aiohttp_session.get(self.url, params=params) as response:
+            second = await response.json()
+
+        assert response.status == HTTPStatus.OK
+        assert second == first
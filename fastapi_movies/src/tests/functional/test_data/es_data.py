@@ -28,6 +28,32 @@ movies = [
             {"id": "caf76c67-c0fe-477e-8766-3ab3ff257666", "name": "Joe"},
             {"id": "b45bd7bc-2e16-46d5-b125-983d35676666", "name": "John"},
         ],
+        "genre_ids": [
+            "6659b767-b656-49cf-80b2-6a7c012e9d21",
+            "fbd77e08-4dd6-4daf-9276-2abaa709fe87",
+        ],
+        "actor_ids": [
+            "ef86b8ff-3c82-4d31-ad8e-72b69f4e3f95",
+            "fb111f22-121e-44a7-b78f-b19191810fbf",
+        ],
+        "writer_ids": [
+            "caf76c67-c0fe-477e-8766-3ab3ff2574b5",
+            "b45bd7bc-2e16-46d5-b125-983d356768c6",
+        ],
+        "director_ids": [
+            "caf76c67-c0fe-477e-8766-3ab3ff257666",
+            "b45bd7bc-2e16-46d5-b125-983d35676666",
+        ],
+        "person_ids": sorted(
+            [
+                "ef86b8ff-3c82-4d31-ad8e-72b69f4e3f95",
+                "fb111f22-121e-44a7-b78f-b19191810fbf",
+                "caf76c67-c0fe-477e-8766-3ab3ff2574b5",
+                "b45bd7bc-2e16-46d5-b125-983d356768c6",
+                "caf76c67-c0fe-477e-8766-3ab3ff257666",
+                "b45bd7bc-2e16-46d5-b125-983d35676666",
+            ]
+        ),
     }
     for _ in range(60)
 ]
@@ -50,9 +76,12 @@ persons = [
                 "imdb_rating": 1.0,
             },
         ],
+        "films_count": 2,
     }
     for _ in range(60)
 ]
+# первая персона - актер Ann из всех фильмов movies
+persons[0]["id"] = "ef86b8ff-3c82-4d31-ad8e-72b69f4e3f95"
 
 genres = [
     {
@@ -1,6 +1,10 @@
 FILMS_MAPPING = {
     "settings": {
         "refresh_interval": "1s",
+        "index": {
+            "sort.field": ["imdb_rating", "id"],
+            "sort.order": ["desc", "desc"],
+        },
         "analysis": {
             "filter": {
                 "english_stop": {"type": "stop", "stopwords": "_english_"},
@@ -32,6 +36,12 @@ FILMS_MAPPING = {
         "properties": {
             "id": {"type": "keyword"},
             "imdb_rating": {"type": "float"},
+            "modified": {"type": "date", "format": "date_optional_time"},
+            "genre_ids": {"type": "keyword", "eager_global_ordinals": True},
+            "actor_ids": {"type": "keyword", "eager_global_ordinals": True},
+            "director_ids": {"type": "keyword", "eager_global_ordinals": True},
+            "writer_ids": {"type": "keyword", "eager_global_ordinals": True},
+            "person_ids": {"type": "keyword", "eager_global_ordinals": True},
             "genres": {
                 "type": "nested",
                 "dynamic": "strict",
@@ -152,15 +162,9 @@ PERSONS_MAPPING = {
         "properties": {
             "id": {"type": "keyword"},
             "full_name": {"type": "text", "analyzer": "ru_en"},
-            "films": {
-                "type": "nested",
-                "properties": {
-                    "id": {"type": "text"},
-                    "roles": {"type": "text"},
-                    "title": {"type": "text"},
-                    "imdb_rating": {"type": "float"},
-                },
-            },
+            "modified": {"type": "date", "format": "date_optional_time"},
+            "films": {"type": "object", "enabled": False},
+            "films_count": {"type": "integer"},
         },
     },
 }
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# data_sync запускается из своей директории и импортирует свои модули как
+# dto.x, utils.x, config.x
+sys.path.append(str(Path(__file__).parents[2] / "data_sync"))
@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from dto.bloom import BloomFilterHook
+
+from data_sync.utils.bloom import BloomFilter, bloom_keys
+from db.bloom import IdBloomFilters
+
+BITS_KEY, META_KEY = bloom_keys("movies")
+
+
+def docs(*ids: str) -> list[SimpleNamespace]:
+    return [SimpleNamespace(id=_id) for _id in ids]
+
+
+def create_filter(redis: fakeredis.FakeRedis, capacity: int) -> None:
+    bloom = BloomFilter.for_capacity(capacity, 0.01)
+    redis.set(BITS_KEY, bytes(bloom.bits))
+    redis.hset(
+        META_KEY,
+        mapping={
+            "size": bloom.size,
+            "hash_count": bloom.hash_count,
+            "capacity": capacity,
+            "count": 0,
+            "synced": 1,
+        },
+    )
+
+
+class TestBloomFilterHook:
+    """Тестируем пополнение фильтра Блума в data_sync"""
+
+    def setup_method(self):
+        self.redis = fakeredis.FakeRedis()
+        self.hook = BloomFilterHook(redis=self.redis, elastic=None, settings=None)
+
+    def test_overflow_keeps_adding_ids(self):
+        create_filter(self.redis, capacity=2)
+
+        self.hook.before_batch("movies", docs("a", "b", "c"))
+        synced = self.redis.hget(META_KEY, "synced")
+        self.hook.before_batch("movies", docs("d"))
+
+        assert "movies" in self.hook.stale
+        assert int(self.redis.hget(META_KEY, "count")) == 4
+        assert self.redis.hget(META_KEY, "synced") != synced
+        meta = self.redis.hgetall(META_KEY)
+        bloom = BloomFilter(
+            int(meta[b"size"]), int(meta[b"hash_count"]), self.redis.get(BITS_KEY)
+        )
+        assert "d" in bloom
+
+    def test_missing_filter(self):
+        self.hook.before_batch("movies", docs("a"))
+
+        assert "movies" in self.hook.stale
+        assert not self.redis.exists(BITS_KEY)
+
+
+class TestIdBloomFilters:
+    """Тестируем копию фильтров Блума в воркере API"""
+
+    def setup_method(self):
+        server = fakeredis.FakeServer()
+        self.sync_redis = fakeredis.FakeRedis(server=server)
+        self.filters = IdBloomFilters(
+            redis=fakeredis.FakeAsyncRedis(server=server),
+            indexes=["movies"],
+            refresh_seconds=30,
+        )
+        self.hook = BloomFilterHook(redis=self.sync_redis, elastic=None, settings=None)
+
+    @pytest.mark.asyncio
+    async def test_no_filter(self):
+        await self.filters.refresh()
+
+        assert self.filters.might_exist("movies", "a")
+
+    @pytest.mark.asyncio
+    async def test_negative_answered_from_memory(self):
+        create_filter(self.sync_redis, capacity=10)
+        self.hook.before_batch("movies", docs("a"))
+        await self.filters.refresh()
+        self.sync_redis.delete(META_KEY)
+
+        assert self.filters.might_exist("movies", "a")
+        # проверка не обращается к Redis: мета удалена, а ответ прежний
+        assert not self.filters.might_exist("movies", "b")
+
+    @pytest.mark.asyncio
+    async def test_write_after_copy(self):
+        create_filter(self.sync_redis, capacity=10)
+        await self.filters.refresh()
+        self.hook.before_batch("movies", docs("a"))
+
+        await self.filters.check_synced()
+        assert self.filters.might_exist("movies", "b")
+
+        await self.filters.refresh()
+        assert self.filters.might_exist("movies", "a")
+        assert not self.filters.might_exist("movies", "b")
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+from elastic_transport import AiohttpHttpNode, NodeConfig
+
+from db.es_nodes import LeastInFlightSelector, TrackedNode
+
+
+def node(port: int = 9200) -> TrackedNode:
+    return TrackedNode(NodeConfig("http", "localhost", port))
+
+
+class TestTrackedNode:
+    """Тестируем учет запросов в полете узла эластика"""
+
+    @pytest.mark.asyncio
+    async def test_success(self, monkeypatch):
+        tracked = node()
+        seen = []
+
+        async def perform_request(self, *args, **kwargs):
+            seen.append(self.in_flight)
+            return "response"
+
+        monkeypatch.setattr(AiohttpHttpNode, "perform_request", perform_request)
+
+        assert await tracked.perform_request("GET", "/") == "response"
+        assert seen == [1]
+        assert tracked.in_flight == 0
+        assert tracked.requests == 1
+        assert tracked.failures == 0
+        assert tracked.last_latency is not None
+
+    @pytest.mark.asyncio
+    async def test_exception(self, monkeypatch):
+        tracked = node()
+
+        async def perform_request(self, *args, **kwargs):
+            raise ConnectionError
+
+        monkeypatch.setattr(AiohttpHttpNode, "perform_request", perform_request)
+
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await tracked.perform_request("GET", "/")
+
+        assert tracked.in_flight == 0
+        assert tracked.requests == 2
+        assert tracked.failures == 2
+        assert tracked.consecutive_failures == 2
+        assert tracked.health()["healthy"] is False
+
+    @pytest.mark.asyncio
+    async def test_success_resets_consecutive_failures(self, monkeypatch):
+        tracked = node()
+        tracked.consecutive_failures = 3
+
+        async def perform_request(self, *args, **kwargs):
+            return "response"
+
+        monkeypatch.setattr(AiohttpHttpNode, "perform_request", perform_request)
+        await tracked.perform_request("GET", "/")
+
+        assert tracked.consecutive_failures == 0
+        assert tracked.health()["healthy"] is True
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests(self, monkeypatch):
+        tracked = node()
+        release = asyncio.Event()
+
+        async def perform_request(self, *args, **kwargs):
+            await release.wait()
+            return "response"
+
+        monkeypatch.setattr(AiohttpHttpNode, "perform_request", perform_request)
+        tasks = [
+            asyncio.create_task(tracked.perform_request("GET", "/")) for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+
+        assert tracked.in_flight == 3
+        release.set()
+        await asyncio.gather(*tasks)
+        assert tracked.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_request(self, monkeypatch):
+        tracked = node()
+
+        async def perform_request(self, *args, **kwargs):
+            await asyncio.Event().wait()
+
+        monkeypatch.setattr(AiohttpHttpNode, "perform_request", perform_request)
+        task = asyncio.create_task(tracked.perform_request("GET", "/"))
+        await asyncio.sleep(0)
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert tracked.in_flight == 0
+
+
+class TestLeastInFlightSelector:
+    """Тестируем выбор узла с наименьшим числом запросов в полете"""
+
+    def setup_method(self):
+        self.nodes = [node(9200), node(9201), node(9202)]
+        self.selector = LeastInFlightSelector([n.config for n in self.nodes])
+
+    def test_least_loaded_node(self):
+        self.nodes[0].in_flight = 2
+        self.nodes[1].in_flight = 0
+        self.nodes[2].in_flight = 1
+
+        for _ in range(len(self.nodes)):
+            assert self.selector.select(self.nodes) is self.nodes[1]
+
+    def test_ties_rotate(self):
+        selected = [self.selector.select(self.nodes) for _ in range(6)]
+
+        assert selected == self.nodes * 2
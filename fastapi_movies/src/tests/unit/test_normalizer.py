@@ -0,0 +1,60 @@
+import pytest
+
+from services.normalizer import QueryNormalizer
+
+
+class FakeIndices:
+    def __init__(self):
+        self.calls = 0
+
+    async def analyze(self, index: str, analyzer: str, text: str) -> dict:
+        self.calls += 1
+        return {"tokens": [{"token": word.rstrip("s")} for word in text.split()]}
+
+
+class FakeElastic:
+    def __init__(self):
+        self.indices = FakeIndices()
+
+
+class TestQueryNormalizer:
+    """Тестируем ключи кэша нормализованных поисковых запросов"""
+
+    @pytest.mark.asyncio
+    async def test_elastic_gets_original_query(self):
+        normalizer = QueryNormalizer(mode="stopwords")
+
+        normalized = await normalizer.normalize("The  STAR of")
+
+        assert normalized.text == "The  STAR of"
+        assert normalized.key == "star"
+
+    @pytest.mark.asyncio
+    async def test_stopwords_only_query(self):
+        normalizer = QueryNormalizer(mode="stopwords")
+
+        assert (await normalizer.normalize("The")).key == "the"
+
+    @pytest.mark.asyncio
+    async def test_analyzer_key_keeps_repeated_tokens(self):
+        elastic = FakeElastic()
+        normalizer = QueryNormalizer(mode="analyzer", elastic=elastic)
+
+        star_wars = await normalizer.normalize("Stars wars")
+        wars_star = await normalizer.normalize("war star")
+        repeated = await normalizer.normalize("star star war")
+
+        assert star_wars.key == wars_star.key == "star war"
+        assert repeated.key == "star star war"
+        assert repeated.text == "star star war"
+
+    @pytest.mark.asyncio
+    async def test_analyzer_tokens_are_remembered(self):
+        elastic = FakeElastic()
+        normalizer = QueryNormalizer(mode="analyzer", elastic=elastic)
+
+        await normalizer.normalize("Star wars")
+        await normalizer.normalize("star  WARS")
+
+        assert elastic.indices.calls == 1
+        assert normalizer.stats()["merged"] == 1
@@ -0,0 +1,174 @@
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from dto import rating_index
+from dto.rating_index import REBUILD_KEY, RatingIndexHook
+
+from data_sync.utils.rating_index import (RATING_KEY, film_card_key,
+                                          genre_rating_key)
+from db.rating_index import RatingIndex
+
+ACTION = "6659b767-b656-49cf-80b2-6a7c012e9d21"
+DRAMA = "fbd77e08-4dd6-4daf-9276-2abaa709fe87"
+
+
+def film(film_id: str, rating: float | None, *genres: str) -> dict:
+    return {
+        "id": film_id,
+        "title": f"Film {film_id}",
+        "imdb_rating": rating,
+        "genres": [{"id": genre_id} for genre_id in genres],
+    }
+
+
+class TestRatingIndexHook:
+    """Тестируем построение индекса рейтинга в data_sync"""
+
+    def setup_method(self):
+        self.redis = fakeredis.FakeRedis()
+        self.hook = RatingIndexHook(redis=self.redis, elastic=None)
+
+    def rebuild(self, monkeypatch, films: list[dict]) -> None:
+        monkeypatch.setattr(
+            rating_index,
+            "scan",
+            lambda *args, **kwargs: ({"_source": film} for film in films),
+        )
+        self.hook.rebuild()
+
+    def test_rebuild(self, monkeypatch):
+        self.rebuild(
+            monkeypatch,
+            [film("a", 7.0, ACTION), film("b", 9.0, ACTION, DRAMA), film("c", None)],
+        )
+
+        assert self.redis.zrevrange(RATING_KEY, 0, -1) == [b"b", b"a", b"c"]
+        assert self.redis.zrevrange(genre_rating_key(ACTION), 0, -1) == [b"b", b"a"]
+        assert self.redis.zrevrange(genre_rating_key(DRAMA), 0, -1) == [b"b"]
+        assert self.redis.hget(film_card_key("c"), "imdb_rating") == b""
+        # временные ключи после подмены не остаются
+        assert not list(self.redis.scan_iter(match=f"{REBUILD_KEY}*"))
+
+    def test_rebuild_replaces_index(self, monkeypatch):
+        self.rebuild(monkeypatch, [film("a", 7.0, ACTION), film("b", 9.0, DRAMA)])
+        self.redis.zadd(f"{REBUILD_KEY}:genre:{ACTION}", {"stale": 1.0})
+
+        self.rebuild(monkeypatch, [film("a", 7.0, DRAMA)])
+
+        assert self.redis.zrevrange(RATING_KEY, 0, -1) == [b"a"]
+        assert self.redis.zrevrange(genre_rating_key(DRAMA), 0, -1) == [b"a"]
+        # жанр, в котором не осталось фильмов, удаляется
+        assert not self.redis.exists(genre_rating_key(ACTION))
+        assert not list(self.redis.scan_iter(match=f"{REBUILD_KEY}*"))
+
+    def test_rebuild_empty_index(self, monkeypatch):
+        self.redis.zadd(RATING_KEY, {"a": 7.0})
+
+        self.rebuild(monkeypatch, [])
+
+        assert not self.redis.exists(RATING_KEY)
+
+    def test_after_batch_moves_film_between_genres(self, monkeypatch):
+        self.rebuild(monkeypatch, [film("a", 7.0, ACTION), film("b", 9.0, ACTION)])
+
+        self.hook.after_batch(
+            "movies",
+            [
+                SimpleNamespace(
+                    id="a", title="Film a", imdb_rating=9.5, genres=[{"id": DRAMA}]
+                )
+            ],
+        )
+
+        assert self.redis.zrevrange(RATING_KEY, 0, -1) == [b"a", b"b"]
+        assert self.redis.zrevrange(genre_rating_key(ACTION), 0, -1) == [b"b"]
+        assert self.redis.zrevrange(genre_rating_key(DRAMA), 0, -1) == [b"a"]
+        assert self.redis.hget(film_card_key("a"), "genres").decode() == DRAMA
+
+    def test_after_batch_waits_for_rebuild(self):
+        self.hook.after_batch(
+            "movies",
+            [SimpleNamespace(id="a", title="Film a", imdb_rating=9.5, genres=[])],
+        )
+
+        assert not self.redis.exists(RATING_KEY)
+
+
+class TestRatingIndex:
+    """Тестируем чтение страниц индекса рейтинга в API"""
+
+    def setup_method(self):
+        self.redis = fakeredis.FakeAsyncRedis()
+        self.index = RatingIndex(self.redis)
+
+    async def fill(self, films: list[dict]) -> None:
+        for item in films:
+            score = item["imdb_rating"]
+            genres = [genre["id"] for genre in item["genres"]]
+            await self.redis.zadd(RATING_KEY, {item["id"]: score})
+            for genre_id in genres:
+                await self.redis.zadd(genre_rating_key(genre_id), {item["id"]: score})
+            await self.redis.hset(
+                film_card_key(item["id"]),
+                mapping={
+                    "id": item["id"],
+                    "title": item["title"],
+                    "imdb_rating": score,
+                    "genres": ",".join(genres),
+                },
+            )
+
+    @pytest.mark.asyncio
+    async def test_page(self):
+        await self.fill(
+            [
+                film("a", 8.0, ACTION),
+                film("b", 8.0, ACTION),
+                film("c", 9.0, DRAMA),
+                film("d", 7.0, ACTION),
+            ]
+        )
+
+        page = await self.index.page(None, offset=1, size=2)
+        genre_page = await self.index.page(ACTION, offset=0, size=10)
+
+        # при равном рейтинге - по убыванию id, как "-imdb_rating,-id"
+        assert [item["id"] for item in page] == ["b", "a"]
+        assert [item["id"] for item in genre_page] == ["b", "a", "d"]
+        assert genre_page[0] == {"id": "b", "title": "Film b", "imdb_rating": 8.0}
+
+    @pytest.mark.asyncio
+    async def test_page_without_index(self):
+        assert await self.index.page(None, offset=0, size=10) is None
+
+    @pytest.mark.asyncio
+    async def test_page_past_the_end(self):
+        await self.fill([film("a", 8.0, ACTION)])
+
+        assert await self.index.page(ACTION, offset=10, size=10) == []
+
+    @pytest.mark.asyncio
+    async def test_page_with_missing_card(self):
+        await self.fill([film("a", 8.0, ACTION), film("b", 7.0, ACTION)])
+        await self.redis.delete(film_card_key("b"))
+
+        assert await self.index.page(None, offset=0, size=10) is None
+
+    @pytest.mark.parametrize(
+        "sort, genres, has_rating_range, fields, expected",
+        [
+            (("-imdb_rating", "-id"), (), False, None, True),
+            (("-imdb_rating", "-id"), (ACTION,), False, ["title"], True),
+            (("-imdb_rating", "-id"), (ACTION, DRAMA), False, None, False),
+            (("-imdb_rating", "-id"), (), True, None, False),
+            (("imdb_rating", "id"), (), False, None, False),
+            (("-imdb_rating", "-id"), (), False, ["genre"], False),
+        ],
+    )
+    def test_covers(self, sort, genres, has_rating_range, fields, expected):
+        film_filter = SimpleNamespace(
+            sort=sort, genres=genres, has_rating_range=has_rating_range
+        )
+
+        assert self.index.covers(film_filter, fields) is expected
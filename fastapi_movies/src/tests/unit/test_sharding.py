@@ -0,0 +1,104 @@
+import fakeredis
+import pytest
+
+from data_sync.utils.hash_ring import HashRing
+from db.sharding import PRIMARY_PREFIXES, ShardedRedis
+
+NODES = ["redis-1:6379", "redis-2:6379", "redis-3:6379", "redis-4:6379"]
+KEYS = [f"films_{page}_50_-imdb_rating,-id" for page in range(10_000)]
+
+
+def assignment(ring: HashRing) -> dict[str, str]:
+    return {key: ring.node_for(key) for key in KEYS}
+
+
+class TestHashRing:
+    """Тестируем консистентное хэширование ключей кэша по узлам"""
+
+    def test_stable_assignment(self):
+        # узел ключа не зависит от процесса и порядка перечисления узлов
+        assert assignment(HashRing(NODES)) == assignment(HashRing(NODES[::-1]))
+
+    def test_keys_spread_over_nodes(self):
+        counts = {node: 0 for node in NODES}
+        for node in assignment(HashRing(NODES)).values():
+            counts[node] += 1
+
+        for count in counts.values():
+            assert count == pytest.approx(len(KEYS) / len(NODES), rel=0.25)
+
+    def test_add_node_moves_about_1_of_n_keys(self):
+        before = assignment(HashRing(NODES[:3]))
+        after = assignment(HashRing(NODES))
+
+        moved = [key for key in KEYS if before[key] != after[key]]
+
+        # ключи переезжают только на новый узел
+        assert {after[key] for key in moved} == {NODES[3]}
+        assert len(moved) / len(KEYS) == pytest.approx(1 / len(NODES), rel=0.25)
+
+    def test_remove_node_moves_only_its_keys(self):
+        ring = HashRing(NODES)
+        before = assignment(ring)
+
+        ring.remove(NODES[0])
+        after = assignment(ring)
+
+        moved = [key for key in KEYS if before[key] != after[key]]
+        assert {before[key] for key in moved} == {NODES[0]}
+        assert len(moved) / len(KEYS) == pytest.approx(1 / len(NODES), rel=0.25)
+
+    def test_empty_ring(self):
+        with pytest.raises(LookupError):
+            HashRing().node_for("films_1_50")
+
+
+class TestShardedRedis:
+    """Тестируем раскладку команд ShardedRedis по узлам"""
+
+    def setup_method(self):
+        self.primary = fakeredis.FakeAsyncRedis()
+        self.nodes = {node: fakeredis.FakeAsyncRedis() for node in NODES[:2]}
+        self.redis = ShardedRedis(self.primary, self.nodes)
+
+    @pytest.mark.parametrize("prefix", PRIMARY_PREFIXES)
+    def test_service_keys_on_primary(self, prefix):
+        for key in KEYS[:100]:
+            assert self.redis.client_for(f"{prefix}{key}") is self.primary
+            assert self.redis.client_for(f"{prefix}{key}".encode()) is self.primary
+
+    def test_cache_keys_on_ring_nodes(self):
+        for key in KEYS[:100]:
+            node = self.redis.ring.node_for(key)
+            assert self.redis.client_for(key) is self.nodes[node]
+
+    @pytest.mark.asyncio
+    async def test_commands_split_by_node(self):
+        keys = KEYS[:20]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(key, key)
+            pipe.sadd("tag:film:1", *keys)
+            await pipe.execute()
+
+        assert await self.redis.mget(keys) == [key.encode() for key in keys]
+        for key in keys:
+            node = self.nodes[self.redis.ring.node_for(key)]
+            assert await node.get(key) == key.encode()
+        assert await self.primary.scard("tag:film:1") == len(keys)
+        assert await self.primary.dbsize() == 1
+
+        assert await self.redis.delete(*keys) == len(keys)
+        assert await self.redis.mget(keys) == [None] * len(keys)
+
+    @pytest.mark.asyncio
+    async def test_transaction_across_nodes(self):
+        keys = KEYS[:20]
+        assert len({self.redis.ring.node_for(key) for key in keys}) > 1
+
+        pipe = self.redis.pipeline(transaction=True)
+        for key in keys:
+            pipe.set(key, key)
+
+        with pytest.raises(ValueError):
+            await pipe.execute()
@@ -0,0 +1,229 @@
+import os
+import sqlite3
+
+import pytest
+
+from data_sync.utils.sqlite_schema import (create_tables, fts_query,
+                                           insert_documents)
+from db.sqlite import SqliteStorage, UnsupportedQuery
+
+DRAMA = "fbd77e08-4dd6-4daf-9276-2abaa709fe87"
+COMEDY = "6659b767-b656-49cf-80b2-6a7c012e9d21"
+
+FILMS = [
+    {"id": "1", "title": "The Star", "imdb_rating": 7.5, "genre_ids": [DRAMA]},
+    {"id": "2", "title": "Star Wars", "imdb_rating": 8.6, "genre_ids": [COMEDY]},
+    {"id": "3", "title": "Dark Star", "imdb_rating": None, "genre_ids": [DRAMA]},
+    {"id": "4", "title": "Moon", "imdb_rating": 7.9, "genre_ids": [DRAMA, COMEDY]},
+]
+PERSONS = [{"id": "p1", "full_name": "George Lucas"}]
+
+
+def build_db(path: str, films: list[dict]) -> None:
+    """База в формате выгрузки sqlite_export"""
+    conn = sqlite3.connect(path)
+    create_tables(conn)
+    insert_documents(conn, "movies", films)
+    insert_documents(conn, "persons", PERSONS)
+    conn.commit()
+    conn.close()
+
+
+def ids(response: dict) -> list[str]:
+    return [hit["_id"] for hit in response["hits"]["hits"]]
+
+
+def match(text: str) -> dict:
+    return {"match": {"title": {"query": text}}}
+
+
+class TestFtsQuery:
+    """Тестируем запросы FTS5 для match"""
+
+    def test_words(self):
+        assert fts_query("title", "The Star WARS") == '{title} : ("star" OR "wars")'
+
+    def test_stopwords_only(self):
+        assert fts_query("title", "the of") is None
+
+
+class TestSqliteStorage:
+    """Тестируем запросы эластика к базе SQLite"""
+
+    @pytest.fixture(autouse=True)
+    def storage(self, tmp_path):
+        self.path = str(tmp_path / "movies.sqlite")
+        build_db(self.path, FILMS)
+        self.storage = SqliteStorage(self.path, reopen_interval=0)
+        yield
+        self.storage.close()
+
+    def test_compile_match_all(self):
+        sql, params, full_text = self.storage._compile("movies", {})
+
+        assert sql == "SELECT t.rowid, t.id, t.source FROM movies t WHERE 1"
+        assert params == []
+        assert not full_text
+
+    def test_compile_match(self):
+        _, params, full_text = self.storage._compile(
+            "movies", {"query": {"bool": {"must": [match("star")]}}}
+        )
+
+        assert params == ['({title} : ("star"))']
+        assert full_text
+
+    def test_compile_unsupported(self):
+        with pytest.raises(UnsupportedQuery):
+            self.storage._compile("movies", {"query": {"term": {"id": "1"}}})
+        with pytest.raises(UnsupportedQuery):
+            self.storage._compile(
+                "movies",
+                {"query": {"bool": {"filter": [{"range": {"budget": {"gt": 1}}}]}}},
+            )
+
+    @pytest.mark.asyncio
+    async def test_get(self):
+        hit = await self.storage.get("movies", "2", source_includes=["title"])
+
+        assert hit == {
+            "_index": "movies",
+            "_id": "2",
+            "_source": {"title": "Star Wars"},
+        }
+        assert await self.storage.get("movies", "missing") is None
+        assert await self.storage.get("unknown", "2") is None
+
+    @pytest.mark.asyncio
+    async def test_match(self):
+        response = await self.storage.get_batch(
+            "movies", {"query": {"bool": {"must": [match("the star")]}}}
+        )
+
+        assert sorted(ids(response)) == ["1", "2", "3"]
+
+    @pytest.mark.asyncio
+    async def test_match_stopwords_only(self):
+        response = await self.storage.get_batch(
+            "movies", {"query": {"bool": {"must": [match("the")]}}}
+        )
+
+        assert ids(response) == []
+
+    @pytest.mark.asyncio
+    async def test_filters(self):
+        terms = {"terms": {"genre_ids": [COMEDY]}}
+        rating = {"range": {"imdb_rating": {"gte": 7.9, "lt": 9}}}
+
+        by_genre = await self.storage.get_batch(
+            "movies", {"query": {"bool": {"filter": [terms]}}}
+        )
+        by_rating = await self.storage.get_batch(
+            "movies", {"query": {"bool": {"filter": [rating]}}}
+        )
+        by_id = await self.storage.get_batch(
+            "movies", {"query": {"bool": {"filter": [{"term": {"id": "3"}}]}}}
+        )
+        combined = await self.storage.get_batch(
+            "movies",
+            {"query": {"bool": {"must": [match("star")], "filter": [terms]}}},
+        )
+
+        assert ids(by_genre) == ["2", "4"]
+        assert ids(by_rating) == ["2", "4"]
+        assert ids(by_id) == ["3"]
+        assert ids(combined) == ["2"]
+
+    @pytest.mark.asyncio
+    async def test_sort(self):
+        by_rating = await self.storage.get_batch(
+            "movies", {"sort": [{"imdb_rating": "desc"}, {"id": "desc"}]}
+        )
+        by_rating_asc = await self.storage.get_batch(
+            "movies", {"sort": [{"imdb_rating": "asc"}, {"id": "asc"}]}
+        )
+        by_title = await self.storage.get_batch(
+            "movies", {"sort": [{"title.raw": "asc"}, {"id": "asc"}]}
+        )
+
+        # документы без значения идут последними при любом направлении
+        assert ids(by_rating) == ["2", "4", "1", "3"]
+        assert ids(by_rating_asc) == ["1", "4", "2", "3"]
+        assert ids(by_title) == ["3", "4", "2", "1"]
+
+    @pytest.mark.asyncio
+    async def test_pagination(self):
+        response = await self.storage.get_batch(
+            "movies", {"sort": [{"id": "asc"}], "from": 1, "size": 2}
+        )
+
+        assert ids(response) == ["2", "3"]
+
+    @pytest.mark.asyncio
+    async def test_iter_batch(self):
+        hits = [
+            hit
+            async for hit in self.storage.iter_batch(
+                "movies", {"sort": [{"id": "asc"}]}, offset=1, size=10, chunk_size=2
+            )
+        ]
+
+        assert [hit["_id"] for hit in hits] == ["2", "3", "4"]
+
+    @pytest.mark.asyncio
+    async def test_get_multi(self):
+        responses = await self.storage.get_multi(
+            [
+                ("movies", {"query": {"bool": {"must": [match("moon")]}}}, {}),
+                (
+                    "persons",
+                    {"query": {"bool": {"must": [{"match": {"full_name": "lucas"}}]}}},
+                    {},
+                ),
+                ("unknown", {}, {}),
+            ]
+        )
+
+        assert ids(responses[0]) == ["4"]
+        assert ids(responses[1]) == ["p1"]
+        assert responses[2] is None
+
+    @pytest.mark.asyncio
+    async def test_scan(self):
+        hits = [
+            hit
+            async for hit in self.storage.scan(
+                "movies",
+                {"bool": {"filter": [{"term": {"genre_ids": DRAMA}}]}},
+                chunk_size=1,
+            )
+        ]
+
+        assert [hit["_id"] for hit in hits] == ["1", "3", "4"]
+
+    @pytest.mark.asyncio
+    async def test_reopen_replaced_file(self):
+        assert await self.storage.get("movies", "5") is None
+
+        tmp_path = f"{self.path}.tmp"
+        build_db(tmp_path, [*FILMS, {"id": "5", "title": "Solaris"}])
+        os.replace(tmp_path, self.path)
+
+        assert (await self.storage.get("movies", "5"))["_id"] == "5"
+
+    def test_reopen_interval(self):
+        # соединения у потоков свои, поэтому проверяем в одном потоке
+        storage = SqliteStorage(self.path, reopen_interval=3600)
+        try:
+            assert storage._get("movies", "5") is None
+
+            tmp_path = f"{self.path}.tmp"
+            build_db(tmp_path, [*FILMS, {"id": "5", "title": "Solaris"}])
+            os.replace(tmp_path, self.path)
+
+            # до истечения интервала файл не проверяется
+            assert storage._get("movies", "5") is None
+            storage._local.checked -= 3600
+            assert storage._get("movies", "5") is not None
+        finally:
+            storage.close()